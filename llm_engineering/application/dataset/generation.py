@@ -5,6 +5,7 @@ from langchain_core.exceptions import OutputParserException
 from langchain_core.language_models.fake import FakeListLLM 
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_core.prompts import PromptTemplate
+from langchain_openai import ChatOpenAI
 from loguru import logger 
 
 from llm_engineering import domain
@@ -13,17 +14,18 @@ from llm_engineering.domain.cleaned_documents import CleanedDocument
 from llm_engineering.domain.dataset import DatasetType, TrainTestSplit
 from llm_engineering.domain.prompt import GenerateDatasetSamplesPrompt, Prompt
 from llm_engineering.domain.types import DataCategory
+from llm_engineering.infrastructure.llm_response_cache import LLMResponseCache, build_llm_response_cache
 from llm_engineering.settings import settings 
 
 from . import constants
-from . import utils
+from . import utils as generation_utils
 from .output_parsers import ListPydanticOutputParser
 
 
 # Based class to generate datasets, inherits from the abstract base class.
 class DatasetGenerator(ABC):
-    tokenizer = toktoken.encoding_for_model(settings.OPENAI_MODEL_ID)
-    dataset_type = DatasetType | None = None
+    tokenizer = tiktoken.encoding_for_model(settings.OPENAI_MODEL_ID)
+    dataset_type: DatasetType | None = None
 
     system_prompt_template = """You are a helpful assistant who generates {dataset_format} based on the given context. \
         Provide your response in JSON format.
@@ -57,7 +59,7 @@ class DatasetGenerator(ABC):
     @classmethod 
     def get_prompts(cls, documents: list[CleanedDocument]) -> dict[DataCategory, list[GenerateDatasetSamplesPrompt]]:
         # Extract the substrings.
-        documents = utils.extract_substrings(documents)
+        documents = generation_utils.extract_substrings(documents)
 
         # Empty dictionary for stored prompts
         grouped_prompts = {}
@@ -110,13 +112,17 @@ class DatasetGenerator(ABC):
 
         return prompt
     
-    # Method to generate prompts
+    # Method to generate prompts. The samples are generated with a temperature of 0.7, so with the default
+    # settings their responses are not cached: pass a `run_id` (or set LLM_RESPONSE_CACHE_RUN_ID) to cache them
+    # for this run, so re-running it with the same id after a failure resumes it, or set
+    # LLM_RESPONSE_CACHE_ALLOW_SAMPLED to reuse them across all the runs. Both need LLM_RESPONSE_CACHE_PATH.
     @classmethod
     def generate(
         cls, 
         prompts: dict[DataCategory, list[GenerateDatasetSamplesPrompt]], 
         test_size: float = 0.2,
         mock: bool = False,
+        run_id: str | None = None,
     ) -> TrainTestSplit:
         assert cls.dataset_type is not None, "Dataset type must be set before calling generate()"
 
@@ -131,6 +137,217 @@ class DatasetGenerator(ABC):
 
             return messages
 
+        # Internal function to turn the messages into plain dictionaries, hashed into the response cache keys.
+        def _to_cache_prompt(messages: list[BaseMessage]) -> list[dict[str, str]]:
+            return [{"role": message.type, "content": message.content} for message in messages]
+
+        parameters = cls.get_generation_parameters()
         if mock:
             llm = FakeListLLM(responses=[constants.get_mocked_response(cls.dataset_type)])
+            # The mocked responses are never cached.
+            cache = None
+        else:
+            assert settings.OPENAI_API_KEY is not None, "OpenAI API key must be set to generate datasets"
+
+            llm = ChatOpenAI(model=settings.OPENAI_MODEL_ID, api_key=settings.OPENAI_API_KEY, **parameters)
+            cache = build_llm_response_cache(run_id=run_id)
+            if cache is not None and not cache.is_cacheable(parameters):
+                logger.info(
+                    "Sampled generations are not cached, pass a run_id (or set LLM_RESPONSE_CACHE_RUN_ID) to resume "
+                    "this run from the cache, or set LLM_RESPONSE_CACHE_ALLOW_SAMPLED to cache them across runs."
+                )
+                cache = None
+
+        parser = ListPydanticOutputParser(pydantic_object=cls._get_dataset_sample_type())
+
+        datasets = {}
+        for category, category_prompts in prompts.items():
+            langchain_category_prompts = [_to_langchain(prompt) for prompt in category_prompts]
+            batches = utils.misc.batch(langchain_category_prompts, size=24)
+
+            flattened_dataset_samples = []
+            for batch in batches:
+                if cache is not None:
+                    cache_keys = [
+                        cache.key(settings.OPENAI_MODEL_ID, _to_cache_prompt(messages), parameters)
+                        for messages in batch
+                    ]
+                else:
+                    cache_keys = [str(i) for i in range(len(batch))]
+                responses = cls._generate_responses(llm, batch, cache_keys, cache)
+
+                # Parse every response on its own, so a malformed one doesn't drop its whole batch.
+                parsed_responses = {}
+                for cache_key, response in zip(cache_keys, responses, strict=True):
+                    try:
+                        flattened_dataset_samples.extend(parser.parse(response))
+                        parsed_responses[cache_key] = response
+                    except OutputParserException:
+                        logger.exception(f"Failed to parse the output JSON of a response for category {category}")
+
+                # Cache after every batch: a run failing midway resumes from here. Malformed responses are not
+                # cached, they are generated again.
+                if cache is not None:
+                    cache.put_many(parsed_responses)
+
+            dataset = domain.dataset.build_dataset(
+                dataset_type=cls.dataset_type, category=category, samples=flattened_dataset_samples
+            )
+            datasets[category] = dataset
+            logger.info(f"Generated {len(dataset.samples)} samples for category '{category}'.")
+
+        if cache is not None:
+            logger.info(f"LLM response cache stats: {cache.stats()}")
+
+        processed_datasets = cls.post_process_datasets(datasets, test_size=test_size)
+
+        return processed_datasets
+
+    # Method to generate the responses of a batch of prompts, the cached ones are not sent to the LLM.
+    @classmethod
+    def _generate_responses(
+        cls,
+        llm: ChatOpenAI | FakeListLLM,
+        batch: list[list[BaseMessage]],
+        cache_keys: list[str],
+        cache: LLMResponseCache | None,
+    ) -> list[str]:
+        cached_responses = cache.get_many(cache_keys) if cache is not None else {}
+
+        missing_indexes = [i for i, cache_key in enumerate(cache_keys) if cache_key not in cached_responses]
+        generated_responses = {}
+        if len(missing_indexes) > 0:
+            responses = llm.batch([batch[i] for i in missing_indexes], stop=None)
+            for i, response in zip(missing_indexes, responses, strict=True):
+                # Chat models answer with messages, plain LLMs with strings.
+                generated_responses[i] = response.content if isinstance(response, BaseMessage) else response
+
+        return [cached_responses.get(cache_key, generated_responses.get(i)) for i, cache_key in enumerate(cache_keys)]
+
+    # Method to get the sampling parameters of the LLM, also part of the response cache keys.
+    @classmethod
+    def get_generation_parameters(cls) -> dict:
+        return {
+            "max_tokens": 2000 if cls.dataset_type == DatasetType.PREFERENCE else 1200,
+            "temperature": 0.7,
+        }
+
+    # Method to get the sample class of the dataset type.
+    @classmethod
+    def _get_dataset_sample_type(
+        cls,
+    ) -> type[domain.dataset.InstructDatasetSample] | type[domain.dataset.PreferenceDatasetSample]:
+        return (
+            domain.dataset.InstructDatasetSample
+            if cls.dataset_type == DatasetType.INSTRUCTION
+            else domain.dataset.PreferenceDatasetSample
+        )
+
+    @classmethod
+    @abstractmethod
+    def post_process_datasets(
+        cls, datasets: dict[DataCategory, domain.dataset.InstructDataset], test_size: float
+    ) -> TrainTestSplit:
+        pass
+
+
+# Class to generate the instruction datasets, instruction-answer pairs.
+class InstructionDatasetGenerator(DatasetGenerator):
+    dataset_type = DatasetType.INSTRUCTION
+
+    prompt_template_str = """Based on the following extract, generate five instruction-answer pairs. Each instruction \
+must ask to write about a specific topic contained in the context. Each answer \
+must provide a relevant paragraph based on the information found in the \
+context. Only use concepts from the context to generate the instructions. \
+Instructions must never explicitly mention a context, a system, a course, or an extract. \
+Instructions must be self-contained and general. \
+Answers must imitate the writing style of the context. \
+
+Example instruction: Explain the concept of an LLM Twin. \
+Example answer: An LLM Twin is essentially an AI character that mimics your writing style, personality, and voice. \
+It's designed to write just like you by incorporating these elements into a language model. \
+The idea is to create a digital replica of your writing habits using advanced AI techniques. \
+
+Structure the answer in JSON format, ready to be loaded in Python by json.loads(), as a list of objects.
+Do not add any extra characters and provide your response in JSON format with the following structure:
+[
+    {"instruction": "...", "answer": "..."},
+    ...
+]
+
+Extract:
+{{extract}}
+"""
+
+    @classmethod
+    def post_process_datasets(
+        cls, datasets: dict[DataCategory, domain.dataset.InstructDataset], test_size: float
+    ) -> TrainTestSplit:
+        train_test_split = generation_utils.create_instruct_train_test_split(
+            datasets, test_size=test_size, random_state=42
+        )
+
+        return train_test_split
+
+
+# Class to generate the preference datasets, instruction-rejected-chosen triples.
+class PreferenceDatasetGenerator(DatasetGenerator):
+    dataset_type = DatasetType.PREFERENCE
+
+    prompt_template_str = """Based on the following extract, generate five instruction-answer triples. Each triple \
+should consist of:
+1. An instruction asking about a specific topic in the context.
+2. A generated answer that attempts to answer the instruction based on the context, named as 'rejected'.
+3. An extracted answer that is a relevant excerpt directly from the given context, named as 'chosen'.
+
+Instructions must be self-contained and general, without explicitly mentioning a context, system, course, or extract.
+
+Important:
+- Ensure that the extracted answer, the chosen one, is a verbatim copy from the context, including all punctuation \
+and apostrophes.
+- Do not add any ellipsis (...) or [...]  to indicate skipped text in the extracted answer.
+- If the relevant text is not continuous, use two separate sentences from the context instead of skipping text.
+
+Structure the answer in JSON format, ready to be loaded in Python by json.loads(), as a list of objects.
+Do not add any extra characters and provide your response in JSON format with the following structure:
+[
+    {
+        "instruction": "...",
+        "rejected": "...",
+        "chosen": "..."
+    },
+    ...
+]
+
+Extract:
+{{extract}}
+"""
+
+    @classmethod
+    def post_process_datasets(
+        cls, datasets: dict[DataCategory, domain.dataset.PreferenceDataset], test_size: float
+    ) -> TrainTestSplit:
+        # Drop the short answers and the ones that aren't proper sentences.
+        datasets = generation_utils.filter_short_answers(datasets)
+        datasets = generation_utils.filter_answer_format(datasets)
+
+        remaining_samples = sum([dataset.num_samples for dataset in datasets.values()])
+        logger.info(
+            f"Filtered out short answers and answers with incorrect format. Remaining samples: {remaining_samples}"
+        )
+
+        train_test_split = generation_utils.create_preference_train_test_split(
+            datasets, test_size=test_size, random_state=42
+        )
+
+        return train_test_split
+
 
+# Function to get the generator class of a dataset type.
+def get_dataset_generator(dataset_type: DatasetType) -> type[DatasetGenerator]:
+    if dataset_type == DatasetType.INSTRUCTION:
+        return InstructionDatasetGenerator
+    elif dataset_type == DatasetType.PREFERENCE:
+        return PreferenceDatasetGenerator
+    else:
+        raise ValueError(f"Invalid dataset type: {dataset_type}")
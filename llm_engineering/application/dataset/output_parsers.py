@@ -1,4 +1,4 @@
-from langchain.output_parsers import PydanticOutput
+from langchain.output_parsers import PydanticOutputParser
 
 # Class to list all pydantic output parsers
 class ListPydanticOutputParser(PydanticOutputParser):
@@ -39,8 +39,8 @@ def create_instruct_train_test_split(
             train_samples = []
             test_samples = []
 
-            train_samples = InstructDataset(category=category, samples=train_samples)
-            test_samples = InstructDataset(category=category, samples=test_samples)
+        train_data[category] = InstructDataset(category=category, samples=train_samples)
+        test_data[category] = InstructDataset(category=category, samples=test_samples)
 
     # Store in huggingface after split    
     return InstructTrainTestSplit(train=train_data, test=test_data, test_split_size=test_size)
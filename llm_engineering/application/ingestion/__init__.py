@@ -0,0 +1,4 @@
+from .change_stream import ChangeStreamWatcher, ResumeTokenStore
+from .incremental import ingest_documents
+
+__all__ = ["ChangeStreamWatcher", "ResumeTokenStore", "ingest_documents"]
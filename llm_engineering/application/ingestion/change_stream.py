@@ -0,0 +1,224 @@
+import random
+import time
+from datetime import datetime, timezone
+from typing import Callable
+
+from loguru import logger
+from pymongo import errors
+
+from llm_engineering.domain.documents import ArticleDocument, Document, PostDocument, RepositoryDocument
+from llm_engineering.infrastructure.db.mongo import connection
+from llm_engineering.settings import settings
+
+from .incremental import ingest_documents
+
+_database = connection.get_database(settings.DATABASE_NAME)
+
+# Error code returned by MongoDB when the oplog no longer holds the event a resume token points to.
+CHANGE_STREAM_HISTORY_LOST = 286
+# Upper bound of the delay between the retries of a failing batch.
+MAX_RETRY_BACKOFF_SECONDS = 600.0
+
+
+class ResumeTokenStore:
+    """
+    Persists the change stream resume token in MongoDB so a restarted watcher continues where it stopped.
+    """
+
+    def __init__(self, watcher_name: str) -> None:
+        self._watcher_name = watcher_name
+        self._collection = _database[settings.CHANGE_STREAM_RESUME_TOKENS_COLLECTION]
+
+    def load(self) -> dict | None:
+        document = self._collection.find_one({"_id": self._watcher_name})
+
+        return document["resume_token"] if document else None
+
+    def save(self, resume_token: dict) -> None:
+        self._collection.replace_one(
+            {"_id": self._watcher_name},
+            {"resume_token": resume_token, "updated_at": datetime.now(timezone.utc)},
+            upsert=True,
+        )
+
+    def clear(self) -> None:
+        self._collection.delete_one({"_id": self._watcher_name})
+
+
+class ChangeStreamWatcher:
+    """
+    Watches the raw `articles`, `posts` and `repositories` collections through MongoDB change streams.
+    New or updated document ids are accumulated and, once `batch_size` ids are pending or the oldest pending id
+    waited `max_wait_seconds`, the batch is cleaned, chunked, embedded and loaded through the existing dispatchers.
+
+    The resume token is only persisted after a batch was processed successfully, so a crash replays the
+    unprocessed events instead of dropping them (at-least-once delivery, the upserts are idempotent). A failed
+    batch is retried with exponential backoff and jitter, starting at `retry_backoff_seconds`.
+    Change streams require MongoDB to run as a replica set (see the `mongo_replica` docker-compose service).
+    """
+
+    document_classes: tuple[type[Document], ...] = (ArticleDocument, PostDocument, RepositoryDocument)
+    operation_types: tuple[str, ...] = ("insert", "update", "replace")
+
+    def __init__(
+        self,
+        batch_size: int = settings.CHANGE_STREAM_BATCH_SIZE,
+        max_wait_seconds: float = settings.CHANGE_STREAM_MAX_WAIT_SECONDS,
+        watcher_name: str = "feature_engineering",
+        process_batch: Callable[[list[Document], set[str]], dict] = ingest_documents,
+        retry_backoff_seconds: float = 5.0,
+    ) -> None:
+        self._batch_size = batch_size
+        self._max_wait_seconds = max_wait_seconds
+        self._retry_backoff_seconds = retry_backoff_seconds
+        self._process_batch = process_batch
+        self._token_store = ResumeTokenStore(watcher_name)
+
+        self._collection_to_class = {
+            document_class.get_collection_name(): document_class for document_class in self.document_classes
+        }
+
+        # collection name -> document id -> latest operation type seen for that id
+        self._pending: dict[str, dict[str, str]] = {}
+        self._pending_since: float | None = None
+        self._num_failed_flushes = 0
+        self._retry_after: float | None = None
+
+    @property
+    def num_pending(self) -> int:
+        return sum(len(document_ids) for document_ids in self._pending.values())
+
+    def run(self, max_batches: int | None = None, poll_interval_ms: int = 1000) -> None:
+        """
+        Blocks and processes change events until interrupted (or until `max_batches` batches were processed).
+
+        Args:
+            max_batches (int | None): Stop after this many processed batches, mostly useful for testing.
+            poll_interval_ms (int): How long the server waits for new events before returning control,
+                which bounds how late the time threshold can fire.
+        """
+
+        num_batches = 0
+        resume_token = self._token_store.load()
+        logger.info(
+            f"Watching collections {list(self._collection_to_class)} for changes "
+            f"({'resuming' if resume_token else 'starting fresh'})."
+        )
+
+        try:
+            stream = self._open_stream(resume_token, poll_interval_ms)
+        except errors.OperationFailure as e:
+            if e.code != CHANGE_STREAM_HISTORY_LOST:
+                raise
+
+            # The oplog rolled over while the watcher was down, so some changes can't be replayed.
+            logger.error(
+                "The stored resume token is no longer in the oplog. Starting from now; "
+                "run the feature engineering pipeline once to pick up the missed changes."
+            )
+            self._token_store.clear()
+            stream = self._open_stream(None, poll_interval_ms)
+
+        with stream:
+            while stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self._add_change(change)
+
+                if self._should_flush() and self.flush(stream.resume_token):
+                    num_batches += 1
+                    if max_batches is not None and num_batches >= max_batches:
+                        break
+
+    def flush(self, resume_token: dict | None) -> bool:
+        """
+        Processes all pending documents and persists the resume token on success.
+
+        Returns:
+            bool: Whether the pending batch was processed successfully.
+        """
+
+        if self.num_pending == 0:
+            return False
+
+        try:
+            documents = []
+            updated_document_ids = set()
+            for collection_name, document_ids in self._pending.items():
+                documents.extend(self._fetch_documents(collection_name, document_ids))
+                updated_document_ids.update(
+                    document_id for document_id, operation in document_ids.items() if operation != "insert"
+                )
+
+            metadata = self._process_batch(documents, updated_document_ids)
+        except Exception:
+            # Keep the pending ids and back off, a full batch would otherwise be retried in a tight loop.
+            delay = min(self._retry_backoff_seconds * 2**self._num_failed_flushes, MAX_RETRY_BACKOFF_SECONDS)
+            delay += random.uniform(0, delay)  # jitter, so restarted watchers dont retry in lockstep
+            self._num_failed_flushes += 1
+            self._retry_after = time.monotonic() + delay
+            logger.exception(
+                f"Failed to process a batch of {self.num_pending} changed documents. Retrying in {delay:.1f}s."
+            )
+
+            return False
+
+        logger.info(f"Processed a batch of changed documents: {metadata}")
+
+        self._pending = {}
+        self._pending_since = None
+        self._num_failed_flushes = 0
+        self._retry_after = None
+        if resume_token is not None:
+            self._token_store.save(resume_token)
+
+        return True
+
+    def _fetch_documents(self, collection_name: str, document_ids: dict[str, str]) -> list[Document]:
+        # Queried directly rather than through `bulk_find`, which returns an empty list when the query fails: the
+        # batch would look processed and its resume token saved, losing the changes.
+        document_class = self._collection_to_class[collection_name]
+        instances = _database[collection_name].find({"_id": {"$in": list(document_ids)}})
+        documents = [document_class.from_mongo(instance) for instance in instances]
+
+        # The missing ids were deleted since they changed, there is nothing left to ingest for them.
+        num_deleted = len(document_ids) - len(documents)
+        if num_deleted > 0:
+            logger.info(f"Skipping {num_deleted} changed documents deleted from '{collection_name}' since.")
+
+        return documents
+
+    def _open_stream(self, resume_token: dict | None, poll_interval_ms: int):
+        pipeline = [
+            {
+                "$match": {
+                    "ns.coll": {"$in": list(self._collection_to_class)},
+                    "operationType": {"$in": list(self.operation_types)},
+                }
+            }
+        ]
+
+        # Watching at the database level gives a single resume token for all three collections.
+        return _database.watch(pipeline=pipeline, resume_after=resume_token, max_await_time_ms=poll_interval_ms)
+
+    def _add_change(self, change: dict) -> None:
+        collection_name = change["ns"]["coll"]
+        document_id = str(change["documentKey"]["_id"])
+
+        pending_collection = self._pending.setdefault(collection_name, {})
+        # An insert followed by updates in the same batch is still a new document without stale chunks.
+        if pending_collection.get(document_id) != "insert":
+            pending_collection[document_id] = change["operationType"]
+
+        if self._pending_since is None:
+            self._pending_since = time.monotonic()
+
+    def _should_flush(self) -> bool:
+        if self.num_pending == 0:
+            return False
+        if self._retry_after is not None and time.monotonic() < self._retry_after:
+            return False
+        if self.num_pending >= self._batch_size:
+            return True
+
+        return time.monotonic() - self._pending_since >= self._max_wait_seconds
@@ -0,0 +1,74 @@
+from llm_engineering.application import utils
+from llm_engineering.application.loading import BulkVectorLoader
+from llm_engineering.application.preprocessing import ChunkingDispatcher, CleaningDispatcher, EmbeddingDispatcher
+from llm_engineering.application.rag.semantic_cache import SemanticCache
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.documents import Document
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.domain.types import DataCategory
+
+
+def ingest_documents(documents: list[Document], updated_document_ids: set[str] | None = None) -> dict:
+    """
+    Runs a batch of raw documents through the same cleaning, chunking and embedding dispatchers
+    used by the feature engineering pipeline and loads the results into Qdrant.
+
+    Args:
+        documents (list[Document]): The raw documents pulled from the data warehouse.
+        updated_document_ids (set[str] | None): Ids of documents that already existed before this batch.
+            Their old chunks are deleted first, since chunk ids are content hashes and would otherwise linger.
+
+    Returns:
+        dict: Counts of the processed documents, useful for logging and monitoring.
+    """
+
+    if len(documents) == 0:
+        return {"num_documents": 0, "num_cleaned_documents": 0, "num_embedded_chunks": 0}
+
+    cleaned_documents = [CleaningDispatcher.dispatch(document) for document in documents]
+
+    embedded_chunks = []
+    for cleaned_document in cleaned_documents:
+        chunks = ChunkingDispatcher.dispatch(cleaned_document)
+
+        for batched_chunks in utils.misc.batch(chunks, 10):
+            embedded_chunks.extend(EmbeddingDispatcher.dispatch(batched_chunks))
+
+    if updated_document_ids:
+        _delete_stale_chunks(documents, updated_document_ids)
+
+    _load(cleaned_documents)
+    _load(embedded_chunks)
+    # the cached answers of these authors may rely on their old chunks, even when a document now has none.
+    SemanticCache.invalidate_authors({document.author_id for document in documents})
+
+    return {
+        "num_documents": len(documents),
+        "num_cleaned_documents": len(cleaned_documents),
+        "num_embedded_chunks": len(embedded_chunks),
+    }
+
+
+def _delete_stale_chunks(documents: list[Document], document_ids: set[str]) -> None:
+    """
+    Removes the previously stored chunks of the updated documents from their embedded collections.
+    """
+
+    embedded_classes = {
+        embedded_class.get_category(): embedded_class for embedded_class in EmbeddedChunk.__subclasses__()
+    }
+    # Only the collections matching the categories of this batch can hold chunks of the updated documents.
+    categories = {DataCategory(document.get_collection_name()) for document in documents}
+
+    stale_filter = DocumentFilter.by_document(sorted(document_ids))
+    for category in categories:
+        embedded_classes[category].bulk_delete(stale_filter)
+
+
+def _load(documents: list[VectorBaseDocument]) -> None:
+    reports = BulkVectorLoader().load(documents)
+
+    for report in reports.values():
+        if not report.successful:
+            raise RuntimeError(f"Failed to insert {report.num_failed_points} documents into {report.collection_name}")
@@ -0,0 +1,12 @@
+from .bulk_loader import BulkVectorLoader, LoadReport, is_transient_error
+from .snapshots import SnapshotError, SnapshotManifest, export_collection, import_collection
+
+__all__ = [
+    "BulkVectorLoader",
+    "LoadReport",
+    "SnapshotError",
+    "SnapshotManifest",
+    "export_collection",
+    "import_collection",
+    "is_transient_error",
+]
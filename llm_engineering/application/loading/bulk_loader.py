@@ -0,0 +1,203 @@
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import grpc
+from loguru import logger
+from pydantic import BaseModel
+from qdrant_client.http import exceptions
+
+from llm_engineering.application import utils
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.settings import settings
+
+# HTTP status codes worth retrying: rate limiting and temporary server side failures.
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Their gRPC counterparts, used when the connection prefers gRPC.
+TRANSIENT_GRPC_CODES = {
+    grpc.StatusCode.UNAVAILABLE,
+    grpc.StatusCode.DEADLINE_EXCEEDED,
+    grpc.StatusCode.RESOURCE_EXHAUSTED,
+    grpc.StatusCode.ABORTED,
+}
+
+
+class LoadReport(BaseModel):
+    """
+    Summary of loading one collection, attached as ZenML step metadata.
+    """
+
+    collection_name: str
+    num_points: int = 0  # points written to Qdrant
+    num_skipped_points: int = 0  # unchanged points that were not written again
+    num_failed_points: int = 0
+    num_batches: int = 0
+    num_retries: int = 0
+    duration_seconds: float = 0.0
+
+    @property
+    def points_per_second(self) -> float:
+        if self.duration_seconds == 0:
+            return 0.0
+
+        return self.num_points / self.duration_seconds
+
+    @property
+    def successful(self) -> bool:
+        return self.num_failed_points == 0
+
+    def to_metadata(self) -> dict:
+        return {
+            **self.model_dump(),
+            "points_per_second": round(self.points_per_second, 2),
+        }
+
+
+class BulkVectorLoader:
+    """
+    Loads vector documents into Qdrant in large batches with several upsert requests in flight at once.
+
+    With `wait=False` each upsert returns as soon as Qdrant acknowledged it. Once every batch of a collection
+    was sent, the last batch is upserted again with `wait=True`: Qdrant applies the updates of a collection
+    in order, so when that request returns every previously acknowledged batch is applied as well.
+
+    With `skip_unchanged=True` the stored fingerprints of each batch are fetched first, and only the new or
+    changed points are upserted, so reloading the same documents doesn't trigger needless index updates.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = settings.QDRANT_UPLOAD_BATCH_SIZE,
+        parallelism: int = settings.QDRANT_UPLOAD_PARALLELISM,
+        wait: bool = settings.QDRANT_UPLOAD_WAIT,
+        max_retries: int = settings.QDRANT_UPLOAD_MAX_RETRIES,
+        retry_backoff_seconds: float = 0.5,
+        skip_unchanged: bool = settings.QDRANT_UPLOAD_SKIP_UNCHANGED,
+    ) -> None:
+        self.batch_size = batch_size
+        self.parallelism = parallelism
+        self.wait = wait
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.skip_unchanged = skip_unchanged
+
+    def load(self, documents: list[VectorBaseDocument]) -> dict[str, LoadReport]:
+        """
+        Groups the documents by class and loads each group into its collection.
+
+        Returns:
+            dict[str, LoadReport]: A report per collection name.
+        """
+
+        grouped_documents = VectorBaseDocument.group_by_class(documents)
+
+        reports = {}
+        for document_class, class_documents in grouped_documents.items():
+            report = self.load_class(document_class, class_documents)
+            reports[report.collection_name] = report
+
+        return reports
+
+    def load_class(self, document_class: type[VectorBaseDocument], documents: list[VectorBaseDocument]) -> LoadReport:
+        collection_name = document_class.get_collection_name()
+        report = LoadReport(collection_name=collection_name)
+        if len(documents) == 0:
+            return report
+
+        # Create the collection up front instead of discovering it is missing through a failed upsert per batch.
+        document_class.get_or_create_collection()
+
+        batches = list(utils.misc.batch(documents, size=self.batch_size))
+        report.num_batches = len(batches)
+        logger.info(
+            f"Loading {len(documents)} documents into '{collection_name}' "
+            f"({len(batches)} batches of {self.batch_size}, {self.parallelism} in flight)."
+        )
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.parallelism) as executor:
+            future_to_batch = {
+                executor.submit(self._upsert_with_retries, document_class, batch, self.wait, self.skip_unchanged): batch
+                for batch in batches
+            }
+
+            for future in as_completed(future_to_batch):
+                batch = future_to_batch[future]
+                try:
+                    num_retries, num_written_points = future.result()
+                    report.num_retries += num_retries
+                    report.num_points += num_written_points
+                    report.num_skipped_points += len(batch) - num_written_points
+                except Exception:
+                    logger.exception(f"Failed to insert a batch of {len(batch)} documents into '{collection_name}'.")
+                    report.num_failed_points += len(batch)
+
+        if not self.wait and report.num_points > 0:
+            # Final consistency wait, see the class docstring. The batch must really be written for the wait
+            # to apply, so it is not skipped even though it is unchanged by now.
+            try:
+                num_retries, _ = self._upsert_with_retries(document_class, batches[-1], wait=True, skip_unchanged=False)
+                report.num_retries += num_retries
+            except Exception:
+                logger.exception(
+                    f"Failed to wait for the batches of '{collection_name}' to be applied, "
+                    f"the last batch of {len(batches[-1])} documents is counted as failed."
+                )
+                report.num_failed_points += len(batches[-1])
+
+        report.duration_seconds = time.perf_counter() - start_time
+        logger.info(
+            f"Wrote {report.num_points} points into '{collection_name}', skipped {report.num_skipped_points} unchanged "
+            f"in {report.duration_seconds:.2f}s ({report.points_per_second:.1f} points/sec)."
+        )
+
+        return report
+
+    def _upsert_with_retries(
+        self,
+        document_class: type[VectorBaseDocument],
+        documents: list[VectorBaseDocument],
+        wait: bool,
+        skip_unchanged: bool = False,
+    ) -> tuple[int, int]:
+        """
+        Upserts a single batch, retrying transient errors with exponential backoff and jitter.
+
+        Returns:
+            tuple[int, int]: The number of retries that were needed and the number of points written.
+        """
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                num_written_points = document_class._bulk_insert(documents, wait=wait, skip_unchanged=skip_unchanged)
+
+                return attempt, num_written_points
+            except Exception as e:
+                if attempt == self.max_retries or not is_transient_error(e):
+                    raise
+
+                delay = self.retry_backoff_seconds * 2**attempt
+                delay += random.uniform(0, delay)  # jitter, so parallel batches dont retry in lockstep
+                logger.warning(
+                    f"Transient error while upserting into '{document_class.get_collection_name()}': {e!s}. "
+                    f"Retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})."
+                )
+                time.sleep(delay)
+
+        return self.max_retries, 0
+
+
+def is_transient_error(error: Exception) -> bool:
+    """
+    Returns whether a failed Qdrant request is worth retrying.
+    """
+
+    # Raised when the request never got a response (connection reset, timeout...).
+    if isinstance(error, exceptions.ResponseHandlingException):
+        return True
+    if isinstance(error, exceptions.UnexpectedResponse):
+        return error.status_code in TRANSIENT_STATUS_CODES
+    if isinstance(error, grpc.RpcError):
+        return error.code() in TRANSIENT_GRPC_CODES
+
+    return False
@@ -0,0 +1,251 @@
+import gzip
+import hashlib
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Generator
+
+import numpy as np
+from loguru import logger
+from pydantic import BaseModel
+from qdrant_client.http.models import SparseVector
+from qdrant_client.models import Record
+
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.base.vector import DENSE_VECTOR_NAME
+from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.settings import settings
+
+from .bulk_loader import BulkVectorLoader, LoadReport
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.f32"
+PAYLOADS_FILE = "payloads.jsonl.gz"
+
+
+class SnapshotError(Exception):
+    pass
+
+
+class SnapshotManifest(BaseModel):
+    """
+    Describes the files of an exported collection, so an import can check it restores exactly what was exported.
+    """
+
+    collection_name: str
+    num_points: int
+    dim: int
+    embedding_model_id: str
+    vectors_sha256: str
+    payloads_sha256: str
+    created_at: str
+
+    def vectors(self, directory: Path) -> np.ndarray:
+        """
+        Memory maps the vectors: nothing is read from disk until the rows are accessed.
+        """
+
+        if self.num_points == 0 or self.dim == 0:
+            return np.empty((0, self.dim), dtype=np.float32)
+
+        return np.memmap(directory / VECTORS_FILE, dtype=np.float32, mode="r", shape=(self.num_points, self.dim))
+
+
+def export_collection(
+    document_class: type[VectorBaseDocument], directory: Path, batch_size: int = 1000
+) -> SnapshotManifest:
+    """
+    Exports every point of the collection to `directory`:
+        - vectors.f32: the dense vectors as a raw row-major float32 matrix, which can be memory mapped.
+        - payloads.jsonl.gz: one JSON line per point (same order as the vectors) with its id, payload
+            and sparse vector if any.
+        - manifest.json: the point count, vector size and the sha256 of both files.
+
+    Collections without a vector index (e.g. the cleaned documents) are exported as payloads only, with dim=0.
+    """
+
+    collection_name = document_class.get_collection_name()
+    use_vector_index = document_class.get_use_vector_index()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    start_time = time.perf_counter()
+    vectors_digest, payloads_digest = hashlib.sha256(), hashlib.sha256()
+    num_points, num_skipped_points, dim = 0, 0, None
+    with (
+        (directory / VECTORS_FILE).open("wb") as vectors_file,
+        gzip.open(directory / PAYLOADS_FILE, "wb") as payloads_file,
+    ):
+        # the next page is fetched while the current one is written, see `iter_all`.
+        # lean payloads are hydrated, so a snapshot can be restored without the content store.
+        for record in document_class.iter_all(batch_size=batch_size, with_vectors=True, raw=True, hydrate=True):
+            vector, sparse_vector = _split_vectors(record, document_class.get_sparse_vector_name())
+            if use_vector_index and not vector:
+                # a point without its vector can't be searched anyway, it will be embedded again by the pipeline.
+                num_skipped_points += 1
+                continue
+
+            vector_bytes = np.asarray(vector, dtype=np.float32).tobytes() if use_vector_index else b""
+            if use_vector_index and dim is None:
+                dim = len(vector)
+            elif use_vector_index and len(vector) != dim:
+                raise SnapshotError(f"Point {record.id} has a vector of size {len(vector)} instead of {dim}.")
+
+            line = (
+                json.dumps(
+                    {
+                        "id": str(record.id),
+                        "payload": record.payload or {},
+                        "sparse_vector": sparse_vector.model_dump() if sparse_vector is not None else None,
+                    },
+                    default=str,
+                ).encode("utf-8")
+                + b"\n"
+            )
+
+            vectors_file.write(vector_bytes)
+            payloads_file.write(line)
+            vectors_digest.update(vector_bytes)
+            num_points += 1
+
+    # the checksum of the payloads covers the compressed file, which is what an import reads.
+    with (directory / PAYLOADS_FILE).open("rb") as payloads_file:
+        for block in iter(lambda: payloads_file.read(1 << 20), b""):
+            payloads_digest.update(block)
+
+    manifest = SnapshotManifest(
+        collection_name=collection_name,
+        num_points=num_points,
+        dim=dim or 0,
+        embedding_model_id=settings.TEXT_EMBEDDING_MODEL_ID,
+        vectors_sha256=vectors_digest.hexdigest(),
+        payloads_sha256=payloads_digest.hexdigest(),
+        created_at=datetime.now(timezone.utc).isoformat(),
+    )
+    (directory / MANIFEST_FILE).write_text(manifest.model_dump_json(indent=2))
+
+    if num_skipped_points > 0:
+        logger.warning(f"Skipped {num_skipped_points} points of '{collection_name}' without a vector.")
+    logger.info(
+        f"Exported {num_points} points of '{collection_name}' to {directory} "
+        f"in {time.perf_counter() - start_time:.2f}s."
+    )
+
+    return manifest
+
+
+def import_collection(
+    directory: Path,
+    loader: BulkVectorLoader | None = None,
+    recreate: bool = False,
+    window_size: int = 10_000,
+) -> LoadReport:
+    """
+    Verifies the checksums of an exported collection and uploads it back with the (parallel, batched) loader.
+    The points are streamed in windows of `window_size`, so the whole collection is never held in memory.
+
+    Args:
+        directory (Path): The directory written by `export_collection`.
+        loader (BulkVectorLoader | None): The loader used to upload the points, the default one if None.
+        recreate (bool): Drop the existing collection first. Otherwise the collection must be empty.
+        window_size (int): Number of points handed to the loader at once.
+
+    Returns:
+        LoadReport: The upload report of the collection.
+    """
+
+    manifest = read_manifest(directory)
+    verify_checksums(directory, manifest)
+    if manifest.embedding_model_id != settings.TEXT_EMBEDDING_MODEL_ID:
+        logger.warning(
+            f"The snapshot was embedded with '{manifest.embedding_model_id}', "
+            f"while the current embedding model is '{settings.TEXT_EMBEDDING_MODEL_ID}'."
+        )
+
+    document_class = VectorBaseDocument.collection_name_to_class(manifest.collection_name)
+    if recreate and document_class.collection_exists():
+        connection.delete_collection(collection_name=manifest.collection_name)
+        document_class.invalidate_collection_cache()
+    document_class.get_or_create_collection()
+    if _count(manifest.collection_name) > 0:
+        raise SnapshotError(f"Collection '{manifest.collection_name}' is not empty, use recreate=True to replace it.")
+
+    # the points are restored as they are, there is nothing to compare fingerprints with.
+    loader = loader or BulkVectorLoader(skip_unchanged=False)
+    report = LoadReport(collection_name=manifest.collection_name)
+    documents_iterator = _read_documents(directory, manifest, document_class)
+    while documents := list(itertools.islice(documents_iterator, window_size)):
+        window_report = loader.load_class(document_class, documents)
+        report.num_points += window_report.num_points
+        report.num_skipped_points += window_report.num_skipped_points
+        report.num_failed_points += window_report.num_failed_points
+        report.num_batches += window_report.num_batches
+        report.num_retries += window_report.num_retries
+        report.duration_seconds += window_report.duration_seconds
+
+    num_points = _count(manifest.collection_name)
+    if num_points != manifest.num_points:
+        raise SnapshotError(
+            f"Collection '{manifest.collection_name}' has {num_points} points after the import, "
+            f"expected {manifest.num_points}."
+        )
+
+    logger.info(f"Imported {num_points} points into '{manifest.collection_name}' from {directory}.")
+
+    return report
+
+
+def read_manifest(directory: Path) -> SnapshotManifest:
+    manifest_path = directory / MANIFEST_FILE
+    if not manifest_path.exists():
+        raise SnapshotError(f"No snapshot manifest found in {directory}.")
+
+    return SnapshotManifest.model_validate_json(manifest_path.read_text())
+
+
+def verify_checksums(directory: Path, manifest: SnapshotManifest) -> None:
+    expected_checksums = {VECTORS_FILE: manifest.vectors_sha256, PAYLOADS_FILE: manifest.payloads_sha256}
+    for file_name, expected_sha256 in expected_checksums.items():
+        digest = hashlib.sha256()
+        with (directory / file_name).open("rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+
+        if digest.hexdigest() != expected_sha256:
+            raise SnapshotError(f"Checksum mismatch for {directory / file_name}, the snapshot is corrupted.")
+
+    expected_size = manifest.num_points * manifest.dim * np.dtype(np.float32).itemsize
+    if (directory / VECTORS_FILE).stat().st_size != expected_size:
+        raise SnapshotError(
+            f"{directory / VECTORS_FILE} doesn't hold {manifest.num_points} vectors of size {manifest.dim}."
+        )
+
+
+def _read_documents(
+    directory: Path, manifest: SnapshotManifest, document_class: type[VectorBaseDocument]
+) -> Generator[VectorBaseDocument, None, None]:
+    vectors = manifest.vectors(directory)
+    with gzip.open(directory / PAYLOADS_FILE, "rt", encoding="utf-8") as payloads_file:
+        for row, line in enumerate(payloads_file):
+            point = json.loads(line)
+
+            vector = vectors[row].tolist() if manifest.dim > 0 else None
+            if point["sparse_vector"] is not None:
+                vector = {DENSE_VECTOR_NAME: vector, document_class.get_sparse_vector_name(): point["sparse_vector"]}
+
+            yield document_class.from_record(Record(id=point["id"], payload=point["payload"], vector=vector))
+
+
+def _split_vectors(record: Record, sparse_vector_name: str | None) -> tuple[list[float] | None, SparseVector | None]:
+    # collections with a sparse vector return their vectors by name.
+    if isinstance(record.vector, dict):
+        sparse_vector = record.vector.get(sparse_vector_name) if sparse_vector_name is not None else None
+
+        return record.vector.get(DENSE_VECTOR_NAME), sparse_vector
+
+    return record.vector, None
+
+
+def _count(collection_name: str) -> int:
+    return connection.count(collection_name=collection_name, exact=True).count
@@ -1,4 +1,4 @@
 from .embeddings import CrossEncoderModelSingleton, EmbeddingModelSingleton
+from .tokenizers import ServingTokenizerSingleton, WordTokenizer
 
-__all__= ["CrossEncoderModelSingleton", "EmbeddingModelSingleton"]
-
+__all__= ["CrossEncoderModelSingleton", "EmbeddingModelSingleton", "ServingTokenizerSingleton", "WordTokenizer"]
@@ -21,12 +21,12 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
 
     def __init__(
         self, 
-        model_id: str = settings.TEXT_EMBEDDING_MODEL,
+        model_id: str = settings.TEXT_EMBEDDING_MODEL_ID,
         device: str = settings.RAG_MODEL_DEVICE,
         cache_dir: Optional[Path] = None,
     ) -> None:
-        self._model_id = model_id, 
-        self._device = device, 
+        self._model_id = model_id
+        self._device = device
         self._model = SentenceTransformer(
             self._model_id, 
             device = self._device, 
@@ -68,6 +68,8 @@ class EmbeddingModelSingleton(metaclass=SingletonMeta):
             int: Maximum input length of text to tokenize.
         """
 
+        return self._model.max_seq_length
+
     @property
     def tokenizer(self) -> AutoTokenizer:
         """
@@ -129,7 +131,7 @@ class CrossEncoderModelSingleton(metaclass=SingletonMeta):
         Generates the scores of pairs of input text in union format.
         """
 
-        scores = self._model_id.predict(pairs)
+        scores = self._model.predict(pairs)
 
         if to_list:
             scores = scores.tolist()
@@ -0,0 +1,61 @@
+from threading import Lock
+
+from transformers import AutoTokenizer, PreTrainedTokenizerBase
+
+from llm_engineering.settings import settings
+
+from .base import SingletonMeta
+
+
+class ServingTokenizerSingleton(metaclass=SingletonMeta):
+    """
+    A singleton holding the tokenizer of the served LLM, loaded once per process,
+    so prompt budgets are counted in the tokens the model actually sees.
+    """
+
+    def __init__(self, model_id: str = settings.HF_MODEL_ID) -> None:
+        self._model_id = model_id
+        self._tokenizer: PreTrainedTokenizerBase = AutoTokenizer.from_pretrained(
+            model_id, token=settings.HUGGINGFACE_ACCESS_TOKEN
+        )
+
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+
+    def encode(self, text: str) -> list[int]:
+        return self._tokenizer.encode(text, add_special_tokens=False)
+
+    def decode(self, token_ids: list[int]) -> str:
+        return self._tokenizer.decode(token_ids, skip_special_tokens=True)
+
+    def count(self, text: str) -> int:
+        return len(self.encode(text))
+
+
+class WordTokenizer:
+    """
+    One token per whitespace separated word, for the backends without a Hugging Face tokenizer (e.g. the local stub).
+    The token ids index a vocabulary grown as new words are encoded, decoding joins the words with single spaces.
+    """
+
+    def __init__(self) -> None:
+        self._ids: dict[str, int] = {}
+        self._words: list[str] = []
+        self._lock = Lock()
+
+    def encode(self, text: str) -> list[int]:
+        words = text.split()
+        with self._lock:
+            for word in words:
+                if word not in self._ids:
+                    self._ids[word] = len(self._words)
+                    self._words.append(word)
+
+            return [self._ids[word] for word in words]
+
+    def decode(self, token_ids: list[int]) -> str:
+        return " ".join(self._words[token_id] for token_id in token_ids)
+
+    def count(self, text: str) -> int:
+        return len(text.split())
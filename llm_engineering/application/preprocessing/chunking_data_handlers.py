@@ -11,7 +11,9 @@ from llm_engineering.domain.cleaned_documents import (
     CleanedRepositoryDocument,
 )
 
-from .operations import chunk_article, chunk_text
+from qdrant_client.http.models import SparseVector
+
+from .operations import chunk_article, chunk_text, sparse_embed
 
 CleanedDocumentT = TypeVar("CleanedDocumentT", bound=CleanedDocument)
 ChunkT = TypeVar("ChunkT", bound=Chunk)
@@ -21,6 +23,9 @@ class ChunkingDataHandler(ABC, Generic[CleanedDocumentT, ChunkT]):
     Abstract class for the chunking data handlers.
     All data transformations logic for the chunking step is done here.
     """
+
+    # whether the chunks get a sparse lexical vector, used by the hybrid search of their embedded collection.
+    compute_sparse_embeddings: bool = False
     
     @property
     def metadata(self)-> dict:
@@ -34,6 +39,9 @@ class ChunkingDataHandler(ABC, Generic[CleanedDocumentT, ChunkT]):
     def chunk(self, data_model: CleanedDocumentT) -> list[ChunkT]:
         pass 
 
+    def sparse_embedding(self, chunk: str) -> SparseVector | None:
+        return sparse_embed(chunk) if self.compute_sparse_embeddings else None
+
 class PostChunkingHandler(ChunkingDataHandler):
     @property
     def metadata(self) -> dict:
@@ -49,11 +57,11 @@ class PostChunkingHandler(ChunkingDataHandler):
 
         cleaned_content = data_model.content 
         chunks = chunk_text(
-            cleaned_text, 
+            cleaned_content, 
             chunk_size=self.metadata["chunk_size"], chunk_overlap=self.metadata["chunk_overlap"], 
         )
 
-        for chunk in chunks:
+        for chunk_index, chunk in enumerate(chunks):
             # Generating an md5 hash of the chunks content
             # This ensures the same chunk of text always generates the same hash. 
             # It also allows the system to identify whether or not the chunk has already been processed or stored.
@@ -66,14 +74,16 @@ class PostChunkingHandler(ChunkingDataHandler):
                 author_id=data_model.author_id, 
                 author_full_name=data_model.author_full_name, 
                 image = data_model.image if data_model.image else None, 
-                metadata=self.metadata,
+                # the position lets the prompt context merge adjacent chunks of a document.
+                metadata={**self.metadata, "chunk_index": chunk_index},
+                sparse_embedding=self.sparse_embedding(chunk),
             )
 
 
             # Appending all of the models to the data_models_list
             data_models_list.append(model)
 
-            return data_models_list 
+        return data_models_list 
 
 class ArticleChunkingHandler(ChunkingDataHandler):
     @property
@@ -93,7 +103,7 @@ class ArticleChunkingHandler(ChunkingDataHandler):
             max_length=self.metadata["max_length"],
         )
 
-        for chunk in chunks:
+        for chunk_index, chunk in enumerate(chunks):
             chunk_id = hashlib.md5(chunk.encode()).hexdigest()
             model = ArticleChunk(
                 id = UUID(chunk_id, version=4),
@@ -103,7 +113,8 @@ class ArticleChunkingHandler(ChunkingDataHandler):
                 document_id=data_model.id,
                 author_id = data_model.author_id, 
                 author_full_name=data_model.author_full_name,
-                metadata=self.metadata,  
+                metadata={**self.metadata, "chunk_index": chunk_index},
+                sparse_embedding=self.sparse_embedding(chunk),
             )
 
             data_models_list.append(model)
@@ -112,6 +123,8 @@ class ArticleChunkingHandler(ChunkingDataHandler):
 
 
 class RepositoryChunkingHandler(ChunkingDataHandler):
+    compute_sparse_embeddings = True
+
     @property
     def metadata(self)-> dict:
         return {
@@ -129,7 +142,7 @@ class RepositoryChunkingHandler(ChunkingDataHandler):
             chunk_overlap=self.metadata["chunk_overlap"],
         )
 
-        for chunk in chunks:
+        for chunk_index, chunk in enumerate(chunks):
             chunk_id=hashlib.md5(chunk.encode()).hexdigest()
             model = RepositoryChunk(
                 id=UUID(chunk_id, version=4), # make the hashed id a UUID4
@@ -140,7 +153,8 @@ class RepositoryChunkingHandler(ChunkingDataHandler):
                 document_id=data_model.id, 
                 author_id=data_model.author_id, 
                 author_full_name=data_model.author_full_name, 
-                metadata=self.metadata
+                metadata={**self.metadata, "chunk_index": chunk_index},
+                sparse_embedding=self.sparse_embedding(chunk),
             )
 
             data_models_list.append(model)
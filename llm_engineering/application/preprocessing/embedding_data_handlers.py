@@ -11,12 +11,22 @@ from llm_engineering.domain.embedded_chunks import (
 )
 
 from llm_engineering.domain.queries import EmbeddedQuery, Query 
+from llm_engineering.settings import settings
+
+from .query_embedding_cache import QueryEmbeddingCache
 
 ChunkT = TypeVar("ChunkT", bound=Chunk)
 EmbeddedChunkT = TypeVar("EmbeddedChunkT", bound=EmbeddedChunk)
 
 embedding_model = EmbeddingModelSingleton()
 
+query_embedding_cache = QueryEmbeddingCache(
+    model_id=embedding_model.model_id,
+    max_size=settings.QUERY_EMBEDDING_CACHE_SIZE,
+    ttl_seconds=settings.QUERY_EMBEDDING_CACHE_TTL_SECONDS,
+    path=settings.QUERY_EMBEDDING_CACHE_PATH,
+)
+
 
 class EmbeddingDataHandler(ABC, Generic[ChunkT, EmbeddedChunkT]):
     """
@@ -47,6 +57,15 @@ class EmbeddingDataHandler(ABC, Generic[ChunkT, EmbeddedChunkT]):
 
 # Subclass that handles the embedding for Queries    
 class QueryEmbeddingHandler(EmbeddingDataHandler):
+    # Users keep asking the same questions, only the queries missing from the cache go through the model.
+    def embed_batch(self, data_model: list[Query]) -> list[EmbeddedQuery]:
+        embeddings = query_embedding_cache.get_or_embed(
+            [query.content for query in data_model],
+            embed=lambda texts: cast(list[list[float]], embedding_model(texts, to_list=True)),
+        )
+
+        return [self.map_model(query, embeddings[query.content]) for query in data_model if query.content in embeddings]
+
     def map_model(self, data_model: Query, embedding: list[float])-> EmbeddedQuery:
         return EmbeddedQuery(
             id=data_model.id, 
@@ -70,10 +89,12 @@ class PostEmbeddingHandler(EmbeddingDataHandler):
             document_id=data_model.document_id, 
             author_id=data_model.author_id, 
             author_full_name=data_model.author_full_name, 
+            sparse_embedding=data_model.sparse_embedding, 
             metadata={
                 "embedding_model_id": embedding_model.model_id, 
                 "embedding_size": embedding_model.embedding_size, 
                 "max_input_length": embedding_model.max_input_length,
+                "chunk_index": data_model.metadata.get("chunk_index"),
             },
         )
 
@@ -85,13 +106,15 @@ class ArticleEmbeddingHandler(EmbeddingDataHandler):
             embedding=embedding,
             platform=data_model.platform, 
             link=data_model.link, 
-            document_id=data_model.document_id  
+            document_id=data_model.document_id,
             author_id=data_model.author_id, 
             author_full_name=data_model.author_full_name, 
+            sparse_embedding=data_model.sparse_embedding, 
             metadata={
                 "embedding_model_id": embedding_model.model_id, 
                 "embedding_size": embedding_model.embedding_size, 
                 "max_input_length": embedding_model.max_input_length,
+                "chunk_index": data_model.metadata.get("chunk_index"),
             },
         )
 
@@ -107,9 +130,11 @@ class RepositoryEmbeddingHandler(EmbeddingDataHandler):
             document_id=data_model.document_id, 
             author_id=data_model.author_id, 
             author_full_name=data_model.author_full_name, 
+            sparse_embedding=data_model.sparse_embedding, 
             metadata={
                 "embedding_model_id": embedding_model.model_id, 
                 "embedding_size": embedding_model.embedding_size, 
-                "max_input_length": embedding_model.max_input_length
+                "max_input_length": embedding_model.max_input_length,
+                "chunk_index": data_model.metadata.get("chunk_index"),
             }
         )
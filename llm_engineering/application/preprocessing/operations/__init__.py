@@ -1,9 +1,11 @@
 from .chunking import chunk_article, chunk_text
 from .cleaning import clean_text 
+from .sparse import sparse_embed, sparse_embed_query
 
 __all__ = [
     "chunk_article", 
     "chunk_text", 
-    "clean_text"
+    "clean_text",
+    "sparse_embed",
+    "sparse_embed_query",
 ]
-
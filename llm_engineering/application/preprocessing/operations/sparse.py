@@ -0,0 +1,63 @@
+import re
+import zlib
+from collections import Counter
+
+from qdrant_client.http.models import SparseVector
+
+# Words, identifiers (snake_case, camelCase, dotted.names are split on the dots) and numbers.
+TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+# The parts of a camelCase / PascalCase / snake_case identifier, e.g. "HTTPRequestHandler" -> HTTP, Request, Handler.
+IDENTIFIER_PART_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+# BM25 term frequency saturation, the IDF part is applied by Qdrant (`Modifier.IDF` on the sparse vectors config).
+BM25_K1 = 1.2
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased lexical tokens of a text. Code identifiers are kept whole and also split into their parts,
+    so a query for "request handler" matches `RequestHandler` and `request_handler`, while a query for the exact
+    identifier matches it best.
+    """
+
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        token = match.group()
+        if len(token) > 1:
+            tokens.append(token.lower())
+
+        parts = [part for part in IDENTIFIER_PART_PATTERN.findall(token) if len(part) > 1]
+        if len(parts) > 1:
+            tokens.extend(part.lower() for part in parts)
+
+    return tokens
+
+
+def token_index(token: str) -> int:
+    # a stable hash instead of a vocabulary: nothing to fit, store or keep in sync between processes.
+    return zlib.crc32(token.encode("utf-8"))
+
+
+def sparse_embed(text: str) -> SparseVector:
+    """
+    Sparse lexical vector of a document: one dimension per (hashed) token, weighted by its saturated
+    term frequency like in BM25.
+    """
+
+    term_frequencies = Counter(token_index(token) for token in tokenize(text))
+    indices = sorted(term_frequencies)
+
+    return SparseVector(
+        indices=indices,
+        values=[term_frequencies[index] * (BM25_K1 + 1) / (term_frequencies[index] + BM25_K1) for index in indices],
+    )
+
+
+def sparse_embed_query(text: str) -> SparseVector:
+    """
+    Sparse lexical vector of a query: every distinct token counts once, the documents carry the weights.
+    """
+
+    indices = sorted({token_index(token) for token in tokenize(text)})
+
+    return SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,101 @@
+import threading
+from typing import Callable
+
+from llm_engineering.infrastructure.caching import LRUCache, SQLiteCache
+
+
+def normalize_query(text: str) -> str:
+    """
+    Collapses whitespace and case, so trivially different spellings of a question share one embedding.
+    Casefolding is lossless for the uncased MiniLM embedding model.
+    """
+
+    return " ".join(text.split()).casefold()
+
+
+class QueryEmbeddingCache:
+    """
+    Query embeddings keyed by embedding model id and normalized query text.
+
+    An in-process LRU sits in front of an optional SQLite cache shared by all the worker processes of a
+    machine, both expiring entries after `ttl_seconds`. The entries found on disk are promoted to the LRU.
+    """
+
+    def __init__(self, model_id: str, max_size: int, ttl_seconds: float | None = None, path: str | None = None) -> None:
+        self.model_id = model_id
+        self.memory: LRUCache[str, list[float]] = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self.disk = (
+            SQLiteCache(path, namespace=f"query_embeddings:{model_id}", ttl_seconds=ttl_seconds) if path else None
+        )
+
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+
+    def get_many(self, texts: list[str]) -> dict[str, list[float]]:
+        """
+        Returns the cached embeddings of `texts`, keyed by the original texts. The misses are left out.
+        """
+
+        keys = {text: self._key(text) for text in texts}
+        found = self.memory.get_many(list(set(keys.values())))
+
+        missing_keys = [key for key in set(keys.values()) if key not in found]
+        if self.disk is not None and len(missing_keys) > 0:
+            found_on_disk = self.disk.get_many(missing_keys)
+            self.memory.put_many(found_on_disk)
+            found.update(found_on_disk)
+
+        embeddings = {text: found[key] for text, key in keys.items() if key in found}
+        with self._stats_lock:
+            self.hits += len(embeddings)
+            self.misses += len(keys) - len(embeddings)
+
+        return embeddings
+
+    def get_or_embed(self, texts: list[str], embed: Callable[[list[str]], list[list[float]]]) -> dict[str, list[float]]:
+        """
+        Returns the embeddings of `texts` keyed by the original texts, calling `embed` once with the missing ones.
+        Texts sharing a normalized form are embedded once. The texts `embed` fails on are left out.
+        """
+
+        embeddings = self.get_many(texts)
+
+        missing_texts = {self._key(text): text for text in texts if text not in embeddings}
+        if len(missing_texts) > 0:
+            new_entries = dict(zip(missing_texts.keys(), embed(list(missing_texts.values())), strict=False))
+            self._store(new_entries)
+
+            embeddings.update(
+                {
+                    text: new_entries[self._key(text)]
+                    for text in texts
+                    if text not in embeddings and self._key(text) in new_entries
+                }
+            )
+
+        return embeddings
+
+    def put_many(self, embeddings: dict[str, list[float]]) -> None:
+        self._store({self._key(text): embedding for text, embedding in embeddings.items()})
+
+    def stats(self) -> dict[str, float]:
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups > 0 else 0.0,
+            "memory_hit_rate": self.memory.hit_rate,
+            "disk_hit_rate": self.disk.hit_rate if self.disk is not None else 0.0,
+            "memory_size": len(self.memory),
+        }
+
+    def _store(self, entries: dict[str, list[float]]) -> None:
+        self.memory.put_many(entries)
+        if self.disk is not None:
+            self.disk.put_many(entries)
+
+    def _key(self, text: str) -> str:
+        # the LRU belongs to a single model and the model id is part of the SQLite namespace.
+        return normalize_query(text)
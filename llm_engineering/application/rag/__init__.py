@@ -0,0 +1,28 @@
+from .context import ContextBuilder
+from .exact_search import ExactSearchEngine
+from .mmr import diversify_chunks, maximal_marginal_relevance
+from .query_embedder import AsyncQueryEmbedder
+from .retriever import ContextRetriever, RetrievalResult
+from .search import (
+    EMBEDDED_CHUNK_CLASSES,
+    asearch_collections_with_scores,
+    search_collections,
+    search_collections_with_scores,
+)
+from .semantic_cache import SemanticCache, SemanticCacheHit
+
+__all__ = [
+    "EMBEDDED_CHUNK_CLASSES",
+    "AsyncQueryEmbedder",
+    "ContextBuilder",
+    "ContextRetriever",
+    "ExactSearchEngine",
+    "RetrievalResult",
+    "SemanticCache",
+    "SemanticCacheHit",
+    "asearch_collections_with_scores",
+    "diversify_chunks",
+    "maximal_marginal_relevance",
+    "search_collections",
+    "search_collections_with_scores",
+]
@@ -0,0 +1,36 @@
+import asyncio
+from abc import ABC, abstractmethod
+from typing import Any
+
+from langchain.prompts import PromptTemplate
+from pydantic import BaseModel
+
+from llm_engineering.domain.queries import Query
+
+
+class PromptTemplateFactory(ABC, BaseModel):
+    @abstractmethod
+    def create_template(self) -> PromptTemplate:
+        pass
+
+
+class RAGStep(ABC):
+    """
+    One step of the retrieval pipeline. In mock mode the step doesn't call any model,
+    which keeps the pipeline runnable (and testable) without an OpenAI key or a GPU.
+    """
+
+    def __init__(self, mock: bool = False) -> None:
+        self._mock = mock
+
+    @abstractmethod
+    def generate(self, query: Query, *args, **kwargs) -> Any:
+        pass
+
+    async def agenerate(self, query: Query, *args, **kwargs) -> Any:
+        """
+        Asyncio version of `generate`. Steps without a native async implementation run on a worker thread,
+        so they never block the event loop.
+        """
+
+        return await asyncio.to_thread(self.generate, query, *args, **kwargs)
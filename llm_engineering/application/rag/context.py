@@ -0,0 +1,144 @@
+from typing import Protocol
+
+from pydantic import BaseModel
+
+from llm_engineering.application.networks import ServingTokenizerSingleton
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.settings import settings
+
+# The longest overlap looked for between two adjacent chunks, in characters (chunk overlaps are ~100 tokens).
+MAX_OVERLAP_CHARS = 1000
+# Put between the sections of the context.
+SECTION_SEPARATOR = "\n\n"
+
+
+class Tokenizer(Protocol):
+    def encode(self, text: str) -> list[int]: ...
+
+    def decode(self, token_ids: list[int]) -> str: ...
+
+
+class ContextSection(BaseModel):
+    """
+    One or several adjacent chunks of the same document, rendered as one block of the context.
+    """
+
+    chunk: EmbeddedChunk  # the best ranked chunk of the section, for the header fields
+    content: str
+    chunk_indexes: list[int | None]
+
+
+class ContextBuilder:
+    """
+    Assembles the prompt context out of ranked chunks, within a token budget counted with the tokenizer
+    of the served model:
+        - adjacent chunks of the same document are merged into one section, without their overlap;
+        - the sections are packed greedily in rank order, each one truncated to `max_tokens_per_chunk`,
+          their headers and separators counting against the budget as well;
+        - a section that doesn't fit is truncated to the space left (if at least `min_chunk_tokens`), or skipped.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = settings.RAG_CONTEXT_MAX_TOKENS,
+        max_tokens_per_chunk: int = settings.RAG_CONTEXT_MAX_TOKENS_PER_CHUNK,
+        min_chunk_tokens: int = 64,
+        tokenizer: Tokenizer | None = None,
+    ) -> None:
+        self.max_tokens = max_tokens
+        self.max_tokens_per_chunk = max_tokens_per_chunk
+        self.min_chunk_tokens = min_chunk_tokens
+        self._tokenizer = tokenizer or ServingTokenizerSingleton()
+
+    def build(self, chunks: list[EmbeddedChunk]) -> str:
+        """
+        Args:
+            chunks (list[EmbeddedChunk]): The retrieved chunks, best first.
+
+        Returns:
+            str: The context, at most `max_tokens` tokens long.
+        """
+
+        blocks = []
+        tokens_left = self.max_tokens
+        separator_tokens = len(self._tokenizer.encode(SECTION_SEPARATOR))
+        for section in self.merge_adjacent_chunks(chunks):
+            header = self._header(len(blocks) + 1, section.chunk)
+            # every section but the first one is preceded by a separator.
+            header_tokens = len(self._tokenizer.encode(header)) + (separator_tokens if len(blocks) > 0 else 0)
+
+            content_tokens = self._tokenizer.encode(section.content)[: self.max_tokens_per_chunk]
+            content_budget = tokens_left - header_tokens
+            if len(content_tokens) > content_budget:
+                if content_budget < self.min_chunk_tokens:
+                    # a smaller section further down may still fit.
+                    continue
+                content_tokens = content_tokens[:content_budget]
+
+            blocks.append(header + self._tokenizer.decode(content_tokens))
+            tokens_left -= header_tokens + len(content_tokens)
+
+        return SECTION_SEPARATOR.join(blocks)
+
+    def merge_adjacent_chunks(self, chunks: list[EmbeddedChunk]) -> list[ContextSection]:
+        """
+        Merges the chunks that follow each other in their document into one section, the sections being
+        sorted by the rank of their best chunk. Chunks without a position are never merged.
+        """
+
+        ranks = {id(chunk): rank for rank, chunk in enumerate(chunks)}
+        documents: dict[str, list[EmbeddedChunk]] = {}
+        for chunk in chunks:
+            documents.setdefault(str(chunk.document_id), []).append(chunk)
+
+        ranked_sections: list[tuple[int, ContextSection]] = []
+        for document_chunks in documents.values():
+            positioned = sorted(
+                (chunk for chunk in document_chunks if chunk.metadata.get("chunk_index") is not None),
+                key=lambda chunk: chunk.metadata["chunk_index"],
+            )
+            for chunk in positioned:
+                chunk_index = chunk.metadata["chunk_index"]
+                rank = ranks[id(chunk)]
+                previous_rank, previous = ranked_sections[-1] if ranked_sections else (None, None)
+                if (
+                    previous is not None
+                    and previous.chunk.document_id == chunk.document_id
+                    and previous.chunk_indexes[-1] == chunk_index - 1
+                ):
+                    previous.content = _merge_overlapping(previous.content, chunk.content)
+                    previous.chunk_indexes.append(chunk_index)
+                    if rank < previous_rank:
+                        previous.chunk = chunk
+                        ranked_sections[-1] = (rank, previous)
+                else:
+                    ranked_sections.append(
+                        (rank, ContextSection(chunk=chunk, content=chunk.content, chunk_indexes=[chunk_index]))
+                    )
+
+        ranked_sections.extend(
+            (ranks[id(chunk)], ContextSection(chunk=chunk, content=chunk.content, chunk_indexes=[None]))
+            for chunk in chunks
+            if chunk.metadata.get("chunk_index") is None
+        )
+
+        return [section for _, section in sorted(ranked_sections, key=lambda ranked_section: ranked_section[0])]
+
+    @staticmethod
+    def _header(number: int, chunk: EmbeddedChunk) -> str:
+        return (
+            f"Chunk {number}:\n"
+            f"Type: {chunk.__class__.__name__}\n"
+            f"Platform: {chunk.platform}\n"
+            f"Author: {chunk.author_full_name}\n"
+            "Content: "
+        )
+
+
+def _merge_overlapping(text: str, next_text: str) -> str:
+    # chunks are split with an overlap, the end of a chunk is repeated at the start of the next one.
+    for overlap in range(min(len(text), len(next_text), MAX_OVERLAP_CHARS), 0, -1):
+        if text.endswith(next_text[:overlap]):
+            return text + next_text[overlap:]
+
+    return f"{text}\n{next_text}"
@@ -0,0 +1,294 @@
+import threading
+import time
+from typing import ClassVar
+
+import numpy as np
+from loguru import logger
+from qdrant_client.http.models import Filter
+from qdrant_client.models import Record, ScoredPoint
+
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.base.vector import DENSE_VECTOR_NAME
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.infrastructure.db.qdrant import REQUEST_ERRORS, connection
+from llm_engineering.settings import settings
+
+
+class ExactSearchEngine:
+    """
+    Brute-force cosine search over all the vectors of a collection, held in memory as one contiguous float32 matrix.
+
+    It returns the true nearest neighbours, which makes it the oracle used to measure the recall of the
+    approximate (HNSW, quantized) Qdrant searches. On small collections a few matrix multiplications in process
+    are also faster than a network round trip, so it can serve retrieval directly (see `for_small_collection`).
+
+    Only `DocumentFilter` filters can be evaluated in memory, raw Qdrant filters are not supported.
+    """
+
+    # cached engines of the small collections, see `for_small_collection`.
+    _small_collection_engines: ClassVar[dict[type[VectorBaseDocument], tuple["ExactSearchEngine | None", float]]] = {}
+    # one lock per collection, held while its engine is (re)loaded, and the lock guarding the two dicts.
+    _collection_locks: ClassVar[dict[type[VectorBaseDocument], threading.Lock]] = {}
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(
+        self, document_class: type[VectorBaseDocument], block_size: int = settings.EXACT_SEARCH_BLOCK_SIZE
+    ) -> None:
+        self.document_class = document_class
+        self.block_size = block_size
+
+        self._records: list[Record] = []
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        # one column of string values per filterable payload field, compared against the DocumentFilter values.
+        self._columns: dict[str, np.ndarray] = {}
+        self.loaded_at: float | None = None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        The normalized vectors of the collection, one row per point.
+        """
+
+        return self._matrix
+
+    @classmethod
+    def for_small_collection(
+        cls,
+        document_class: type[VectorBaseDocument],
+        max_points: int = settings.EXACT_SEARCH_MAX_POINTS,
+        refresh_seconds: float = settings.EXACT_SEARCH_REFRESH_SECONDS,
+    ) -> "ExactSearchEngine | None":
+        """
+        Returns a loaded engine when the collection has at most `max_points` points, None otherwise.
+        The engine (or the fact that the collection is too large) is cached and reloaded every `refresh_seconds`,
+        so the in-memory copy is never more than `refresh_seconds` behind the collection.
+        Returns None as well when counting or loading the collection fails, so the caller searches Qdrant instead.
+        """
+
+        with cls._lock:
+            engine, loaded_at = cls._small_collection_engines.get(document_class, (None, 0.0))
+            if time.monotonic() - loaded_at < refresh_seconds:
+                return engine
+
+            collection_lock = cls._collection_locks.setdefault(document_class, threading.Lock())
+
+        # loading a collection takes a while, only the callers of the same collection wait for it.
+        with collection_lock:
+            with cls._lock:
+                # another thread may have loaded it while this one was waiting for the lock.
+                engine, loaded_at = cls._small_collection_engines.get(document_class, (None, 0.0))
+                if time.monotonic() - loaded_at < refresh_seconds:
+                    return engine
+
+            collection_name = document_class.get_collection_name()
+            try:
+                if not document_class.collection_exists():
+                    engine = None
+                else:
+                    num_points = connection.count(collection_name=collection_name, exact=True).count
+                    engine = cls(document_class).load() if num_points <= max_points else None
+            except REQUEST_ERRORS:
+                # not cached, the next call tries again.
+                logger.exception(f"Failed to load '{collection_name}' for exact search, searching Qdrant instead.")
+
+                return None
+
+            with cls._lock:
+                cls._small_collection_engines[document_class] = (engine, time.monotonic())
+
+        return engine
+
+    @classmethod
+    def invalidate(cls, document_class: type[VectorBaseDocument] | None = None) -> None:
+        """
+        Drops the cached engine of a collection (all of them by default), e.g. after loading new points.
+        """
+
+        with cls._lock:
+            if document_class is None:
+                cls._small_collection_engines.clear()
+            else:
+                cls._small_collection_engines.pop(document_class, None)
+
+    def load(self, query_filter: Filter | DocumentFilter | None = None) -> "ExactSearchEngine":
+        """
+        Scrolls the whole collection (or the points matching `query_filter`) and stacks the vectors.
+        The vectors are normalized once here, so cosine similarity becomes a plain dot product.
+        """
+
+        start_time = time.perf_counter()
+
+        records, vectors = [], []
+        for record in self.document_class.iter_all(batch_size=1000, filter=query_filter, with_vectors=True, raw=True):
+            # collections with a sparse vector return their vectors by name.
+            vector = record.vector.get(DENSE_VECTOR_NAME) if isinstance(record.vector, dict) else record.vector
+            if not vector:
+                continue
+
+            vectors.append(vector)
+            # the vectors live in the matrix only, no need to keep a second copy in the records.
+            records.append(record.model_copy(update={"vector": None}))
+
+        if len(vectors) > 0:
+            matrix = np.ascontiguousarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(norms == 0, 1.0, norms)
+        else:
+            matrix = np.empty((0, 0), dtype=np.float32)
+
+        self._records = records
+        self._matrix = matrix
+        self._columns = {
+            field_name: np.array([str((record.payload or {}).get(field_name)) for record in records], dtype=object)
+            for field_name in DocumentFilter.model_fields
+        }
+        self.loaded_at = time.monotonic()
+
+        logger.info(
+            f"Loaded {len(records)} vectors of '{self.document_class.get_collection_name()}' for exact search "
+            f"in {time.perf_counter() - start_time:.2f}s ({matrix.nbytes / 1024**2:.1f} MB)."
+        )
+
+        return self
+
+    def search(
+        self, query_vector: list[float], limit: int = 10, query_filter: DocumentFilter | None = None
+    ) -> list[VectorBaseDocument]:
+        results = self.search_batch_with_scores(query_vectors=[query_vector], limit=limit, filters=query_filter)
+
+        return [document for document, _ in results[0]]
+
+    def search_batch_with_scores(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        limit: int = 10,
+        filters: DocumentFilter | list[DocumentFilter | None] | None = None,
+        with_vectors: bool = False,
+    ) -> list[list[tuple[VectorBaseDocument, float]]]:
+        """
+        Same interface as `VectorBaseDocument.search_batch_with_scores`, but exact and in process.
+        The vectors returned with `with_vectors` are the normalized ones, as stored by a cosine collection.
+
+        Returns:
+            list[list[tuple[VectorBaseDocument, float]]]: The documents and their cosine similarity,
+                best first, for each query vector.
+        """
+
+        if len(query_vectors) == 0:
+            return []
+
+        indexes, scores = self.top_k(query_vectors=query_vectors, k=limit, filters=filters)
+
+        # the scores are attached to the records, so hydrating lean payloads can't misalign them.
+        record_groups = [
+            [
+                ScoredPoint(
+                    id=self._records[index].id,
+                    version=0,
+                    score=float(score),
+                    payload=self._records[index].payload,
+                    vector=self._matrix[index].tolist() if with_vectors else None,
+                )
+                for index, score in zip(query_indexes, query_scores, strict=True)
+            ]
+            for query_indexes, query_scores in zip(indexes, scores, strict=True)
+        ]
+
+        return [
+            [(self.document_class.from_record(record), record.score) for record in records]
+            for records in self.document_class.hydrate_record_groups(record_groups)
+        ]
+
+    def top_k(
+        self,
+        query_vectors: list[list[float]] | np.ndarray,
+        k: int = 10,
+        filters: DocumentFilter | list[DocumentFilter | None] | None = None,
+    ) -> tuple[list[np.ndarray], list[np.ndarray]]:
+        """
+        Computes the exact top-k rows of the matrix for each query, one block of rows at a time,
+        so the (queries x block) score matrix stays small whatever the size of the collection.
+
+        Returns:
+            tuple[list[np.ndarray], list[np.ndarray]]: The row indexes and the scores of each query, best first.
+                Queries whose filter matches less than k points get fewer results.
+        """
+
+        queries = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries[np.newaxis, :]
+        queries_norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(queries_norms == 0, 1.0, queries_norms)
+
+        num_queries, num_points = queries.shape[0], self._matrix.shape[0]
+        if num_points == 0 or k <= 0:
+            return [np.empty(0, dtype=np.int64)] * num_queries, [np.empty(0, dtype=np.float32)] * num_queries
+
+        masks = self._filter_masks(filters, num_queries)
+
+        # running top-k of each query: the candidates of a block are merged with the best ones found so far.
+        best_indexes = np.empty((num_queries, 0), dtype=np.int64)
+        best_scores = np.empty((num_queries, 0), dtype=np.float32)
+        for start in range(0, num_points, self.block_size):
+            block = self._matrix[start : start + self.block_size]
+            block_scores = queries @ block.T
+            if masks is not None:
+                block_scores[~masks[:, start : start + block.shape[0]]] = -np.inf
+
+            block_k = min(k, block.shape[0])
+            block_top = np.argpartition(-block_scores, block_k - 1, axis=1)[:, :block_k]
+
+            candidate_indexes = np.concatenate([best_indexes, block_top + start], axis=1)
+            candidate_scores = np.concatenate(
+                [best_scores, np.take_along_axis(block_scores, block_top, axis=1)], axis=1
+            )
+            keep = min(k, candidate_scores.shape[1])
+            top = np.argpartition(-candidate_scores, keep - 1, axis=1)[:, :keep]
+            best_indexes = np.take_along_axis(candidate_indexes, top, axis=1)
+            best_scores = np.take_along_axis(candidate_scores, top, axis=1)
+
+        order = np.argsort(-best_scores, axis=1)
+        best_indexes = np.take_along_axis(best_indexes, order, axis=1)
+        best_scores = np.take_along_axis(best_scores, order, axis=1)
+
+        # the filtered out points are only there to pad the top-k, drop them.
+        valid = np.isfinite(best_scores)
+
+        return (
+            [best_indexes[i][valid[i]] for i in range(num_queries)],
+            [best_scores[i][valid[i]] for i in range(num_queries)],
+        )
+
+    def _filter_masks(
+        self, filters: DocumentFilter | list[DocumentFilter | None] | None, num_queries: int
+    ) -> np.ndarray | None:
+        """
+        Evaluates the filters on the payload columns, as a (queries x points) boolean matrix.
+        """
+
+        if not isinstance(filters, list):
+            filters = [filters] * num_queries
+        if len(filters) != num_queries:
+            raise ValueError("Expected one filter per query vector.")
+        if all(query_filter is None for query_filter in filters):
+            return None
+
+        masks = np.ones((num_queries, len(self._records)), dtype=bool)
+        for i, query_filter in enumerate(filters):
+            if query_filter is None:
+                continue
+            if not isinstance(query_filter, DocumentFilter):
+                raise TypeError("Exact search only supports DocumentFilter filters.")
+
+            # same semantics as `DocumentFilter.to_qdrant`: every set field must match, lists match any item.
+            for field_name, value in query_filter.model_dump(exclude_none=True).items():
+                column = self._columns[field_name]
+                if isinstance(value, list):
+                    masks[i] &= np.isin(column, [str(item) for item in value])
+                else:
+                    masks[i] &= column == str(value)
+
+        return masks
@@ -0,0 +1,90 @@
+import numpy as np
+
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.settings import settings
+
+
+def maximal_marginal_relevance(
+    query_vectors: list[list[float]] | np.ndarray,
+    candidate_vectors: list[list[float]] | np.ndarray,
+    k: int,
+    lambda_mult: float = settings.RAG_MMR_LAMBDA,
+) -> list[int]:
+    """
+    Greedily selects k diverse candidates: each step picks the candidate maximizing
+        lambda_mult * relevance - (1 - lambda_mult) * max similarity to the already selected candidates.
+
+    All the similarities are computed upfront with two matrix multiplications, each step then only updates
+    the running max similarity of every candidate with one row of the (candidates x candidates) matrix.
+
+    Args:
+        query_vectors (list[list[float]] | np.ndarray): One or several query vectors (e.g. the expanded queries),
+            a candidate's relevance being its best cosine similarity to any of them.
+        candidate_vectors (list[list[float]] | np.ndarray): The vectors of the candidates.
+        k (int): Number of candidates selected.
+        lambda_mult (float): 1 ranks by relevance only, 0 by diversity only.
+
+    Returns:
+        list[int]: The indexes of the selected candidates, in selection order.
+    """
+
+    k = min(k, len(candidate_vectors))
+    if k <= 0:
+        return []
+
+    candidates = _normalize(candidate_vectors)
+    num_candidates = candidates.shape[0]
+
+    relevance = (_normalize(query_vectors) @ candidates.T).max(axis=0)
+    similarities = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    max_similarities = similarities[selected[0]].copy()
+    is_selected = np.zeros(num_candidates, dtype=bool)
+    is_selected[selected[0]] = True
+    for _ in range(k - 1):
+        scores = lambda_mult * relevance - (1 - lambda_mult) * max_similarities
+        scores[is_selected] = -np.inf
+        index = int(np.argmax(scores))
+
+        selected.append(index)
+        is_selected[index] = True
+        np.maximum(max_similarities, similarities[index], out=max_similarities)
+
+    return selected
+
+
+def diversify_chunks(
+    query_vectors: list[list[float]] | np.ndarray,
+    chunks: list[EmbeddedChunk],
+    k: int,
+    lambda_mult: float = settings.RAG_MMR_LAMBDA,
+) -> list[EmbeddedChunk]:
+    """
+    Keeps the k most relevant yet diverse chunks, e.g. to avoid feeding the reranker several near-identical chunks
+    of the same document. The chunks must be retrieved with their vectors (`with_vectors=True`). The ones without
+    one can't be compared, they are kept after the selected ones in their original order, on top of the k.
+    """
+
+    with_embedding = [chunk for chunk in chunks if chunk.embedding]
+    without_embedding = [chunk for chunk in chunks if not chunk.embedding]
+    if len(with_embedding) <= k:
+        return with_embedding + without_embedding
+
+    indexes = maximal_marginal_relevance(
+        query_vectors=query_vectors,
+        candidate_vectors=[chunk.embedding for chunk in with_embedding],
+        k=k,
+        lambda_mult=lambda_mult,
+    )
+
+    return [with_embedding[index] for index in indexes] + without_embedding
+
+
+def _normalize(vectors: list[list[float]] | np.ndarray) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+
+    return matrix / np.where(norms == 0, 1.0, norms)
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from llm_engineering.application.preprocessing.embedding_data_handlers import QueryEmbeddingHandler
+from llm_engineering.domain.queries import EmbeddedQuery, Query
+
+
+class AsyncQueryEmbedder:
+    """
+    Embeds queries from coroutines. The queries of the requests arriving within `max_wait_seconds` of each
+    other are embedded together, in one batch on a single worker thread: the model runs once per batch
+    instead of once per request, and the event loop never blocks on it.
+
+    An instance is bound to the event loop it is first used from.
+    """
+
+    def __init__(
+        self, max_batch_size: int = 64, max_wait_seconds: float = 0.002, executor: ThreadPoolExecutor | None = None
+    ) -> None:
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+        self._handler = QueryEmbeddingHandler()
+        # a single thread: the model uses every core already, concurrent calls would only contend.
+        self._executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="query-embedder")
+        self._pending: list[tuple[list[Query], asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+
+    async def embed(self, query: Query) -> EmbeddedQuery:
+        return (await self.embed_batch([query]))[0]
+
+    async def embed_batch(self, queries: list[Query]) -> list[EmbeddedQuery]:
+        if len(queries) == 0:
+            return []
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((queries, future))
+
+        if sum(len(pending_queries) for pending_queries, _ in self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        # the requests cancelled while waiting for the batch are dropped from it.
+        pending = [(queries, future) for queries, future in self._pending if not future.done()]
+        self._pending = []
+        if len(pending) == 0:
+            return
+
+        batch = [query for queries, _ in pending for query in queries]
+        embedding_future = asyncio.get_running_loop().run_in_executor(self._executor, self._handler.embed_batch, batch)
+        embedding_future.add_done_callback(partial(self._dispatch, pending))
+
+    @staticmethod
+    def _dispatch(pending: list[tuple[list[Query], asyncio.Future]], embedding_future: asyncio.Future) -> None:
+        error = embedding_future.exception() if not embedding_future.cancelled() else asyncio.CancelledError()
+        embedded_queries = embedding_future.result() if error is None else []
+
+        start = 0
+        for queries, future in pending:
+            if not future.done():
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(embedded_queries[start : start + len(queries)])
+            start += len(queries)
@@ -0,0 +1,58 @@
+from langchain_openai import ChatOpenAI
+from loguru import logger
+
+from llm_engineering.domain.queries import Query
+from llm_engineering.settings import settings
+
+from .base import RAGStep
+from .prompt_templates import QueryExpansionTemplate
+
+
+class QueryExpansion(RAGStep):
+    def generate(self, query: Query, expand_to_n: int) -> list[Query]:
+        """
+        Rewrites the query into `expand_to_n` variants (the original one included), so the search
+        covers several phrasings of the same question.
+        """
+
+        assert expand_to_n > 0, f"'expand_to_n' should be greater than 0. Got {expand_to_n}."
+
+        if self._mock:
+            return [query for _ in range(expand_to_n)]
+
+        query_expansion_template = QueryExpansionTemplate()
+        chain = self._chain(query_expansion_template, expand_to_n)
+        response = chain.invoke({"question": query.content})
+
+        return self._split_queries(query, response.content, query_expansion_template.separator, expand_to_n)
+
+    async def agenerate(self, query: Query, expand_to_n: int) -> list[Query]:
+        assert expand_to_n > 0, f"'expand_to_n' should be greater than 0. Got {expand_to_n}."
+
+        if self._mock:
+            return [query for _ in range(expand_to_n)]
+
+        query_expansion_template = QueryExpansionTemplate()
+        chain = self._chain(query_expansion_template, expand_to_n)
+        response = await chain.ainvoke({"question": query.content})
+
+        return self._split_queries(query, response.content, query_expansion_template.separator, expand_to_n)
+
+    def _chain(self, query_expansion_template: QueryExpansionTemplate, expand_to_n: int):
+        prompt = query_expansion_template.create_template(expand_to_n - 1)
+        model = ChatOpenAI(model=settings.OPENAI_MODEL_ID, api_key=settings.OPENAI_API_KEY, temperature=0)
+
+        return prompt | model
+
+    def _split_queries(self, query: Query, result: str, separator: str, expand_to_n: int) -> list[Query]:
+        queries_content = result.strip().split(separator)
+
+        queries = [query]
+        queries += [
+            query.replace_content(stripped_content)
+            for content in queries_content
+            if (stripped_content := content.strip())
+        ]
+        logger.info(f"Expanded the query into {len(queries)} queries.")
+
+        return queries[:expand_to_n]
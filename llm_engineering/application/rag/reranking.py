@@ -0,0 +1,29 @@
+from llm_engineering.application.networks import CrossEncoderModelSingleton
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.domain.queries import Query
+
+from .base import RAGStep
+
+
+class Reranker(RAGStep):
+    def __init__(self, mock: bool = False) -> None:
+        super().__init__(mock=mock)
+
+        # the cross-encoder is only loaded when it is actually used.
+        self._model = CrossEncoderModelSingleton() if not mock else None
+
+    def generate(self, query: Query, chunks: list[EmbeddedChunk], keep_top_k: int) -> list[EmbeddedChunk]:
+        """
+        Scores every (query, chunk) pair with the cross-encoder, in a single batch, and keeps the best ones.
+        """
+
+        if self._mock or len(chunks) == 0:
+            return chunks[:keep_top_k]
+
+        query_doc_tuples = [(query.content, chunk.content) for chunk in chunks]
+        scores = self._model(query_doc_tuples)
+
+        scored_query_doc_tuples = list(zip(scores, chunks, strict=True))
+        scored_query_doc_tuples.sort(key=lambda x: x[0], reverse=True)
+
+        return [chunk for _, chunk in scored_query_doc_tuples[:keep_top_k]]
@@ -0,0 +1,344 @@
+import asyncio
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from loguru import logger
+from pydantic import BaseModel, Field
+
+from llm_engineering.application.preprocessing.embedding_data_handlers import QueryEmbeddingHandler
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.domain.queries import EmbeddedQuery, Query
+from llm_engineering.settings import settings
+
+from .mmr import diversify_chunks
+from .query_embedder import AsyncQueryEmbedder
+from .query_expansion import QueryExpansion
+from .reranking import Reranker
+from .search import asearch_collections_with_scores, search_collections_with_scores
+from .self_query import SelfQuery
+from .semantic_cache import SemanticCache, SemanticCacheHit
+
+
+class RetrievalResult(BaseModel):
+    """
+    The chunks retrieved for a query, with the time spent in each stage of the retrieval.
+    """
+
+    query: Query
+    chunks: list[EmbeddedChunk] = Field(default_factory=list)
+    stage_seconds: dict[str, float] = Field(default_factory=dict)
+    skipped_stages: list[str] = Field(default_factory=list)
+    cache_hit: bool = False
+    cached_answer: str | None = None  # the answer generated for a similar query, if any
+    cache_entry_id: str | None = None  # see `SemanticCache.set_answer`
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(self.stage_seconds.values())
+
+
+class ContextRetriever:
+    """
+    Retrieves the context of a RAG request:
+        1. self-query (extracts the author) and query expansion run concurrently, both being LLM calls;
+        2. the expanded queries are embedded in a single batch;
+        3. every embedded chunk collection is searched concurrently with all the queries, scoped to the author,
+           and the results are deduplicated by chunk id (see `search_collections_with_scores`). With
+           `hybrid_search`, the collections with a sparse lexical vector are searched with the query terms too;
+        4. with `mmr_top_k`, only that many relevant yet diverse candidates are kept (maximal marginal relevance),
+           so the cross-encoder doesn't score several near-identical chunks of the same document;
+        5. the candidates are reranked with the cross-encoder and the top-k are kept.
+
+    With a latency budget, the optional stages (self-query, query expansion, reranking) are skipped, or stopped
+    being waited for, once the budget is spent: the request then falls back to the original query, no author
+    filter or the similarity order. Embedding and search always run.
+
+    With a semantic cache, a query similar enough to a cached one returns the cached chunks (and answer)
+    right after the self-query, without waiting for the expansion, searching or reranking.
+
+    `aretrieve` runs the same stages on the event loop, for serving many concurrent requests per worker:
+    the LLM calls and the collection searches are async requests, the queries of concurrent requests are
+    embedded in shared batches (see `AsyncQueryEmbedder`), and the stages still running when the request
+    is cancelled (e.g. by `asyncio.timeout`) are cancelled with it.
+    """
+
+    def __init__(
+        self,
+        mock: bool = False,
+        latency_budget_seconds: float | None = None,
+        semantic_cache: SemanticCache | None = None,
+        mmr_top_k: int | None = None,
+        hybrid_search: bool | None = None,
+    ) -> None:
+        self._query_expander = QueryExpansion(mock=mock)
+        self._metadata_extractor = SelfQuery(mock=mock)
+        self._reranker = Reranker(mock=mock)
+        self._embedding_handler = QueryEmbeddingHandler()
+        self._async_embedder = AsyncQueryEmbedder()
+        if semantic_cache is None and settings.SEMANTIC_CACHE_ENABLED:
+            semantic_cache = SemanticCache()
+        self._semantic_cache = semantic_cache
+
+        # 0 (the default setting) disables the budget.
+        if latency_budget_seconds is None:
+            latency_budget_seconds = settings.RAG_LATENCY_BUDGET_SECONDS
+        self.latency_budget_seconds = latency_budget_seconds if latency_budget_seconds > 0 else None
+
+        # 0 (the default setting) disables the MMR stage.
+        if mmr_top_k is None:
+            mmr_top_k = settings.RAG_MMR_TOP_K
+        self.mmr_top_k = mmr_top_k if mmr_top_k > 0 else None
+
+        if hybrid_search is None:
+            hybrid_search = settings.RAG_HYBRID_SEARCH
+        self.hybrid_search = hybrid_search
+
+    @property
+    def semantic_cache(self) -> SemanticCache | None:
+        return self._semantic_cache
+
+    def search(self, query: str, k: int = 3, expand_to_n_queries: int = 3) -> list[EmbeddedChunk]:
+        return self.retrieve(query, k=k, expand_to_n_queries=expand_to_n_queries).chunks
+
+    def retrieve(self, query: str, k: int = 3, expand_to_n_queries: int = 3) -> RetrievalResult:
+        """
+        Args:
+            query (str): The user question.
+            k (int): Number of chunks returned, also the number of chunks retrieved per query and collection.
+            expand_to_n_queries (int): Number of query variants searched, the original one included.
+
+        Returns:
+            RetrievalResult: The top-k chunks, best first, with the per-stage timings.
+        """
+
+        start_time = time.perf_counter()
+        result = RetrievalResult(query=Query.from_str(query))
+
+        # --- self-query and query expansion ---
+        stage_start = time.perf_counter()
+        # one executor per request: a timed out LLM call keeps its thread busy, it must not delay the next requests.
+        executor = ThreadPoolExecutor(max_workers=2)
+        try:
+            self_query_future = executor.submit(self._metadata_extractor.generate, result.query.model_copy())
+            expansion_future = executor.submit(self._query_expander.generate, result.query, expand_to_n_queries)
+
+            query_with_author = self._wait(self_query_future, start_time, stage="self_query", result=result)
+            if query_with_author is not None:
+                result.query = query_with_author
+            result.stage_seconds["self_query"] = time.perf_counter() - stage_start
+
+            # --- semantic cache ---
+            if self._semantic_cache is not None:
+                stage_start = time.perf_counter()
+                embedded_query = self._embedding_handler.embed(result.query)
+                cache_hit = self._semantic_cache.lookup(embedded_query, k=k, expand_to_n_queries=expand_to_n_queries)
+                result.stage_seconds["semantic_cache"] = time.perf_counter() - stage_start
+                if cache_hit is not None:
+                    expansion_future.cancel()
+
+                    return self._cache_hit_result(result, cache_hit, k=k)
+
+            stage_start = time.perf_counter()
+            queries = self._wait(expansion_future, start_time, stage="query_expansion", result=result)
+            queries = self._with_author(queries or [result.query], result.query)
+            # the expansion ran concurrently with the previous stages, this is only the time left waiting for it.
+            result.stage_seconds["query_expansion"] = time.perf_counter() - stage_start
+        finally:
+            # not waiting for a timed out LLM call, it keeps running in the background until its own timeout.
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        # --- embedding ---
+        stage_start = time.perf_counter()
+        embedded_queries: list[EmbeddedQuery] = self._embedding_handler.embed_batch(queries)
+        result.stage_seconds["embedding"] = time.perf_counter() - stage_start
+
+        # --- search ---
+        stage_start = time.perf_counter()
+        query_filter = DocumentFilter.by_author(result.query.author_id) if result.query.author_id else None
+        query_vectors = [embedded_query.embedding for embedded_query in embedded_queries]
+        candidates = search_collections_with_scores(
+            query_vectors=query_vectors,
+            limit=k,
+            filters=query_filter,
+            # MMR compares the candidates with each other, it needs their vectors.
+            with_vectors=self.mmr_top_k is not None,
+            query_texts=self._query_texts(embedded_queries),
+        )
+        chunks = [chunk for chunk, _ in candidates]
+        num_candidates = len(chunks)
+        result.stage_seconds["search"] = time.perf_counter() - stage_start
+
+        # --- diversification ---
+        if self.mmr_top_k is not None:
+            stage_start = time.perf_counter()
+            chunks = diversify_chunks(query_vectors=query_vectors, chunks=chunks, k=max(self.mmr_top_k, k))
+            result.stage_seconds["mmr"] = time.perf_counter() - stage_start
+
+        # --- reranking ---
+        stage_start = time.perf_counter()
+        budget_left = self._budget_left(start_time)
+        if budget_left is None or budget_left > 0:
+            result.chunks = self._reranker.generate(query=result.query, chunks=chunks, keep_top_k=k)
+        else:
+            # the candidates are already sorted by similarity (or in MMR selection order).
+            result.chunks = chunks[:k]
+            result.skipped_stages.append("rerank")
+        result.stage_seconds["rerank"] = time.perf_counter() - stage_start
+
+        # a degraded retrieval (skipped stages) isn't worth serving to the following similar queries.
+        if self._semantic_cache is not None and len(result.skipped_stages) == 0:
+            result.cache_entry_id = self._semantic_cache.store(
+                embedded_query, result.chunks, k=k, expand_to_n_queries=expand_to_n_queries
+            )
+
+        logger.info(
+            f"Retrieved {len(result.chunks)} chunks out of {num_candidates} candidates "
+            f"in {time.perf_counter() - start_time:.3f}s (skipped stages: {result.skipped_stages or 'none'})."
+        )
+
+        return result
+
+    async def asearch(self, query: str, k: int = 3, expand_to_n_queries: int = 3) -> list[EmbeddedChunk]:
+        return (await self.aretrieve(query, k=k, expand_to_n_queries=expand_to_n_queries)).chunks
+
+    async def aretrieve(self, query: str, k: int = 3, expand_to_n_queries: int = 3) -> RetrievalResult:
+        """
+        Asyncio version of `retrieve`, see the class docstring.
+        """
+
+        start_time = time.perf_counter()
+        result = RetrievalResult(query=Query.from_str(query))
+
+        # --- self-query and query expansion ---
+        stage_start = time.perf_counter()
+        self_query_task = asyncio.create_task(self._metadata_extractor.agenerate(result.query.model_copy()))
+        expansion_task = asyncio.create_task(self._query_expander.agenerate(result.query, expand_to_n_queries))
+        try:
+            query_with_author = await self._await(self_query_task, start_time, stage="self_query", result=result)
+            if query_with_author is not None:
+                result.query = query_with_author
+            result.stage_seconds["self_query"] = time.perf_counter() - stage_start
+
+            # --- semantic cache ---
+            if self._semantic_cache is not None:
+                stage_start = time.perf_counter()
+                embedded_query = await self._async_embedder.embed(result.query)
+                cache_hit = await asyncio.to_thread(
+                    self._semantic_cache.lookup, embedded_query, k=k, expand_to_n_queries=expand_to_n_queries
+                )
+                result.stage_seconds["semantic_cache"] = time.perf_counter() - stage_start
+                if cache_hit is not None:
+                    return self._cache_hit_result(result, cache_hit, k=k)
+
+            stage_start = time.perf_counter()
+            queries = await self._await(expansion_task, start_time, stage="query_expansion", result=result)
+            queries = self._with_author(queries or [result.query], result.query)
+            result.stage_seconds["query_expansion"] = time.perf_counter() - stage_start
+        finally:
+            # on a cache hit, an error or the request being cancelled.
+            for task in (self_query_task, expansion_task):
+                if not task.done():
+                    task.cancel()
+
+        # --- embedding ---
+        stage_start = time.perf_counter()
+        embedded_queries: list[EmbeddedQuery] = await self._async_embedder.embed_batch(queries)
+        result.stage_seconds["embedding"] = time.perf_counter() - stage_start
+
+        # --- search ---
+        stage_start = time.perf_counter()
+        query_filter = DocumentFilter.by_author(result.query.author_id) if result.query.author_id else None
+        query_vectors = [embedded_query.embedding for embedded_query in embedded_queries]
+        candidates = await asearch_collections_with_scores(
+            query_vectors=query_vectors,
+            limit=k,
+            filters=query_filter,
+            with_vectors=self.mmr_top_k is not None,
+            query_texts=self._query_texts(embedded_queries),
+        )
+        chunks = [chunk for chunk, _ in candidates]
+        num_candidates = len(chunks)
+        result.stage_seconds["search"] = time.perf_counter() - stage_start
+
+        # --- diversification ---
+        if self.mmr_top_k is not None:
+            stage_start = time.perf_counter()
+            chunks = diversify_chunks(query_vectors=query_vectors, chunks=chunks, k=max(self.mmr_top_k, k))
+            result.stage_seconds["mmr"] = time.perf_counter() - stage_start
+
+        # --- reranking ---
+        stage_start = time.perf_counter()
+        budget_left = self._budget_left(start_time)
+        if budget_left is None or budget_left > 0:
+            result.chunks = await self._reranker.agenerate(query=result.query, chunks=chunks, keep_top_k=k)
+        else:
+            result.chunks = chunks[:k]
+            result.skipped_stages.append("rerank")
+        result.stage_seconds["rerank"] = time.perf_counter() - stage_start
+
+        if self._semantic_cache is not None and len(result.skipped_stages) == 0:
+            result.cache_entry_id = await asyncio.to_thread(
+                self._semantic_cache.store, embedded_query, result.chunks, k=k, expand_to_n_queries=expand_to_n_queries
+            )
+
+        logger.info(
+            f"Retrieved {len(result.chunks)} chunks out of {num_candidates} candidates "
+            f"in {time.perf_counter() - start_time:.3f}s (skipped stages: {result.skipped_stages or 'none'})."
+        )
+
+        return result
+
+    async def _await(self, task: asyncio.Task, start_time: float, stage: str, result: RetrievalResult):
+        try:
+            # unlike the threads of `_wait`, a timed out task is cancelled.
+            return await asyncio.wait_for(task, timeout=self._budget_left(start_time))
+        except TimeoutError:
+            logger.warning(f"The latency budget is spent, skipping the {stage} stage.")
+        except Exception:
+            logger.exception(f"The {stage} stage failed, skipping it.")
+
+        result.skipped_stages.append(stage)
+
+        return None
+
+    @staticmethod
+    def _cache_hit_result(result: RetrievalResult, cache_hit: SemanticCacheHit, k: int) -> RetrievalResult:
+        result.chunks = cache_hit.chunks[:k]
+        result.cache_hit = True
+        result.cached_answer = cache_hit.answer
+        # the answer of an entry is generated from its own k chunks, a smaller k must not overwrite it.
+        result.cache_entry_id = cache_hit.entry_id if cache_hit.k == k else None
+
+        return result
+
+    def _query_texts(self, queries: list[Query]) -> list[str] | None:
+        # the collections with a sparse vector are also searched with the terms of the queries.
+        return [query.content for query in queries] if self.hybrid_search else None
+
+    @staticmethod
+    def _with_author(queries: list[Query], query_with_author: Query) -> list[Query]:
+        # the expansion ran on the original query, the author comes from the self-query.
+        author = {"author_id": query_with_author.author_id, "author_full_name": query_with_author.author_full_name}
+
+        return [expanded_query.model_copy(update=author) for expanded_query in queries]
+
+    def _wait(self, future: Future, start_time: float, stage: str, result: RetrievalResult):
+        try:
+            return future.result(timeout=self._budget_left(start_time))
+        except FutureTimeoutError:
+            logger.warning(f"The latency budget is spent, skipping the {stage} stage.")
+        except Exception:
+            # a failing LLM call degrades the retrieval, it doesn't fail it.
+            logger.exception(f"The {stage} stage failed, skipping it.")
+
+        result.skipped_stages.append(stage)
+
+        return None
+
+    def _budget_left(self, start_time: float) -> float | None:
+        if self.latency_budget_seconds is None:
+            return None
+
+        return max(0.0, self.latency_budget_seconds - (time.perf_counter() - start_time))
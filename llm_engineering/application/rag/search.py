@@ -0,0 +1,337 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from loguru import logger
+from qdrant_client.http.models import Filter
+
+from llm_engineering.application.preprocessing.operations import sparse_embed_query
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.embedded_chunks import (
+    EmbeddedArticleChunk,
+    EmbeddedChunk,
+    EmbeddedPostChunk,
+    EmbeddedRepositoryChunk,
+)
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.settings import settings
+
+from .exact_search import ExactSearchEngine
+
+# The collections a retrieval request searches by default.
+EMBEDDED_CHUNK_CLASSES: list[type[EmbeddedChunk]] = [EmbeddedPostChunk, EmbeddedArticleChunk, EmbeddedRepositoryChunk]
+
+
+def search_collections(
+    query_vectors: list[list[float]],
+    limit: int = 10,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+    document_classes: list[type[VectorBaseDocument]] | None = None,
+    top_k: int | None = None,
+    **kwargs,
+) -> list[VectorBaseDocument]:
+    """
+    Searches several collections with several query vectors and merges everything into one ranking.
+    See `search_collections_with_scores` for the arguments.
+
+    Returns:
+        list[VectorBaseDocument]: The unique documents found, best scores first.
+    """
+
+    results = search_collections_with_scores(
+        query_vectors=query_vectors,
+        limit=limit,
+        filters=filters,
+        document_classes=document_classes,
+        top_k=top_k,
+        **kwargs,
+    )
+
+    return [document for document, _ in results]
+
+
+def search_collections_with_scores(
+    query_vectors: list[list[float]],
+    limit: int = 10,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+    document_classes: list[type[VectorBaseDocument]] | None = None,
+    top_k: int | None = None,
+    query_texts: list[str] | None = None,
+    **kwargs,
+) -> list[tuple[VectorBaseDocument, float]]:
+    """
+    Fans the query vectors out to every collection concurrently, with one batched search request per collection,
+    so a retrieval request costs a single round trip of latency no matter how many queries and collections it has.
+
+    Args:
+        query_vectors (list[list[float]]): The query vectors to search with.
+        limit (int): Number of documents returned per query vector and per collection.
+        filters (Filter | DocumentFilter | list | None): A filter applied to every query, or one per query,
+            e.g. `DocumentFilter.by_author(author_id)` to only retrieve the chunks of one author.
+        document_classes (list[type[VectorBaseDocument]] | None): The collections to search,
+            all the embedded chunk collections by default.
+        top_k (int | None): Number of documents kept after merging, all of them by default.
+        query_texts (list[str] | None): The text of each query vector. When given, the collections with a sparse
+            lexical vector are searched with both vectors (see `VectorBaseDocument.hybrid_search`), one request
+            per query. The other collections only use the dense vectors.
+
+    Returns:
+        list[tuple[VectorBaseDocument, float]]: The unique documents with their best score, sorted by score.
+    """
+
+    if document_classes is None:
+        document_classes = EMBEDDED_CHUNK_CLASSES
+    if len(query_vectors) == 0 or len(document_classes) == 0:
+        return []
+    if query_texts is not None and len(query_texts) != len(query_vectors):
+        raise ValueError("Expected one query text per query vector.")
+
+    with ThreadPoolExecutor(max_workers=len(document_classes)) as executor:
+        futures = [
+            executor.submit(
+                _search_collection,
+                document_class,
+                query_vectors=query_vectors,
+                limit=limit,
+                filters=filters,
+                query_texts=query_texts,
+                **kwargs,
+            )
+            for document_class in document_classes
+        ]
+        collections_results = [future.result() for future in futures]
+
+    return _merge_results(collections_results, top_k=top_k)
+
+
+async def asearch_collections_with_scores(
+    query_vectors: list[list[float]],
+    limit: int = 10,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+    document_classes: list[type[VectorBaseDocument]] | None = None,
+    top_k: int | None = None,
+    query_texts: list[str] | None = None,
+    timeout_seconds: float | None = None,
+    **kwargs,
+) -> list[tuple[VectorBaseDocument, float]]:
+    """
+    Asyncio version of `search_collections_with_scores`: every collection is searched by its own task on the
+    async Qdrant client, so concurrent requests share the event loop instead of holding a thread each.
+
+    Args:
+        timeout_seconds (float | None): Deadline of the call. The collections that didn't answer in time are
+            left out of the results (and their requests cancelled), no deadline by default.
+        See `search_collections_with_scores` for the other arguments.
+
+    Returns:
+        list[tuple[VectorBaseDocument, float]]: The unique documents with their best score, sorted by score.
+    """
+
+    if document_classes is None:
+        document_classes = EMBEDDED_CHUNK_CLASSES
+    if len(query_vectors) == 0 or len(document_classes) == 0:
+        return []
+    if query_texts is not None and len(query_texts) != len(query_vectors):
+        raise ValueError("Expected one query text per query vector.")
+
+    tasks = [
+        asyncio.create_task(
+            _asearch_collection(
+                document_class,
+                query_vectors=query_vectors,
+                limit=limit,
+                filters=filters,
+                query_texts=query_texts,
+                **kwargs,
+            )
+        )
+        for document_class in document_classes
+    ]
+    try:
+        done, pending = await asyncio.wait(tasks, timeout=timeout_seconds)
+    finally:
+        # the caller being cancelled (or timed out) cancels the searches still running as well.
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+    if len(pending) > 0:
+        logger.warning(f"{len(pending)} out of {len(tasks)} collections didn't answer within {timeout_seconds}s.")
+
+    collections_results = []
+    for task in tasks:
+        if task not in done:
+            continue
+        if task.exception() is not None:
+            # a failing collection degrades the results, it doesn't fail the request.
+            logger.opt(exception=task.exception()).error("A collection search failed, skipping it.")
+            continue
+        collections_results.append(task.result())
+
+    return _merge_results(collections_results, top_k=top_k)
+
+
+def _merge_results(
+    collections_results: list[list[list[tuple[VectorBaseDocument, float]]]], top_k: int | None
+) -> list[tuple[VectorBaseDocument, float]]:
+    # The same document is usually found by several query vectors, keep its best score only.
+    best_scores: dict[str, tuple[VectorBaseDocument, float]] = {}
+    for collection_results in collections_results:
+        for query_results in collection_results:
+            for document, score in query_results:
+                key = str(document.id)
+                if key not in best_scores or score > best_scores[key][1]:
+                    best_scores[key] = (document, score)
+
+    merged_results = sorted(best_scores.values(), key=lambda result: result[1], reverse=True)
+
+    return merged_results[:top_k] if top_k is not None else merged_results
+
+
+def _search_collection(
+    document_class: type[VectorBaseDocument],
+    query_vectors: list[list[float]],
+    limit: int,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None,
+    query_texts: list[str] | None = None,
+    **kwargs,
+) -> list[list[tuple[VectorBaseDocument, float]]]:
+    if query_texts is not None and document_class.get_sparse_vector_name() is not None:
+        return _hybrid_search_collection(
+            document_class, query_vectors=query_vectors, query_texts=query_texts, limit=limit, filters=filters, **kwargs
+        )
+
+    results = _exact_search_collection(
+        document_class, query_vectors=query_vectors, limit=limit, filters=filters, **kwargs
+    )
+    if results is not None:
+        return results
+
+    return document_class.search_batch_with_scores(query_vectors=query_vectors, limit=limit, filters=filters, **kwargs)
+
+
+async def _asearch_collection(
+    document_class: type[VectorBaseDocument],
+    query_vectors: list[list[float]],
+    limit: int,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None,
+    query_texts: list[str] | None = None,
+    **kwargs,
+) -> list[list[tuple[VectorBaseDocument, float]]]:
+    if query_texts is not None and document_class.get_sparse_vector_name() is not None:
+        # the hybrid search only has a blocking version.
+        return await asyncio.to_thread(
+            _hybrid_search_collection,
+            document_class,
+            query_vectors=query_vectors,
+            query_texts=query_texts,
+            limit=limit,
+            filters=filters,
+            **kwargs,
+        )
+
+    if settings.EXACT_SEARCH_MAX_POINTS > 0:
+        # loading or searching the in-memory copy is blocking work, keep it off the event loop.
+        results = await asyncio.to_thread(
+            _exact_search_collection,
+            document_class,
+            query_vectors=query_vectors,
+            limit=limit,
+            filters=filters,
+            **kwargs,
+        )
+        if results is not None:
+            return results
+
+    return await document_class.asearch_batch_with_scores(
+        query_vectors=query_vectors, limit=limit, filters=filters, **kwargs
+    )
+
+
+def _hybrid_search_collection(
+    document_class: type[VectorBaseDocument],
+    query_vectors: list[list[float]],
+    query_texts: list[str],
+    limit: int,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None,
+    **kwargs,
+) -> list[list[tuple[VectorBaseDocument, float]]]:
+    """
+    Searches a collection with the dense and the sparse lexical vector of each query. The fused (RRF) scores
+    only rank the documents within the collection, so the candidates are scored with their cosine similarity
+    to the query instead, to be merged with the results of the other collections.
+    """
+
+    filters_list = filters if isinstance(filters, list) else [filters] * len(query_vectors)
+    if len(filters_list) != len(query_vectors):
+        raise ValueError("Expected one filter per query vector.")
+    with_vectors = kwargs.pop("with_vectors", False)
+
+    results = []
+    for query_vector, query_text, query_filter in zip(query_vectors, query_texts, filters_list, strict=True):
+        query_results = document_class.hybrid_search_with_scores(
+            query_vector,
+            sparse_embed_query(query_text),
+            limit,
+            query_filter=query_filter,
+            # the dense vectors are needed for the cosine scores.
+            with_vectors=True,
+            **kwargs,
+        )
+        results.append(_with_cosine_scores(query_vector, query_results, keep_vectors=with_vectors))
+
+    return results
+
+
+def _with_cosine_scores(
+    query_vector: list[float], results: list[tuple[VectorBaseDocument, float]], keep_vectors: bool
+) -> list[tuple[VectorBaseDocument, float]]:
+    query = np.asarray(query_vector, dtype=np.float32)
+    query_norm = np.linalg.norm(query)
+
+    scored_results = []
+    for document, _ in results:
+        vector = np.asarray(getattr(document, "embedding", None) or [], dtype=np.float32)
+        norm = np.linalg.norm(vector) * query_norm
+        # a document without a dense vector ranks last.
+        score = float(vector @ query / norm) if vector.shape == query.shape and norm > 0 else 0.0
+        if not keep_vectors:
+            document = document.model_copy(update={"embedding": None, "sparse_embedding": None})
+        scored_results.append((document, score))
+
+    return scored_results
+
+
+def _exact_search_collection(
+    document_class: type[VectorBaseDocument],
+    query_vectors: list[list[float]],
+    limit: int,
+    filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None,
+    **kwargs,
+) -> list[list[tuple[VectorBaseDocument, float]]] | None:
+    """
+    Searches small collections exactly in process when enabled (EXACT_SEARCH_MAX_POINTS), as long as
+    the filters can be evaluated in memory. Returns None when the collection must be searched in Qdrant.
+    """
+
+    filters_list = filters if isinstance(filters, list) else [filters]
+    supports_exact_search = all(
+        query_filter is None or isinstance(query_filter, DocumentFilter) for query_filter in filters_list
+    )
+    if settings.EXACT_SEARCH_MAX_POINTS <= 0 or not supports_exact_search:
+        return None
+
+    engine = ExactSearchEngine.for_small_collection(
+        document_class,
+        max_points=settings.EXACT_SEARCH_MAX_POINTS,
+        refresh_seconds=settings.EXACT_SEARCH_REFRESH_SECONDS,
+    )
+    if engine is None:
+        return None
+
+    return engine.search_batch_with_scores(
+        query_vectors=query_vectors,
+        limit=limit,
+        filters=filters,
+        with_vectors=kwargs.get("with_vectors", False),
+    )
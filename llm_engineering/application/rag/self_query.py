@@ -0,0 +1,56 @@
+import asyncio
+
+from langchain_openai import ChatOpenAI
+from loguru import logger
+
+from llm_engineering.application import utils
+from llm_engineering.domain.documents import UserDocument
+from llm_engineering.domain.queries import Query
+from llm_engineering.settings import settings
+
+from .base import RAGStep
+from .prompt_templates import SelfQueryTemplate
+
+
+class SelfQuery(RAGStep):
+    def generate(self, query: Query) -> Query:
+        """
+        Extracts the author the question refers to, so the search can be scoped to their chunks.
+        """
+
+        if self._mock:
+            return query
+
+        response = self._chain().invoke({"question": query.content})
+
+        return self._set_author(query, response.content)
+
+    async def agenerate(self, query: Query) -> Query:
+        if self._mock:
+            return query
+
+        response = await self._chain().ainvoke({"question": query.content})
+
+        # the user lookup is a blocking MongoDB call.
+        return await asyncio.to_thread(self._set_author, query, response.content)
+
+    def _chain(self):
+        prompt = SelfQueryTemplate().create_template()
+        model = ChatOpenAI(model=settings.OPENAI_MODEL_ID, api_key=settings.OPENAI_API_KEY, temperature=0)
+
+        return prompt | model
+
+    def _set_author(self, query: Query, response: str) -> Query:
+        user_full_name = response.strip("\n ")
+
+        if user_full_name == "none":
+            return query
+
+        first_name, last_name = utils.split_user_full_name(user_full_name)
+        user = UserDocument.get_or_create(first_name=first_name, last_name=last_name)
+
+        query.author_id = user.id
+        query.author_full_name = user.full_name
+        logger.info(f"Extracted the author '{user.full_name}' from the query.")
+
+        return query
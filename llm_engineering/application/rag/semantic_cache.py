@@ -0,0 +1,194 @@
+import threading
+import time
+
+from loguru import logger
+from pydantic import UUID4, BaseModel, Field
+from qdrant_client.http.models import FieldCondition, Filter, MatchAny, MatchValue, PayloadSchemaType, Range
+
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.domain.queries import EmbeddedQuery
+from llm_engineering.infrastructure.db.qdrant import REQUEST_ERRORS, connection
+from llm_engineering.settings import settings
+
+# Author key of the queries without an author, which were answered from every author's chunks.
+ANY_AUTHOR = "any"
+
+# Expired entries are never returned, they are also deleted every that many stores.
+CLEANUP_EVERY_N_STORES = 100
+
+# Lookups are filtered on the author and the retrieval parameters, the cleanup on the expiration time.
+SEMANTIC_CACHE_PAYLOAD_INDEXES = {
+    "author_key": PayloadSchemaType.KEYWORD,
+    "k": PayloadSchemaType.INTEGER,
+    "expand_to_n_queries": PayloadSchemaType.INTEGER,
+    "expires_at": PayloadSchemaType.FLOAT,
+}
+
+
+class SemanticCacheEntry(VectorBaseDocument):
+    query: str
+    embedding: list[float] | None
+    author_key: str
+    chunks: list[dict] = Field(default_factory=list)  # {"collection_name": ..., "chunk": ...} of each chunk
+    k: int  # the retrieval parameters the chunks were retrieved with
+    expand_to_n_queries: int
+    answer: str | None = None
+    expires_at: float  # unix timestamp
+
+    class Config:
+        name = "semantic_cache"
+        use_vector_index = True
+        payload_indexes = SEMANTIC_CACHE_PAYLOAD_INDEXES
+
+
+class SemanticCacheHit(BaseModel):
+    entry_id: str
+    query: str
+    similarity: float
+    chunks: list[EmbeddedChunk]
+    k: int  # of the entry, which may be larger than the k of the lookup
+    answer: str | None = None
+
+
+class SemanticCache:
+    """
+    Cache of the retrieved context (and generated answer) of RAG requests, keyed by the query embedding:
+    a query within `similarity_threshold` cosine similarity of a cached one, for the same author, gets the
+    cached result back and skips retrieval, reranking and the LLM call.
+
+    An entry only serves the requests asking for at most as many chunks (`k`), retrieved with at most as many
+    query variants (`expand_to_n_queries`), as it was retrieved with. Its answer was generated from its `k` chunks,
+    so it is only returned to the requests with the same `k`.
+
+    The entries live in a small dedicated Qdrant collection, so every API worker shares them and the
+    feature pipeline can invalidate them (see `invalidate_authors`) when an author's chunks change.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = settings.SEMANTIC_CACHE_SIMILARITY_THRESHOLD,
+        ttl_seconds: float = settings.SEMANTIC_CACHE_TTL_SECONDS,
+    ) -> None:
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+
+        self._num_stores = 0
+        self._lock = threading.Lock()
+
+        SemanticCacheEntry.get_or_create_collection()
+
+    def lookup(self, query: EmbeddedQuery, k: int, expand_to_n_queries: int) -> SemanticCacheHit | None:
+        query_filter = Filter(
+            must=[
+                FieldCondition(key="author_key", match=MatchValue(value=self._author_key(query.author_id))),
+                FieldCondition(key="k", range=Range(gte=k)),
+                FieldCondition(key="expand_to_n_queries", range=Range(gte=expand_to_n_queries)),
+                FieldCondition(key="expires_at", range=Range(gt=time.time())),
+            ]
+        )
+        results = SemanticCacheEntry.search_batch_with_scores(
+            query_vectors=[query.embedding], limit=1, filters=query_filter, score_threshold=self.similarity_threshold
+        )[0]
+        if len(results) == 0:
+            return None
+
+        entry, similarity = results[0]
+        logger.info(f"Semantic cache hit ({similarity:.3f}) for '{query.content}': '{entry.query}'.")
+
+        return SemanticCacheHit(
+            entry_id=str(entry.id),
+            query=entry.query,
+            similarity=similarity,
+            chunks=[self._load_chunk(chunk) for chunk in entry.chunks[:k]],
+            k=entry.k,
+            answer=entry.answer if entry.k == k else None,
+        )
+
+    def store(
+        self,
+        query: EmbeddedQuery,
+        chunks: list[EmbeddedChunk],
+        k: int,
+        expand_to_n_queries: int,
+        answer: str | None = None,
+    ) -> str | None:
+        """
+        Caches the result of a query retrieved with the given parameters, the answer can be added later
+        with `set_answer`.
+
+        Returns:
+            str | None: The id of the cache entry, None if it couldn't be stored.
+        """
+
+        entry = SemanticCacheEntry(
+            query=query.content,
+            embedding=query.embedding,
+            author_key=self._author_key(query.author_id),
+            chunks=[
+                {
+                    "collection_name": chunk.get_collection_name(),
+                    # the vectors aren't needed to build a prompt.
+                    "chunk": chunk.model_dump(exclude={"embedding", "sparse_embedding"}),
+                }
+                for chunk in chunks
+            ],
+            k=k,
+            expand_to_n_queries=expand_to_n_queries,
+            answer=answer,
+            expires_at=time.time() + self.ttl_seconds,
+        )
+        if not SemanticCacheEntry.bulk_insert([entry]):
+            return None
+
+        with self._lock:
+            self._num_stores += 1
+            cleanup = self._num_stores % CLEANUP_EVERY_N_STORES == 0
+        if cleanup:
+            self.delete_expired()
+
+        return str(entry.id)
+
+    def set_answer(self, entry_id: str, answer: str) -> bool:
+        try:
+            connection.set_payload(
+                collection_name=SemanticCacheEntry.get_collection_name(), payload={"answer": answer}, points=[entry_id]
+            )
+        except REQUEST_ERRORS:
+            logger.error(f"Failed to cache the answer of the semantic cache entry {entry_id}.")
+
+            return False
+
+        return True
+
+    def delete_expired(self) -> bool:
+        return SemanticCacheEntry.bulk_delete(
+            Filter(must=[FieldCondition(key="expires_at", range=Range(lte=time.time()))])
+        )
+
+    @classmethod
+    def invalidate_authors(cls, author_ids: set[UUID4 | str]) -> bool:
+        """
+        Drops the cached results of the given authors, to call whenever their chunks change.
+        The results of the queries without an author are dropped as well, since they may hold their chunks.
+        """
+
+        if len(author_ids) == 0 or not SemanticCacheEntry.collection_exists():
+            return True
+
+        author_keys = [cls._author_key(author_id) for author_id in author_ids] + [ANY_AUTHOR]
+        logger.info(f"Invalidating the semantic cache of {len(author_ids)} authors.")
+
+        return SemanticCacheEntry.bulk_delete(
+            Filter(must=[FieldCondition(key="author_key", match=MatchAny(any=author_keys))])
+        )
+
+    @staticmethod
+    def _author_key(author_id: UUID4 | str | None) -> str:
+        return str(author_id) if author_id is not None else ANY_AUTHOR
+
+    @staticmethod
+    def _load_chunk(chunk: dict) -> EmbeddedChunk:
+        chunk_class = VectorBaseDocument.collection_name_to_class(chunk["collection_name"])
+
+        return chunk_class.model_validate({**chunk["chunk"], "embedding": None})
@@ -75,7 +75,7 @@ class NoSQLBaseDocument(BaseModel, Generic[T], ABC):
             if isinstance(value, uuid.UUID):
                 dict_[key] = str(value)
             
-            return dict_
+        return dict_
     def save(self:T, **kwargs) -> T | None:
         # setting the collection as the name of the current collection
         collection = _database[self.get_collection_name()]
@@ -1,31 +1,139 @@
+import asyncio
+import hashlib
+import json
+import threading
 import uuid
 from abc import ABC
-from typing import Any, Callable, Dict, Generic, Type, TypeVar
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Generator, Generic, Type, TypeVar
 from uuid import UUID 
 
 import numpy as np 
 from loguru import logger
 from pydantic import UUID4, BaseModel, Field
-from qdrant_client.hhtp import exceptions
-from qdrant_client.http.models import Distance, VectorParams
-from qdrant_client.models import CollectionInfo, PointStruct, Record
+from qdrant_client.http.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    CompressionRatio,
+    Distance,
+    Filter,
+    FilterSelector,
+    Fusion,
+    FusionQuery,
+    HnswConfigDiff,
+    Modifier,
+    PayloadSchemaType,
+    Prefetch,
+    ProductQuantization,
+    ProductQuantizationConfig,
+    QuantizationConfig,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    SearchRequest,
+    SparseVector,
+    SparseVectorParams,
+    VectorParams,
+)
+from qdrant_client.models import CollectionInfo, PointStruct, Record, ScoredPoint
 
-from llm_engineering.application.networks.embeddings import EmbeddingModelSingelton
+from llm_engineering.application.networks.embeddings import EmbeddingModelSingleton
 from llm_engineering.domain.exceptions import ImproperlyConfigured
+from llm_engineering.domain.filters import DocumentFilter, to_qdrant_filter
 from llm_engineering.domain.types import DataCategory
-from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.infrastructure.db.content_store import ContentStoreSingleton
+from llm_engineering.infrastructure.db.qdrant import REQUEST_ERRORS, AsyncQdrantDatabaseConnector, connection
+from llm_engineering.settings import settings
 
 T = TypeVar("T", bound="VectorBaseDocument")
+R = TypeVar("R", Record, ScoredPoint)
+
+# Process-wide registry of the document classes owning a collection, filled as the classes are defined.
+_collection_registry: dict[str, type["VectorBaseDocument"]] = {}
+# Info of the collections known to exist, so hot paths never ask Qdrant whether a collection exists.
+_collection_info_cache: dict[str, CollectionInfo] = {}
+_collection_cache_lock = threading.RLock()
+
+# Name of the dense vector in collections that also hold a named sparse vector (the default, unnamed vector).
+DENSE_VECTOR_NAME = ""
+
+# Payload field holding a hash of the rest of the payload and of the vector, used to skip unchanged points.
+FINGERPRINT_FIELD = "content_fingerprint"
+
+
+def compute_fingerprint(payload: dict, vector: list[float] | dict | None, lean: bool = False) -> str:
+    """
+    Hashes a point's payload and vector. Two points with the same fingerprint hold the same data,
+    so re-upserting one over the other would only churn the HNSW index.
+    `lean` is part of the hash: a point stored with a lean payload differs from the same point stored in full,
+    so switching QDRANT_LEAN_PAYLOADS rewrites the points instead of skipping them.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps(payload, sort_keys=True, default=str).encode("utf-8"))
+    if lean:
+        digest.update(b"lean")
+    if isinstance(vector, list) and len(vector) > 0:
+        digest.update(np.asarray(vector, dtype=np.float32).tobytes())
+
+    return digest.hexdigest()
+
+
+def build_quantization_config(
+    quantization: str,
+    always_ram: bool = True,
+    compression: CompressionRatio = CompressionRatio.X16,
+    quantile: float = 0.99,
+) -> QuantizationConfig:
+    """
+    Builds the Qdrant quantization config of a collection.
+
+    Args:
+        quantization (str): "scalar" (int8, 4x smaller), "product" (`compression` times smaller)
+            or "binary" (32x smaller, best suited to high dimensional embeddings).
+        always_ram (bool): Keep the quantized vectors in RAM even when the original ones are stored on disk.
+        compression (CompressionRatio): Compression ratio of product quantization.
+        quantile (float): Quantile of the values kept by scalar quantization, the rest is clipped as outliers.
+
+    Returns:
+        QuantizationConfig: The config passed to `create_collection`.
+    """
+    if quantization == "scalar":
+        return ScalarQuantization(
+            scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=quantile, always_ram=always_ram)
+        )
+    elif quantization == "product":
+        return ProductQuantization(
+            product=ProductQuantizationConfig(compression=compression, always_ram=always_ram)
+        )
+    elif quantization == "binary":
+        return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=always_ram))
+
+    raise ImproperlyConfigured(
+        f"Unsupported quantization '{quantization}'. Expected one of 'scalar', 'product' or 'binary'."
+    )
+
 
 class VectorBaseDocument(BaseModel, Generic[T], ABC):
     id: UUID4 = Field(default_factory=uuid.uuid4)
 
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+
+        # only the classes defining their own collection are registered, not the abstract intermediate ones
+        # (e.g. EmbeddedChunk) which would otherwise inherit the Config of their parent.
+        config = cls.__dict__.get("Config")
+        if config is not None and hasattr(config, "name"):
+            _collection_registry[config.name] = cls
+
     # equality condition function
     def __eq__(self, value:object)-> bool:
         if not isinstance(value, self.__class__):
             return False
 
-        return self.id=value.id
+        return self.id == value.id
 
     # defining the hash method
     # here we generate a hash value based on the objects id attribute which in this case is the UUID4 
@@ -35,7 +143,7 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
     @classmethod
     def from_record(cls:Type[T], point: Record) -> T:
         # confirming conformity to UUID4
-        _id: UUID(point.id, version=4)
+        _id = UUID(point.id, version=4)
 
         payload = point.payload or {}
 
@@ -43,8 +151,17 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
             "id": _id, 
             **payload
         }
+
+        # collections with a sparse vector return the vectors by name, "" being the dense one.
+        vector = point.vector
+        if isinstance(vector, dict):
+            sparse_vector_name = cls.get_sparse_vector_name()
+            if sparse_vector_name is not None and cls._has_class_attribute("sparse_embedding"):
+                attributes["sparse_embedding"] = vector.get(sparse_vector_name)
+            vector = vector.get(DENSE_VECTOR_NAME)
+
         if cls._has_class_attribute("embedding"):
-            attributes["embedding"] = point.vector or None
+            attributes["embedding"] = vector or None
         
         return cls(**attributes)
     
@@ -60,6 +177,16 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
         if vector and isinstance(vector, np.ndarray):
             vector = vector.tolist()
+
+        # the sparse vector is part of the payload here, so its changes change the fingerprint too.
+        payload[FINGERPRINT_FIELD] = compute_fingerprint(payload, vector, lean=self.uses_lean_payloads())
+
+        sparse_vector = payload.pop("sparse_embedding", None)
+        sparse_vector_name = self.get_sparse_vector_name()
+        if sparse_vector_name is not None and vector:
+            vector = {DENSE_VECTOR_NAME: vector}
+            if sparse_vector:
+                vector[sparse_vector_name] = SparseVector(**sparse_vector)
         
         return PointStruct(id=_id, vector=vector, payload=payload)
 
@@ -79,45 +206,110 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
                     item[key] = str(value)
                 elif isinstance(value, list):
                     item[key] = [self._uuid_to_str(v) for v in value]
-                elif isiinstance(value, dict):
+                elif isinstance(value, dict):
                     item[key] = {k: self._uuid_to_str(v) for k, v in value.items()}
             
-            return item
+        return item
 
 
+    @classmethod
     def bulk_insert(cls: Type[T], documents: list["VectorBaseDocument"])->bool:
         try:
+            # a no-op once the collection is known to exist, so only the very first insert checks Qdrant.
+            cls.get_or_create_collection()
             cls._bulk_insert(documents)
+        except (*REQUEST_ERRORS, RuntimeError):
+            logger.error(f"Failed to insert documents in '{cls.get_collection_name()}'.")
+            # the collection may have been deleted behind our back, check it again next time.
+            cls.invalidate_collection_cache()
 
-        except exceptions.UnexpectedResponse:
-            logger.info(
-                f"Collection '{cls.get_collection_name()} does not exist. Trying to create the collection."
-            )
-            cls.create_collection()
-
-            try:
-                cls._bulk_insert(documents)
-            except exceptions.UnexpectedResponse:
-                logger.error(f"Failed to insert documents in '{cls.get_collection_name()}.")
-
-                return False
+            return False
 
         return True
+
     @classmethod
-    def _bulk_insert(cls: Type[T], documents: list["VectorBaseDocument"])-> None:
+    def _bulk_insert(
+        cls: Type[T], documents: list["VectorBaseDocument"], wait: bool = True, skip_unchanged: bool = False
+    )-> int:
+        """
+        Converts the documents to points and upserts them.
+        With `wait=False` Qdrant acknowledges the request before applying it, which lets callers
+        keep several batches in flight (see `BulkVectorLoader`).
+        With `skip_unchanged=True` the points already stored with the same fingerprint are not written again.
+
+        Returns:
+            int: The number of points actually written.
+        """
         
         # doc conversion
         points = [doc.to_point() for doc in documents]
+        if cls.get_sparse_vector_name() is not None and not cls._collection_has_sparse_vector():
+            # collections created before the sparse vector was enabled only accept the dense one.
+            for point in points:
+                if isinstance(point.vector, dict):
+                    point.vector = point.vector[DENSE_VECTOR_NAME]
+        if skip_unchanged:
+            stored_fingerprints = cls._retrieve_fingerprints([point.id for point in points])
+            points = [
+                point for point in points if stored_fingerprints.get(point.id) != point.payload[FINGERPRINT_FIELD]
+            ]
+        if len(points) == 0:
+            return 0
+        if cls.uses_lean_payloads():
+            # the contents are stored first, so a point is never searchable without its content.
+            ContentStoreSingleton().put_many(
+                cls.get_collection_name(), {point.id: cls._pop_content_fields(point.payload) for point in points}
+            )
 
         # document insert into qdrant
-        connection.upsert(collection_name=cls.get_collection_name(), points=points)
+        connection.upsert(collection_name=cls.get_collection_name(), points=points, wait=wait)
+
+        return len(points)
+
+    @classmethod
+    def _retrieve_fingerprints(cls: Type[T], ids: list[str]) -> dict[str, str]:
+        """
+        Fetches the stored fingerprints of a batch of points in a single request.
+        Points that don't exist yet (or were written before fingerprints were stored) are left out.
+        """
+        records = connection.retrieve(
+            collection_name=cls.get_collection_name(),
+            ids=ids,
+            with_payload=[FINGERPRINT_FIELD], # only the fingerprint, not the whole payload
+            with_vectors=False,
+        )
+
+        return {
+            str(record.id): record.payload[FINGERPRINT_FIELD]
+            for record in records
+            if record.payload and FINGERPRINT_FIELD in record.payload
+        }
+
+    @classmethod
+    def bulk_delete(cls: Type[T], query_filter: Filter | DocumentFilter) -> bool:
+        """
+        Deletes every point of the collection that matches the given filter.
+        Used to drop stale points (e.g. old chunks of an updated document) before re-inserting them.
+        """
+        try:
+            connection.delete(
+                collection_name=cls.get_collection_name(),
+                points_selector=FilterSelector(filter=to_qdrant_filter(query_filter)),
+            )
+        except REQUEST_ERRORS:
+            # the collection not existing yet simply means there is nothing to delete.
+            logger.warning(f"Failed to delete documents from '{cls.get_collection_name()}'.")
+
+            return False
+
+        return True
 
 
     @classmethod
     def bulk_find(cls:Type[T], limit: int = 10, **kwargs)-> tuple[list[T], UUID | None]:
         try:
             documents, next_offset = cls._bulk_find(limit=limit, **kwargs)
-        except exceptions.UnexpectedResponse:
+        except REQUEST_ERRORS:
             logger.error(f"Failed to search documents in '{cls.get_collection_name()}'.")
 
             documents, next_offset = [], None
@@ -134,6 +326,8 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
         offset = kwargs.pop("offset", None)
         offset = str(offset) if offset else None
+        # accepting the same `query_filter` keyword as search, either a Qdrant filter or a DocumentFilter.
+        scroll_filter = to_qdrant_filter(kwargs.pop("query_filter", kwargs.pop("scroll_filter", None)))
 
         records, next_offset = connection.scroll(
             collection_name=collection_name, 
@@ -141,26 +335,84 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
             with_payload=kwargs.pop("with_payload", True), 
             with_vectors=kwargs.pop("with_vectors", False), 
             offset=offset, 
+            scroll_filter=scroll_filter,
             **kwargs,
         )
-        documents=[cls.from_record(record) for record in records]
+        documents=[cls.from_record(record) for record in cls.hydrate_records(records)]
         if next_offset is not None: 
             next_offset = UUID(next_offset, version=4)
         
         return documents, next_offset
+
+    @classmethod
+    def iter_all(
+        cls: Type[T],
+        batch_size: int = 100,
+        filter: Filter | DocumentFilter | None = None,
+        with_vectors: bool = False,
+        raw: bool = False,
+        hydrate: bool | None = None,
+    ) -> Generator[T | Record, None, None]:
+        """
+        Iterates over every document of the collection, following the scroll offsets automatically.
+        While the caller processes the current page, the next one is already fetched in a background thread,
+        so exporting or re-indexing a collection is no longer bound by one network round trip per page.
+
+        Args:
+            batch_size (int): Number of points fetched per scroll request.
+            filter (Filter | DocumentFilter | None): Optional filter restricting the iterated points.
+            with_vectors (bool): Whether to fetch the vectors alongside the payloads.
+            raw (bool): Yield the raw Qdrant records instead of validated documents, which skips the
+                pydantic validation cost when only the payloads are needed.
+            hydrate (bool | None): Fill the content fields of lean payloads from the content store, one lookup
+                per page. Defaults to True for documents and False for raw records.
+
+        Yields:
+            T | Record: The documents (or records) of the collection, in scroll order.
+        """
+        collection_name = cls.get_collection_name()
+        scroll_filter = to_qdrant_filter(filter)
+        hydrate = not raw if hydrate is None else hydrate
+
+        def fetch_page(offset: Any) -> tuple[list[Record], Any]:
+            records, next_offset = connection.scroll(
+                collection_name=collection_name,
+                limit=batch_size,
+                offset=offset,
+                scroll_filter=scroll_filter,
+                with_payload=True,
+                with_vectors=with_vectors,
+            )
+
+            return (cls.hydrate_records(records) if hydrate else records), next_offset
+
+        # a single worker is enough: only one page is ever prefetched ahead of the caller.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            next_page = executor.submit(fetch_page, None)
+            while next_page is not None:
+                records, next_offset = next_page.result()
+
+                # start fetching the following page before handing the current one to the caller.
+                next_page = executor.submit(fetch_page, next_offset) if next_offset is not None else None
+
+                for record in records:
+                    yield record if raw else cls.from_record(record)
+
     @classmethod
     def search(cls:Type[T], query_vector:list, limit: int=10, **kwargs) -> list[T]:
         try:
             # searching the documents using the query_vector, limiting the outcome to 10 docs.
             documents =cls._search(query_vector=query_vector, limit=limit, **kwargs)
             
-        except exceptions.UnexpectedResponse:
+        except REQUEST_ERRORS:
             logger.error(f"Failed to search documents in '{cls.get_collection_name()}'.")
 
             documents=[] # returning an empty list
         
+        return documents
+
     @classmethod
-    def _search(cls:Type[T], query_vector:list, limin:int=10, **kwargs)-> list[T]:
+    def _search(cls:Type[T], query_vector:list, limit:int=10, **kwargs)-> list[T]:
         collection_name = cls.get_collection_name()
         records = connection.search(
             collection_name=collection_name, 
@@ -168,30 +420,392 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
             limit=limit, 
             with_payload=kwargs.pop("with_payload", True), # we do want the payload.
             with_vectors=kwargs.pop("with_vectors", False), # we dont want to pull the full vector
+            query_filter=to_qdrant_filter(kwargs.pop("query_filter", None)), # e.g. DocumentFilter.by_author(...)
+            search_params=cls._pop_search_params(kwargs), # e.g. oversampling=2.0, rescore=True
             **kwargs, 
         )
         
         # pulling the document attributes using the from_record method
-        documents = [cls.from_record(record) for record in records]
+        documents = [cls.from_record(record) for record in cls.hydrate_records(records)]
 
         return documents
 
+    @classmethod
+    def search_batch(
+        cls: Type[T],
+        query_vectors: list[list[float]],
+        limit: int = 10,
+        filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+        **kwargs,
+    ) -> list[list[T]]:
+        """
+        Searches the collection with several query vectors in a single round trip.
+
+        Args:
+            query_vectors (list[list[float]]): The query vectors, e.g. the embeddings of the expanded queries.
+            limit (int): Number of documents returned per query vector.
+            filters (Filter | DocumentFilter | list | None): A filter applied to every query, or one per query.
+
+        Returns:
+            list[list[T]]: The documents found for each query vector, in the same order as `query_vectors`.
+        """
+        results = cls.search_batch_with_scores(query_vectors=query_vectors, limit=limit, filters=filters, **kwargs)
+
+        return [[document for document, _ in query_results] for query_results in results]
+
+    @classmethod
+    def search_batch_with_scores(
+        cls: Type[T],
+        query_vectors: list[list[float]],
+        limit: int = 10,
+        filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+        **kwargs,
+    ) -> list[list[tuple[T, float]]]:
+        """
+        Same as `search_batch`, but every document comes with its similarity score so results of
+        different collections can be merged.
+        """
+        try:
+            results = cls._search_batch(query_vectors=query_vectors, limit=limit, filters=filters, **kwargs)
+        except REQUEST_ERRORS:
+            logger.error(f"Failed to search documents in '{cls.get_collection_name()}'.")
+
+            results = [[] for _ in query_vectors] # one empty result list per query vector
+
+        return results
+
+    @classmethod
+    def _search_batch(
+        cls: Type[T],
+        query_vectors: list[list[float]],
+        limit: int = 10,
+        filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+        **kwargs,
+    ) -> list[list[tuple[T, float]]]:
+        if len(query_vectors) == 0:
+            return []
+
+        requests = cls._build_search_requests(query_vectors=query_vectors, limit=limit, filters=filters, **kwargs)
+        batch_records = connection.search_batch(collection_name=cls.get_collection_name(), requests=requests)
+
+        # pulling the document attributes using the from_record method while keeping the scores
+        return [
+            [(cls.from_record(record), record.score) for record in records]
+            for records in cls.hydrate_record_groups(batch_records)
+        ]
+
+    @classmethod
+    async def asearch_batch_with_scores(
+        cls: Type[T],
+        query_vectors: list[list[float]],
+        limit: int = 10,
+        filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+        **kwargs,
+    ) -> list[list[tuple[T, float]]]:
+        """
+        Asyncio version of `search_batch_with_scores`, through the async Qdrant client,
+        so a serving process can run many searches concurrently without a thread per request.
+        """
+        try:
+            results = await cls._asearch_batch(query_vectors=query_vectors, limit=limit, filters=filters, **kwargs)
+        except REQUEST_ERRORS:
+            logger.error(f"Failed to search documents in '{cls.get_collection_name()}'.")
+
+            results = [[] for _ in query_vectors]
+
+        return results
+
+    @classmethod
+    async def _asearch_batch(
+        cls: Type[T],
+        query_vectors: list[list[float]],
+        limit: int = 10,
+        filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None = None,
+        **kwargs,
+    ) -> list[list[tuple[T, float]]]:
+        if len(query_vectors) == 0:
+            return []
+
+        requests = cls._build_search_requests(query_vectors=query_vectors, limit=limit, filters=filters, **kwargs)
+        batch_records = await AsyncQdrantDatabaseConnector().search_batch(
+            collection_name=cls.get_collection_name(), requests=requests
+        )
+        if len(cls.get_content_fields()) > 0:
+            # the content store clients are blocking, keep them off the event loop.
+            batch_records = await asyncio.to_thread(cls.hydrate_record_groups, batch_records)
+
+        return [[(cls.from_record(record), record.score) for record in records] for records in batch_records]
+
+    @classmethod
+    def _build_search_requests(
+        cls: Type[T],
+        query_vectors: list[list[float]],
+        limit: int,
+        filters: Filter | DocumentFilter | list[Filter | DocumentFilter | None] | None,
+        **kwargs,
+    ) -> list[SearchRequest]:
+        # a single filter is shared by all the queries.
+        if not isinstance(filters, list):
+            filters = [filters] * len(query_vectors)
+        if len(filters) != len(query_vectors):
+            raise ValueError("Expected one filter per query vector.")
+
+        with_payload = kwargs.pop("with_payload", True)
+        with_vectors = kwargs.pop("with_vectors", False)
+        search_params = cls._pop_search_params(kwargs)
+
+        return [
+            SearchRequest(
+                vector=query_vector.tolist() if isinstance(query_vector, np.ndarray) else query_vector,
+                filter=to_qdrant_filter(query_filter),
+                limit=limit,
+                with_payload=with_payload,
+                with_vector=with_vectors,
+                params=search_params,
+                **kwargs,
+            )
+            for query_vector, query_filter in zip(query_vectors, filters, strict=True)
+        ]
+
+    @classmethod
+    def hybrid_search(
+        cls: Type[T], query_vector: list[float], sparse_query_vector: SparseVector, limit: int = 10, **kwargs
+    ) -> list[T]:
+        """
+        Searches with both the dense and the sparse lexical vector of the query and fuses the two rankings
+        with reciprocal rank fusion, in a single request. Exact terms (e.g. code identifiers) are matched by the
+        sparse vector, while the dense one matches the meaning. Collections without a sparse vector fall back to
+        a dense search.
+
+        Args:
+            query_vector (list[float]): The dense embedding of the query.
+            sparse_query_vector (SparseVector): The sparse lexical vector of the query, see `sparse_embed_query`.
+            limit (int): Number of documents returned.
+            **kwargs: `query_filter`, `prefetch_limit` (candidates per ranking, 4 * limit by default) and
+                the search params of `search` (hnsw_ef, oversampling...).
+
+        Returns:
+            list[T]: The documents, best fused rank first.
+        """
+        results = cls.hybrid_search_with_scores(query_vector, sparse_query_vector, limit, **kwargs)
+
+        return [document for document, _ in results]
+
+    @classmethod
+    def hybrid_search_with_scores(
+        cls: Type[T], query_vector: list[float], sparse_query_vector: SparseVector, limit: int = 10, **kwargs
+    ) -> list[tuple[T, float]]:
+        """
+        Same as `hybrid_search`, with the fused (RRF) scores, which are not comparable to cosine similarities.
+        """
+        try:
+            results = cls._hybrid_search(
+                query_vector=query_vector, sparse_query_vector=sparse_query_vector, limit=limit, **kwargs
+            )
+        except REQUEST_ERRORS:
+            logger.error(f"Failed to search documents in '{cls.get_collection_name()}'.")
+
+            results = []
+
+        return results
+
+    @classmethod
+    def _hybrid_search(
+        cls: Type[T], query_vector: list[float], sparse_query_vector: SparseVector, limit: int = 10, **kwargs
+    ) -> list[tuple[T, float]]:
+        sparse_vector_name = cls.get_sparse_vector_name()
+        # collections created before the sparse vector was enabled only have the dense ranking.
+        legacy_collection = cls.collection_exists() and not cls._collection_has_sparse_vector()
+        if sparse_vector_name is None or legacy_collection:
+            kwargs.pop("prefetch_limit", None)
+            filters = kwargs.pop("query_filter", None)
+
+            return cls._search_batch(query_vectors=[query_vector], limit=limit, filters=filters, **kwargs)[0]
+
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.tolist()
+        query_filter = to_qdrant_filter(kwargs.pop("query_filter", None))
+        prefetch_limit = kwargs.pop("prefetch_limit", None) or 4 * limit
+        search_params = cls._pop_search_params(kwargs)
+
+        response = connection.query_points(
+            collection_name=cls.get_collection_name(),
+            prefetch=[
+                Prefetch(query=query_vector, filter=query_filter, params=search_params, limit=prefetch_limit),
+                Prefetch(
+                    query=sparse_query_vector, using=sparse_vector_name, filter=query_filter, limit=prefetch_limit
+                ),
+            ],
+            query=FusionQuery(fusion=Fusion.RRF),
+            limit=limit,
+            with_payload=kwargs.pop("with_payload", True),
+            with_vectors=kwargs.pop("with_vectors", False),
+            **kwargs,
+        )
+
+        return [(cls.from_record(point), point.score) for point in cls.hydrate_records(response.points)]
+
+    @classmethod
+    def hydrate_records(cls: Type[T], records: list[R]) -> list[R]:
+        """
+        Fills the content fields of lean-payload records from the content store, see `hydrate_record_groups`.
+        """
+        return cls.hydrate_record_groups([records])[0]
+
+    @classmethod
+    def hydrate_record_groups(cls: Type[T], record_groups: list[list[R]]) -> list[list[R]]:
+        """
+        Fills the content fields of lean-payload records (e.g. the top-k of several queries) from the
+        content store, with a single lookup for all the groups. Lean records whose contents are missing from
+        the content store are dropped. The records are hydrated whatever QDRANT_LEAN_PAYLOADS says: the points
+        written while it was on stay lean until they are written again.
+        """
+        content_fields = cls.get_content_fields()
+        if len(content_fields) == 0:
+            return record_groups
+
+        lean_ids = list(
+            {
+                str(record.id)
+                for records in record_groups
+                for record in records
+                if cls._is_lean_record(record, content_fields)
+            }
+        )
+        if len(lean_ids) == 0:
+            return record_groups
+
+        contents = ContentStoreSingleton().get_many(cls.get_collection_name(), lean_ids)
+        if len(contents) < len(lean_ids):
+            logger.warning(
+                f"{len(lean_ids) - len(contents)} points of '{cls.get_collection_name()}' have no stored content."
+            )
+
+        return [
+            [
+                record.model_copy(update={"payload": {**record.payload, **contents[str(record.id)]}})
+                if cls._is_lean_record(record, content_fields)
+                else record
+                for record in records
+                if not cls._is_lean_record(record, content_fields) or str(record.id) in contents
+            ]
+            for records in record_groups
+        ]
+
+    @classmethod
+    def _is_lean_record(cls: Type[T], record: Record | ScoredPoint, content_fields: tuple[str, ...]) -> bool:
+        # records fetched without their payload have nothing to hydrate.
+        return record.payload is not None and any(field not in record.payload for field in content_fields)
+
+    @classmethod
+    def _pop_content_fields(cls: Type[T], payload: dict) -> dict:
+        return {field: payload.pop(field) for field in cls.get_content_fields() if field in payload}
+
+    @classmethod
+    def _pop_search_params(cls: Type[T], kwargs: dict) -> SearchParams | None:
+        """
+        Pops the search-time tuning keywords out of the search kwargs and builds the Qdrant search params.
+
+        Supported keywords:
+            search_params (SearchParams): Raw Qdrant search params, used as they are.
+            oversampling (float): On quantized collections, fetch `limit * oversampling` candidates
+                with the quantized vectors before rescoring them. Defaults to the class config.
+            rescore (bool): On quantized collections, re-rank the candidates with the original vectors.
+                Defaults to the class config.
+            hnsw_ef (int): Size of the HNSW candidate list, higher means better recall but slower searches.
+                Defaults to the class config, then to the collection's `ef_construct`.
+            exact (bool): Skip the HNSW index and compare the query with every vector (ground truth searches).
+        """
+        search_params = kwargs.pop("search_params", None)
+        oversampling = kwargs.pop("oversampling", None)
+        rescore = kwargs.pop("rescore", None)
+        hnsw_ef = kwargs.pop("hnsw_ef", None)
+        exact = kwargs.pop("exact", None)
+        if search_params is not None:
+            return search_params
+
+        # the quantization params only matter on quantized collections, plain ones keep the Qdrant defaults.
+        quantization_search_params = None
+        if cls.get_quantization_config() is not None or oversampling is not None or rescore is not None:
+            quantization_search_params = QuantizationSearchParams(
+                rescore=rescore if rescore is not None else cls.get_quantization_rescore(),
+                oversampling=oversampling if oversampling is not None else cls.get_quantization_oversampling(),
+            )
+
+        hnsw_ef = hnsw_ef if hnsw_ef is not None else cls.get_search_hnsw_ef()
+        if quantization_search_params is None and hnsw_ef is None and exact is None:
+            return None
+
+        return SearchParams(hnsw_ef=hnsw_ef, exact=bool(exact), quantization=quantization_search_params)
+
     @classmethod 
     def get_or_create_collection(cls: Type[T])->CollectionInfo:
+        """
+        Returns the info of the collection, creating it first if needed.
+        The info is cached for the whole process: it reflects the collection's config,
+        not live statistics such as `points_count`. Use `invalidate_collection_cache` to refresh it.
+        """
         collection_name = cls.get_collection_name()
 
-        try:
-            return connection.get_collection(collection_name=collection_name)
-        except exceptions.UnexpectedResponse:
-            use_vector_index = cls.get_use_vector_index()
+        collection_info = _collection_info_cache.get(collection_name)
+        if collection_info is not None:
+            return collection_info
 
-            collection_created = cls._create_collection(
-                collection_name=collection_name, use_vector_index=use_vector_index
-            )
-            if collection_created is False:
-                raise RuntimeError(f"Couldn't create collection: {collection_name}") from None
-            
-            return connection.get_collection(collection_name=collection_name)
+        with _collection_cache_lock:
+            # another thread may have created the collection while this one was waiting for the lock.
+            if collection_name in _collection_info_cache:
+                return _collection_info_cache[collection_name]
+
+            # checking explicitly instead of relying on the error of `get_collection`, which differs between
+            # the server (UnexpectedResponse) and local mode (ValueError).
+            if not connection.collection_exists(collection_name=collection_name):
+                use_vector_index = cls.get_use_vector_index()
+
+                collection_created = cls._create_collection(
+                    collection_name=collection_name, use_vector_index=use_vector_index
+                )
+                if collection_created is False:
+                    raise RuntimeError(f"Couldn't create collection: {collection_name}")
+
+            collection_info = connection.get_collection(collection_name=collection_name)
+            _collection_info_cache[collection_name] = collection_info
+
+            sparse_vector_name = cls.get_sparse_vector_name()
+            sparse_vectors_config = collection_info.config.params.sparse_vectors or {}
+            if sparse_vector_name is not None and sparse_vector_name not in sparse_vectors_config:
+                logger.warning(
+                    f"Collection '{collection_name}' was created without the '{sparse_vector_name}' sparse vector. "
+                    "Only the dense vectors are stored, recreate the collection to enable hybrid search."
+                )
+
+        return collection_info
+
+    @classmethod
+    def _collection_has_sparse_vector(cls: Type[T]) -> bool:
+        sparse_vectors_config = cls.get_or_create_collection().config.params.sparse_vectors or {}
+
+        return cls.get_sparse_vector_name() in sparse_vectors_config
+
+    @classmethod
+    def collection_exists(cls: Type[T]) -> bool:
+        """
+        Returns whether the collection exists, only asking Qdrant while it isn't known to exist.
+        """
+        collection_name = cls.get_collection_name()
+        if collection_name in _collection_info_cache:
+            return True
+
+        return connection.collection_exists(collection_name=collection_name)
+
+    @classmethod
+    def invalidate_collection_cache(cls: Type[T]) -> None:
+        """
+        Forgets the cached info of the class' collection and of its subclasses' ones, e.g. after collections were
+        deleted or recreated by another process. Called on `VectorBaseDocument` it clears the whole cache.
+        """
+        with _collection_cache_lock:
+            for collection_name in cls.registered_collections():
+                _collection_info_cache.pop(collection_name, None)
 
     
     @classmethod
@@ -202,7 +816,7 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
         # extracting the collection name
         collection_name = cls.get_collection_name()
         # extracting the vector index
-        use_vector_index = cls.get_vector_index()
+        use_vector_index = cls.get_use_vector_index()
 
         return cls._create_collection(collection_name=collection_name, use_vector_index=use_vector_index)
     
@@ -215,11 +829,48 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
         This function can be used for more advanced scenarios in other classes.
         """
         if use_vector_index is True:
-            vectors_config = VectorParams(size=EmbeddingModelSingleton().embedding_size, distance=Distance.COSINE)
+            vectors_config = VectorParams(
+                size=EmbeddingModelSingleton().embedding_size,
+                distance=Distance.COSINE,
+                on_disk=cls.get_vectors_on_disk(), # original vectors memmapped from disk instead of held in RAM
+            )
         else:
             vectors_config = {}
         
-        return connection.create_collection(collection_name=collection_name, vectors_config=vectors_config)
+        # the cached info (if any) belongs to a previous version of the collection.
+        with _collection_cache_lock:
+            _collection_info_cache.pop(collection_name, None)
+
+        collection_created = connection.create_collection(
+            collection_name=collection_name,
+            vectors_config=vectors_config,
+            # named sparse lexical vector next to the dense one, Qdrant applies the IDF weighting at query time.
+            sparse_vectors_config=cls.get_sparse_vectors_config() if use_vector_index is True else None,
+            # per-collection HNSW settings, e.g. a denser graph for a large collection.
+            hnsw_config=cls.get_hnsw_config() if use_vector_index is True else None,
+            # compressed copies of the vectors, kept in RAM while the originals can live on disk.
+            quantization_config=cls.get_quantization_config() if use_vector_index is True else None,
+        )
+        if collection_created:
+            # indexing the filter fields right away, so filtered searches never fall back to scanning payloads.
+            cls._create_payload_indexes(collection_name=collection_name)
+
+        return collection_created
+
+    @classmethod
+    def create_payload_indexes(cls: Type[T]) -> None:
+        """
+        Creates the payload indexes declared in the class config. Creating an existing index is a no-op,
+        so this can also be used to index collections created before the index was declared.
+        """
+        cls._create_payload_indexes(collection_name=cls.get_collection_name())
+
+    @classmethod
+    def _create_payload_indexes(cls: Type[T], collection_name: str) -> None:
+        for field_name, field_schema in cls.get_payload_indexes().items():
+            connection.create_payload_index(
+                collection_name=collection_name, field_name=field_name, field_schema=field_schema, wait=True
+            )
     
     
     @classmethod
@@ -229,8 +880,8 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
                 "The class should define a Config class with"
                 "the 'category' property that reflects the collection's data category."
             )
-            # returning the category from the class config if present.
-            return cls.Config.category
+        # returning the category from the class config if present.
+        return cls.Config.category
 
 
     # method to return the collection name from the class config.
@@ -251,6 +902,118 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
         
         return cls.Config.use_vector_index
 
+    # returning the heavy payload fields (e.g. the chunk text) moved to the content store in lean-payload mode
+    @classmethod
+    def get_content_fields(cls: Type[T]) -> tuple[str, ...]:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "content_fields"):
+            return ()
+
+        return tuple(cls.Config.content_fields)
+
+    # returning whether Qdrant only keeps the vectors and the filter fields of the collection
+    @classmethod
+    def uses_lean_payloads(cls: Type[T]) -> bool:
+        return settings.QDRANT_LEAN_PAYLOADS and len(cls.get_content_fields()) > 0
+
+    # returning the payload indexes (field name -> schema type) from the class config
+    @classmethod
+    def get_payload_indexes(cls: Type[T]) -> dict[str, PayloadSchemaType]:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "payload_indexes"):
+            return {}
+
+        return cls.Config.payload_indexes
+
+    # returning the quantization config built from the class config, None for plain float32 collections.
+    # Config options:
+    #   quantization: "scalar" (int8, 4x smaller), "product" (up to 64x smaller) or "binary" (32x smaller)
+    #   quantization_always_ram: keep the quantized vectors in RAM even when the originals are on disk (True)
+    #   quantization_compression: product quantization compression ratio (CompressionRatio.X16)
+    #   quantization_quantile: scalar quantization quantile used to clip outliers (0.99)
+    #   quantization_rescore: search-time default, re-rank the candidates with the original vectors (True)
+    #   quantization_oversampling: search-time default, candidates fetched per result before rescoring (None)
+    @classmethod
+    def get_quantization_config(cls: Type[T]) -> QuantizationConfig | None:
+        if not hasattr(cls, "Config") or getattr(cls.Config, "quantization", None) is None:
+            return None
+
+        return build_quantization_config(
+            quantization=cls.Config.quantization,
+            always_ram=getattr(cls.Config, "quantization_always_ram", True),
+            compression=getattr(cls.Config, "quantization_compression", CompressionRatio.X16),
+            quantile=getattr(cls.Config, "quantization_quantile", 0.99),
+        )
+
+    # returning whether quantized search results are re-ranked with the original vectors by default
+    @classmethod
+    def get_quantization_rescore(cls: Type[T]) -> bool:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "quantization_rescore"):
+            return True
+
+        return cls.Config.quantization_rescore
+
+    # returning the default oversampling factor of quantized searches (None keeps the Qdrant default)
+    @classmethod
+    def get_quantization_oversampling(cls: Type[T]) -> float | None:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "quantization_oversampling"):
+            return None
+
+        return cls.Config.quantization_oversampling
+
+    # returning the name of the sparse lexical vector stored next to the dense one (None when disabled)
+    @classmethod
+    def get_sparse_vector_name(cls: Type[T]) -> str | None:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "sparse_vector_name"):
+            return None
+
+        return cls.Config.sparse_vector_name
+
+    @classmethod
+    def get_sparse_vectors_config(cls: Type[T]) -> dict[str, SparseVectorParams] | None:
+        sparse_vector_name = cls.get_sparse_vector_name()
+        if sparse_vector_name is None:
+            return None
+
+        # the stored values are BM25 saturated term frequencies, the IDF modifier completes the BM25 scoring.
+        return {sparse_vector_name: SparseVectorParams(modifier=Modifier.IDF)}
+
+    # returning the HNSW index settings from the class config, None keeps the Qdrant defaults.
+    # Config options:
+    #   hnsw_m: edges per node of the graph, higher means better recall but more memory (Qdrant default 16)
+    #   hnsw_ef_construct: candidate list size while building the graph, higher means a better but slower build (100)
+    #   full_scan_threshold: segments below this size (in KB of vectors) are searched exhaustively (10000)
+    #   hnsw_on_disk: store the graph on disk instead of RAM (False)
+    @classmethod
+    def get_hnsw_config(cls: Type[T]) -> HnswConfigDiff | None:
+        if not hasattr(cls, "Config"):
+            return None
+
+        hnsw_config = HnswConfigDiff(
+            m=getattr(cls.Config, "hnsw_m", None),
+            ef_construct=getattr(cls.Config, "hnsw_ef_construct", None),
+            full_scan_threshold=getattr(cls.Config, "full_scan_threshold", None),
+            on_disk=getattr(cls.Config, "hnsw_on_disk", None),
+        )
+        if len(hnsw_config.model_dump(exclude_none=True)) == 0:
+            return None
+
+        return hnsw_config
+
+    # returning whether the original vectors are stored on disk (memmapped) instead of in RAM
+    @classmethod
+    def get_vectors_on_disk(cls: Type[T]) -> bool | None:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "on_disk"):
+            return None
+
+        return cls.Config.on_disk
+
+    # returning the default `hnsw_ef` used at search time (None keeps the Qdrant default)
+    @classmethod
+    def get_search_hnsw_ef(cls: Type[T]) -> int | None:
+        if not hasattr(cls, "Config") or not hasattr(cls.Config, "hnsw_ef"):
+            return None
+
+        return cls.Config.hnsw_ef
+
     @classmethod
     def group_by_class(
         cls: Type["VectorBaseDocument"], documents: list["VectorBaseDocument"]
@@ -284,20 +1047,24 @@ class VectorBaseDocument(BaseModel, Generic[T], ABC):
 
     @classmethod
     def collection_name_to_class(cls: Type["VectorBaseDocument"], collection_name: str) -> type["VectorBaseDocument"]:
-        # looping through each subclass and checking to see if its in the collection
-        for subclass in cls.__subclasses__():
-            try:
-                if subclass.get_collection_name() == collection_name:
-                    return subclass
-                except ImproperlyConfigured:
-                    pass
-                
-                try:
-                    return subclass.collection_name_to_class(collection_name)
-                except ValueError:
-                    continue
+        # the registry is filled when the classes are defined, so this is a dict lookup instead of a class tree walk.
+        document_class = _collection_registry.get(collection_name)
+        if document_class is None or not issubclass(document_class, cls):
             raise ValueError(f"No subclass found for collection name: {collection_name}")
 
+        return document_class
+
+    @classmethod
+    def registered_collections(cls: Type["VectorBaseDocument"]) -> dict[str, type["VectorBaseDocument"]]:
+        """
+        Returns the collection name -> class mapping of every subclass defined so far.
+        """
+        return {
+            collection_name: document_class
+            for collection_name, document_class in _collection_registry.items()
+            if issubclass(document_class, cls)
+        }
+
     @classmethod
     def _has_class_attribute(cls: Type[T], attribute_name: str) -> bool:
         """
@@ -2,6 +2,7 @@ from abc import ABC
 from typing import Optional
 
 from pydantic import UUID4, Field
+from qdrant_client.http.models import SparseVector
 
 from llm_engineering.domain.base import VectorBaseDocument
 from llm_engineering.domain.types import DataCategory 
@@ -13,6 +14,7 @@ class Chunk(VectorBaseDocument, ABC):
     author_id: UUID4 
     author_full_name: str 
     metadata: dict = Field(default_factory=dict)
+    sparse_embedding: SparseVector | None = None # lexical vector computed at chunking time, see `sparse_embed`
 
 
 class PostChunk(Chunk):
@@ -1,11 +1,23 @@
 from abc import ABC
 
 from pydantic import UUID4, Field
+from qdrant_client.http.models import PayloadSchemaType, SparseVector
 
 from llm_engineering.domain.types import DataCategory 
 
 from .base import VectorBaseDocument 
 
+# Payload fields every embedded chunk collection is filtered on.
+# Each twin only retrieves its own author's chunks, so `author_id` is part of almost every query.
+EMBEDDED_CHUNK_PAYLOAD_INDEXES = {
+    "author_id": PayloadSchemaType.UUID,
+    "author_full_name": PayloadSchemaType.KEYWORD,
+    "platform": PayloadSchemaType.KEYWORD,
+    "document_id": PayloadSchemaType.UUID,
+}
+# Payload fields moved out of Qdrant in lean-payload mode (`QDRANT_LEAN_PAYLOADS`), everything else is filterable.
+EMBEDDED_CHUNK_CONTENT_FIELDS = ("content", "metadata")
+
 class EmbeddedChunk(VectorBaseDocument, ABC):
     content: str 
     embedding: list[float] | None 
@@ -14,33 +26,36 @@ class EmbeddedChunk(VectorBaseDocument, ABC):
     author_id: UUID4 
     author_full_name: str
     metadata: dict = Field(default_factory=dict)
+    sparse_embedding: SparseVector | None = None # only stored by collections with a `sparse_vector_name`
 
     @classmethod 
-    def to_context(cls, chunks: list["EmbeddedChunk"]) -> str:
-        context= ""
-        for i, chunk in enumerate(chunks):
-            context += f"""
-            Chunk {i+1}:
-            Type: {chunk.__class__.__name__}
-            Platform: {chunk.platform}
-            Author: {chunk.author_full_name}
-            Content: {chunk.content}\n 
-            """
-
-        return context
+    def to_context(cls, chunks: list["EmbeddedChunk"], tokenizer=None) -> str:
+        """
+        Formats the chunks as the prompt context, within the `RAG_CONTEXT_MAX_TOKENS` budget (see `ContextBuilder`),
+        counted with `tokenizer` (the tokenizer of HF_MODEL_ID by default).
+        """
+
+        # imported here, the rag package depends on this module.
+        from llm_engineering.application.rag.context import ContextBuilder
+
+        return ContextBuilder(tokenizer=tokenizer).build(chunks)
 
 class EmbeddedPostChunk(EmbeddedChunk): 
     class Config:
         name = "embedded_posts"
         category= DataCategory.POSTS
         use_vector_index = True
+        payload_indexes = EMBEDDED_CHUNK_PAYLOAD_INDEXES
+        content_fields = EMBEDDED_CHUNK_CONTENT_FIELDS
 
 
 class EmbeddedArticleChunk(EmbeddedChunk):
     class Config:
         name = "embedded_articles"
         category = DataCategory.ARTICLES
-        use_vector_index = True 
+        use_vector_index = True
+        payload_indexes = EMBEDDED_CHUNK_PAYLOAD_INDEXES
+        content_fields = EMBEDDED_CHUNK_CONTENT_FIELDS
 
 class EmbeddedRepositoryChunk(EmbeddedChunk):
     name:str
@@ -49,5 +64,9 @@ class EmbeddedRepositoryChunk(EmbeddedChunk):
     class Config:
         name = "embedded_repositories"
         category = DataCategory.REPOSITORIES
-        use_vector_index = True 
+        use_vector_index = True
+        payload_indexes = EMBEDDED_CHUNK_PAYLOAD_INDEXES
+        content_fields = EMBEDDED_CHUNK_CONTENT_FIELDS
+        # code search relies on exact identifiers, which the dense MiniLM embeddings capture poorly.
+        sparse_vector_name = "lexical"
             
\ No newline at end of file
@@ -3,4 +3,7 @@ class LLMTwinException(Exception):
     pass
 
 class ImproperlyConfigured(LLMTwinException):
-    pass
\ No newline at end of file
+    pass
+
+class CircuitBreakerOpen(LLMTwinException):
+    pass
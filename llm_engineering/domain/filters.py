@@ -0,0 +1,66 @@
+from pydantic import UUID4, BaseModel
+from qdrant_client.http.models import FieldCondition, Filter, MatchAny, MatchValue
+
+
+class DocumentFilter(BaseModel):
+    """
+    Typed builder for the payload filters used to scope retrieval to an author, a platform or a document.
+    Every set field becomes a `must` condition, list values match any of their items.
+
+    Example:
+        DocumentFilter.by_author(author_id).with_platform("linkedin").to_qdrant()
+    """
+
+    author_id: UUID4 | None = None
+    author_full_name: str | None = None
+    platform: str | list[str] | None = None
+    document_id: UUID4 | list[UUID4] | None = None
+
+    @classmethod
+    def by_author(cls, author_id: UUID4 | str) -> "DocumentFilter":
+        return cls(author_id=author_id)
+
+    @classmethod
+    def by_document(cls, document_id: UUID4 | str | list[UUID4 | str]) -> "DocumentFilter":
+        return cls(document_id=document_id)
+
+    def with_author(self, author_id: UUID4 | str) -> "DocumentFilter":
+        return self.model_copy(update={"author_id": author_id})
+
+    def with_platform(self, platform: str | list[str]) -> "DocumentFilter":
+        return self.model_copy(update={"platform": platform})
+
+    def with_document(self, document_id: UUID4 | str | list[UUID4 | str]) -> "DocumentFilter":
+        return self.model_copy(update={"document_id": document_id})
+
+    def to_qdrant(self) -> Filter | None:
+        """
+        Returns the equivalent Qdrant filter, or None when no field is set (no filtering).
+        """
+
+        conditions = [
+            _field_condition(field_name, value) for field_name, value in self.model_dump(exclude_none=True).items()
+        ]
+        if len(conditions) == 0:
+            return None
+
+        return Filter(must=conditions)
+
+
+def to_qdrant_filter(query_filter: Filter | DocumentFilter | None) -> Filter | None:
+    """
+    Accepts either a raw Qdrant filter or a `DocumentFilter` and returns the Qdrant filter.
+    """
+
+    if isinstance(query_filter, DocumentFilter):
+        return query_filter.to_qdrant()
+
+    return query_filter
+
+
+def _field_condition(field_name: str, value: object) -> FieldCondition:
+    # UUIDs are stored as strings in the payloads (see VectorBaseDocument.model_dump).
+    if isinstance(value, list):
+        return FieldCondition(key=field_name, match=MatchAny(any=[str(item) for item in value]))
+
+    return FieldCondition(key=field_name, match=MatchValue(value=str(value)))
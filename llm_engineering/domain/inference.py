@@ -0,0 +1,73 @@
+from abc import ABC, abstractmethod
+from typing import AsyncIterator
+
+from pydantic import BaseModel
+
+from llm_engineering.settings import settings
+
+
+class GenerationParameters(BaseModel):
+    max_new_tokens: int = settings.MAX_NEW_TOKENS_INFERENCE
+    temperature: float = settings.TEMPERATURE_INFERENCE
+    top_p: float = settings.TOP_P_INFERENCE
+
+    def __hash__(self) -> int:
+        # requests are only batched together when they share their parameters.
+        return hash((self.max_new_tokens, self.temperature, self.top_p))
+
+
+class Inference(ABC):
+    """
+    A backend serving the LLM. Generation is batched and streamed: `stream_batch` generates the answers of
+    several prompts at once and yields their tokens as they come, tagged with the index of their prompt.
+    """
+
+    @property
+    def model_id(self) -> str:
+        """
+        The served model, e.g. to key the cached responses.
+        """
+
+        return settings.HF_MODEL_ID
+
+    @abstractmethod
+    def stream_batch(self, prompts: list[str], parameters: GenerationParameters) -> AsyncIterator[tuple[int, str]]:
+        pass
+
+    async def stream(self, prompt: str, parameters: GenerationParameters | None = None) -> AsyncIterator[str]:
+        async for _, token in self.stream_batch([prompt], parameters or GenerationParameters()):
+            yield token
+
+    async def generate(self, prompt: str, parameters: GenerationParameters | None = None) -> str:
+        return "".join([token async for token in self.stream(prompt, parameters)])
+
+    @property
+    def tokenizer(self):
+        """
+        The tokenizer of the served model (`encode`, `decode` and `count`), loaded on first use.
+        """
+
+        # imported here, the tokenizer is only loaded by the backends that need it.
+        from llm_engineering.application.networks import ServingTokenizerSingleton
+
+        return ServingTokenizerSingleton()
+
+    def count_tokens(self, text: str) -> int:
+        """
+        Number of tokens of `text` for the served model, used to fill the batches up to `MAX_BATCH_TOTAL_TOKENS`.
+        """
+
+        return self.tokenizer.count(text)
+
+    def is_transient_error(self, error: Exception) -> bool:
+        """
+        Returns whether a failed generation is worth retrying, e.g. a timeout or a throttled request.
+        """
+
+        return False
+
+    # not abstract on purpose: only the backends holding connections have something to release.
+    async def aclose(self) -> None:  # noqa: B027
+        """
+        Releases the connections held by the backend.
+        """
@@ -0,0 +1,237 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+# SQLite limits the number of bound parameters of a statement, lookups are split in chunks below it.
+_SQLITE_MAX_VARIABLES = 500
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Thread-safe in-process cache evicting the least recently used entries once `max_size` is reached.
+    With `ttl_seconds`, entries also expire that long after being written.
+    A `max_size` of 0 disables the cache: nothing is stored and every lookup is a miss.
+    """
+
+    def __init__(self, max_size: int, ttl_seconds: float | None = None) -> None:
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+        # key -> (value, expiration time on the monotonic clock or None)
+        self._entries: OrderedDict[K, tuple[V, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: list[K]) -> dict[K, V]:
+        """
+        Returns the cached entries among `keys`, the missing and expired ones are left out.
+        """
+
+        now = time.monotonic()
+        with self._lock:
+            found = {}
+            for key in keys:
+                value, expires_at = self._entries.get(key, (_MISSING, None))
+                if value is not _MISSING and expires_at is not None and expires_at <= now:
+                    del self._entries[key]
+                    value = _MISSING
+                if value is _MISSING:
+                    self.misses += 1
+                    continue
+
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = value
+
+            return found
+
+    def put(self, key: K, value: V) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, entries: dict[K, V]) -> None:
+        if self.max_size <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            for key, value in entries.items():
+                self._entries[key] = (value, expires_at)
+                self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def pop(self, key: K) -> V | None:
+        with self._lock:
+            value, _ = self._entries.pop(key, (None, None))
+
+            return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups > 0 else 0.0
+
+
+class SQLiteCache:
+    """
+    On-disk key-value cache shared by every process (e.g. API workers) on the same machine.
+    Values are stored as JSON under a `namespace`, so several caches can share one file.
+    With `ttl_seconds`, entries expire that long after being written (wall clock, so across restarts too).
+    With `max_size`, the namespace keeps at most that many entries, evicting the least recently used ones.
+    """
+
+    def __init__(
+        self, path: Path | str, namespace: str, ttl_seconds: float | None = None, max_size: int | None = None
+    ) -> None:
+        self.path = Path(path)
+        self.namespace = namespace
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # sqlite3 connections can't be shared between threads, each thread opens its own.
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+
+        with self._connection() as connection:
+            connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL,
+                    accessed_at REAL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (namespace, accessed_at)")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self.get_many([key]).get(key, default)
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        found = {}
+        now = time.time()
+        connection = self._connection()
+        for start in range(0, len(keys), _SQLITE_MAX_VARIABLES):
+            keys_chunk = keys[start : start + _SQLITE_MAX_VARIABLES]
+            rows = connection.execute(
+                f"""
+                SELECT key, value FROM cache
+                WHERE namespace = ? AND key IN ({", ".join("?" * len(keys_chunk))})
+                AND (expires_at IS NULL OR expires_at > ?)
+                """,
+                (self.namespace, *keys_chunk, now),
+            )
+            found.update({key: json.loads(value) for key, value in rows})
+
+        if self.max_size is not None and len(found) > 0:
+            # the access times only matter to the eviction, the other caches skip these writes.
+            self._touch(list(found), now)
+
+        with self._stats_lock:
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+
+        return found
+
+    def put(self, key: str, value: Any) -> None:
+        self.put_many({key: value})
+
+    def put_many(self, entries: dict[str, Any]) -> None:
+        if len(entries) == 0:
+            return
+
+        now = time.time()
+        expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._connection() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                [(self.namespace, key, json.dumps(value), expires_at, now) for key, value in entries.items()],
+            )
+
+            if self.max_size is not None:
+                # every entry beyond the max_size most recently used ones.
+                connection.execute(
+                    """
+                    DELETE FROM cache WHERE namespace = ? AND key IN (
+                        SELECT key FROM cache WHERE namespace = ? ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+                    )
+                    """,
+                    (self.namespace, self.namespace, self.max_size),
+                )
+
+    def delete(self, keys: list[str]) -> None:
+        with self._connection() as connection:
+            connection.executemany(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?", [(self.namespace, key) for key in keys]
+            )
+
+    def delete_expired(self) -> int:
+        with self._connection() as connection:
+            cursor = connection.execute(
+                "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?", (self.namespace, time.time())
+            )
+
+            return cursor.rowcount
+
+    def clear(self) -> None:
+        with self._connection() as connection:
+            connection.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+
+    def __len__(self) -> int:
+        (num_entries,) = (
+            self._connection().execute("SELECT COUNT(*) FROM cache WHERE namespace = ?", (self.namespace,)).fetchone()
+        )
+
+        return num_entries
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def _touch(self, keys: list[str], accessed_at: float) -> None:
+        with self._connection() as connection:
+            connection.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                [(accessed_at, self.namespace, key) for key in keys],
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30.0)
+            # WAL lets readers in other processes go on while one process writes.
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+
+        return connection
@@ -0,0 +1,255 @@
+import fcntl
+import json
+import mmap
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+from loguru import logger
+from pymongo import ReplaceOne
+
+from llm_engineering.infrastructure.caching import LRUCache
+from llm_engineering.settings import settings
+
+
+class ContentStore(ABC):
+    """
+    Key-value store of the heavy payload fields (e.g. the chunk text) of the points of a Qdrant collection,
+    keyed by point id. In lean-payload mode Qdrant only keeps the vectors and the filter fields, and the
+    retrieved points are hydrated from here.
+    """
+
+    @abstractmethod
+    def put_many(self, collection_name: str, contents: dict[str, dict]) -> None:
+        pass
+
+    @abstractmethod
+    def get_many(self, collection_name: str, ids: list[str]) -> dict[str, dict]:
+        """
+        Returns the contents of the given ids in a single lookup, the unknown ids are left out.
+        """
+
+    @abstractmethod
+    def delete_collection(self, collection_name: str) -> None:
+        pass
+
+
+class MongoContentStore(ContentStore):
+    """
+    One MongoDB collection per Qdrant collection, the point id being the document `_id`.
+    """
+
+    def __init__(self) -> None:
+        # imported here so the mmap backend doesn't need a MongoDB client at all.
+        from llm_engineering.infrastructure.db.mongo import connection
+
+        self._database = connection.get_database(settings.DATABASE_NAME)
+
+    def put_many(self, collection_name: str, contents: dict[str, dict]) -> None:
+        if len(contents) == 0:
+            return
+
+        self._collection(collection_name).bulk_write(
+            [ReplaceOne({"_id": _id}, content, upsert=True) for _id, content in contents.items()], ordered=False
+        )
+
+    def get_many(self, collection_name: str, ids: list[str]) -> dict[str, dict]:
+        if len(ids) == 0:
+            return {}
+
+        documents = self._collection(collection_name).find({"_id": {"$in": ids}})
+
+        return {document.pop("_id"): document for document in documents}
+
+    def delete_collection(self, collection_name: str) -> None:
+        self._collection(collection_name).drop()
+
+    def _collection(self, collection_name: str):
+        return self._database[f"{collection_name}_content"]
+
+
+class MmapContentStore(ContentStore):
+    """
+    Append-only files per collection under `directory`:
+        - {collection}.data: the JSON encoded contents, one after the other, read through a memory map.
+        - {collection}.index: one "id<TAB>offset<TAB>length" line per write, the last line of an id wins.
+
+    Writes are serialized across processes by an exclusive lock on the data file. Other processes see new writes
+    as soon as a lookup misses, at which point the new index lines are read.
+    """
+
+    def __init__(self, directory: Path | str) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        self._collections: dict[str, _MmapCollection] = {}
+        self._lock = threading.Lock()
+
+    def put_many(self, collection_name: str, contents: dict[str, dict]) -> None:
+        self._collection(collection_name).put_many(contents)
+
+    def get_many(self, collection_name: str, ids: list[str]) -> dict[str, dict]:
+        return self._collection(collection_name).get_many(ids)
+
+    def delete_collection(self, collection_name: str) -> None:
+        with self._lock:
+            collection = self._collections.pop(collection_name, None)
+            if collection is not None:
+                collection.close()
+            for suffix in (".data", ".index"):
+                (self.directory / f"{collection_name}{suffix}").unlink(missing_ok=True)
+
+    def _collection(self, collection_name: str) -> "_MmapCollection":
+        with self._lock:
+            if collection_name not in self._collections:
+                self._collections[collection_name] = _MmapCollection(
+                    data_path=self.directory / f"{collection_name}.data",
+                    index_path=self.directory / f"{collection_name}.index",
+                )
+
+            return self._collections[collection_name]
+
+
+class _MmapCollection:
+    def __init__(self, data_path: Path, index_path: Path) -> None:
+        self.data_path = data_path
+        self.index_path = index_path
+        self.data_path.touch(exist_ok=True)
+        self.index_path.touch(exist_ok=True)
+
+        self._index: dict[str, tuple[int, int]] = {}
+        self._index_position = 0  # bytes of the index file already read
+        self._mmap: mmap.mmap | None = None
+        self._lock = threading.Lock()
+
+        self._read_index()
+
+    def put_many(self, contents: dict[str, dict]) -> None:
+        if len(contents) == 0:
+            return
+
+        with self._lock, self.data_path.open("ab") as data_file:
+            # held until the index is written: the offsets are only valid while no other process appends.
+            fcntl.flock(data_file, fcntl.LOCK_EX)
+            try:
+                # catching up with the other writers first, so the offsets below start at the real end of the file.
+                self._read_index()
+                offset = data_file.seek(0, os.SEEK_END)
+
+                index_lines = []
+                for _id, content in contents.items():
+                    data = json.dumps(content, default=str).encode("utf-8")
+                    data_file.write(data)
+                    index_lines.append(f"{_id}\t{offset}\t{len(data)}\n")
+                    self._index[_id] = (offset, len(data))
+                    offset += len(data)
+                data_file.flush()
+
+                # the index is written after the data, so a reader never sees an entry pointing past the data.
+                with self.index_path.open("a", encoding="utf-8") as index_file:
+                    index_file.write("".join(index_lines))
+                    self._index_position = index_file.tell()
+            finally:
+                fcntl.flock(data_file, fcntl.LOCK_UN)
+
+    def get_many(self, ids: list[str]) -> dict[str, dict]:
+        with self._lock:
+            if any(_id not in self._index for _id in ids):
+                self._read_index()
+
+            locations = {_id: self._index[_id] for _id in ids if _id in self._index}
+            if len(locations) == 0:
+                return {}
+
+            end = max(offset + length for offset, length in locations.values())
+            if self._mmap is None or len(self._mmap) < end:
+                self._remap()
+
+            return {
+                _id: json.loads(self._mmap[offset : offset + length]) for _id, (offset, length) in locations.items()
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+
+    def _read_index(self) -> None:
+        with self.index_path.open(encoding="utf-8") as index_file:
+            index_file.seek(self._index_position)
+            for line in index_file:
+                if not line.endswith("\n"):
+                    # a line still being written by another process, read it next time.
+                    break
+
+                _id, offset, length = line.rstrip("\n").split("\t")
+                self._index[_id] = (int(offset), int(length))
+                self._index_position += len(line.encode("utf-8"))
+
+    def _remap(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+
+        with self.data_path.open("rb") as data_file:
+            self._mmap = mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class CachedContentStore(ContentStore):
+    """
+    LRU in front of another store: the contents of the chunks retrieved most often never leave the process.
+    """
+
+    def __init__(self, store: ContentStore, cache_size: int) -> None:
+        self.store = store
+        self.cache: LRUCache[tuple[str, str], dict] = LRUCache(max_size=cache_size)
+
+    def put_many(self, collection_name: str, contents: dict[str, dict]) -> None:
+        self.store.put_many(collection_name, contents)
+        self.cache.put_many({(collection_name, _id): content for _id, content in contents.items()})
+
+    def get_many(self, collection_name: str, ids: list[str]) -> dict[str, dict]:
+        cached = self.cache.get_many([(collection_name, _id) for _id in ids])
+        contents = {_id: content for (_, _id), content in cached.items()}
+
+        missing_ids = [_id for _id in ids if _id not in contents]
+        if len(missing_ids) > 0:
+            fetched = self.store.get_many(collection_name, missing_ids)
+            self.cache.put_many({(collection_name, _id): content for _id, content in fetched.items()})
+            contents.update(fetched)
+
+        return contents
+
+    def delete_collection(self, collection_name: str) -> None:
+        self.store.delete_collection(collection_name)
+        self.cache.clear()
+
+
+def build_content_store() -> ContentStore:
+    if settings.CONTENT_STORE_BACKEND == "mongo":
+        store = MongoContentStore()
+    elif settings.CONTENT_STORE_BACKEND == "mmap":
+        store = MmapContentStore(settings.CONTENT_STORE_PATH)
+    else:
+        raise ValueError(f"Unsupported content store backend: {settings.CONTENT_STORE_BACKEND}")
+
+    logger.info(f"Using the '{settings.CONTENT_STORE_BACKEND}' content store for lean payloads.")
+
+    if settings.CONTENT_STORE_CACHE_SIZE > 0:
+        store = CachedContentStore(store, cache_size=settings.CONTENT_STORE_CACHE_SIZE)
+
+    return store
+
+
+class ContentStoreSingleton:
+    _instance: ContentStore | None = None
+    _lock = threading.Lock()
+
+    def __new__(cls) -> ContentStore:
+        # built on first use: collections with full payloads never need a content store.
+        with cls._lock:
+            if cls._instance is None:
+                cls._instance = build_content_store()
+
+        return cls._instance
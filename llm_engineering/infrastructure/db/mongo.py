@@ -11,7 +11,7 @@ class MongoDatabaseConnector:
     def __new__(cls, *args, **kwargs) -> MongoClient:
         if cls._instance is None:
             try:
-                cle._instance = MongoClient(settings.DATABASE_HOST)
+                cls._instance = MongoClient(settings.DATABASE_HOST)
             except ConnectionFailure as e:
                 logger.error(f"Couldn't connect to the database: {e!s}")
 
@@ -19,7 +19,7 @@ class MongoDatabaseConnector:
             
             logger.info(f"Connection to MongoDB with URI successful: {settings.DATABASE_HOST}")
 
-            return cls._instance
+        return cls._instance
 
 connection = MongoDatabaseConnector()
 
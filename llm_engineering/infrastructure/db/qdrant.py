@@ -1,47 +1,169 @@
+import asyncio
+import functools
+import threading
+
+import grpc
 from loguru import logger
-from qdrant_client import QdrantClient
-from qdrant_client.http.exceptions import UnexpectedResponse
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
 
 from llm_engineering.settings import settings
 
 
+def get_client_kwargs(**overrides) -> dict:
+    """
+    Builds the keyword arguments shared by the sync and async Qdrant clients from the settings.
+    Any keyword argument passed in overrides the value from the settings (e.g. `prefer_grpc=True` in benchmarks).
+    """
+
+    if settings.USE_QDRANT_LOCAL:
+        # local mode runs the collections inside this process, there is no transport to configure.
+        if settings.QDRANT_LOCAL_PATH == ":memory:":
+            kwargs = {"location": ":memory:"}
+        else:
+            kwargs = {"path": settings.QDRANT_LOCAL_PATH}
+        kwargs.update(overrides)
+
+        return kwargs
+
+    if settings.USE_QDRANT_CLOUD:
+        kwargs = {
+            "url": settings.QDRANT_CLOUD_URL,
+            "api_key": settings.QDRANT_API_KEY,
+        }
+    else:
+        kwargs = {
+            "host": settings.QDRANT_DATABASE_HOST,
+            "port": settings.QDRANT_DATABASE_PORT,
+        }
+
+    # gRPC skips the JSON serialization of the vectors, which matters when upserting or searching in bulk.
+    kwargs["grpc_port"] = settings.QDRANT_GRPC_PORT
+    kwargs["prefer_grpc"] = settings.QDRANT_PREFER_GRPC
+    kwargs["timeout"] = settings.QDRANT_TIMEOUT
+    kwargs.update(overrides)
+
+    return kwargs
+
+
+def get_uri(client_kwargs: dict) -> str:
+    if "location" in client_kwargs or "path" in client_kwargs:
+        return f"{client_kwargs.get('location') or client_kwargs['path']} (local mode)"
+
+    if "url" in client_kwargs:
+        uri = client_kwargs["url"]
+    else:
+        port = client_kwargs["grpc_port"] if client_kwargs.get("prefer_grpc") else client_kwargs["port"]
+        uri = f"{client_kwargs['host']}:{port}"
+
+    transport = "gRPC" if client_kwargs.get("prefer_grpc") else "HTTP"
+
+    return f"{uri} ({transport})"
+
+
+class LocalModeClient:
+    """
+    Local mode keeps the collections in plain Python and numpy structures that are not thread safe,
+    while the loaders and retrievers call the client from thread pools. This proxy serializes every call.
+    """
+
+    def __init__(self, client: QdrantClient) -> None:
+        self._client = client
+        self._lock = threading.RLock()
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def locked(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+
+        return locked
+
+
+class LocalModeAsyncClient:
+    """
+    Async counterpart of `LocalModeClient`: an `AsyncQdrantClient` in local mode would hold its own, empty
+    collections, so the calls are run by the sync client (and its lock) in a worker thread instead.
+    """
+
+    def __init__(self, client: QdrantClient | LocalModeClient) -> None:
+        self._client = client
+
+    def __getattr__(self, name: str):
+        attribute = getattr(self._client, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        async def in_thread(*args, **kwargs):
+            return await asyncio.to_thread(attribute, *args, **kwargs)
+
+        return in_thread
+
+
 class QdrantDatabaseConnector:
     """
     Returns an instance of a Qdrant DB connection via either cloud url or host/port settings.
     """
-    _instance: QdrantClient | None = None
+    _instance: QdrantClient | LocalModeClient | None = None
 
     def __new__(cls, *args, **kwargs)-> QdrantClient:
         if cls._instance is None:
-            try: # trying to connect and create a qdrant cloud instance if in settings
-                if settings.USE_QDRANT_CLOUD:
-                    cls._instance = QdrantClient(
-                        url=settings.QDRANT_CLOUD_URL, 
-                        api_key=settings.QDRANT_APIKEY, 
-                    )
-
-                    # local connection to view the connection via the cloud
-                    uri = settings.QDRANT_CLOUD_URL
-                else: # creating a local instance if cloud settings not present
-                    cls._instance = QdrantClient(
-                        host=settings.QDRANT_DATABASE_HOST,
-                        port=settings.QDRANT_DATABASE_PORT
-                    )
-
-                    uri = f"{settings.QDRANT_DATABASE_HOST}:{settings.QDRANT_DATABASE_PORT}"
-
-                logger.info(f"Connection to Qdrant DB with uri successful: {uri}")
+            client_kwargs = get_client_kwargs()
+            try: # trying to connect and create a qdrant cloud instance if in settings, a local one otherwise
+                cls._instance = QdrantClient(**client_kwargs)
+                if settings.USE_QDRANT_LOCAL:
+                    cls._instance = LocalModeClient(cls._instance)
+
+                logger.info(f"Connection to Qdrant DB with uri successful: {get_uri(client_kwargs)}")
             except UnexpectedResponse:
                 logger.exception(
                     "Couldn't connect to Qdrant.",
-                    host=settings.QDRANT_DATABASE_HOST, 
+                    host=settings.QDRANT_DATABASE_HOST,
                     port=settings.QDRANT_DATABASE_PORT,
                     url=settings.QDRANT_CLOUD_URL
                 )
 
-                raise 
+                raise
 
 
         return cls._instance
-    
-connection = QdrantDatabaseConnector()
\ No newline at end of file
+
+
+class AsyncQdrantDatabaseConnector:
+    """
+    Returns an instance of an asyncio Qdrant DB connection built from the same settings as `QdrantDatabaseConnector`.
+    It is created lazily, as it should only be used from within a running event loop.
+
+    In local mode an async client would hold its own collections (an in-memory one starts empty, and an on-disk
+    one can't open a path already opened by the sync client), so the sync client is used from a thread instead.
+    """
+    _instance: AsyncQdrantClient | LocalModeAsyncClient | None = None
+
+    def __new__(cls, *args, **kwargs) -> AsyncQdrantClient:
+        if cls._instance is None:
+            if settings.USE_QDRANT_LOCAL:
+                cls._instance = LocalModeAsyncClient(QdrantDatabaseConnector())
+
+                return cls._instance
+
+            client_kwargs = get_client_kwargs()
+            cls._instance = AsyncQdrantClient(**client_kwargs)
+
+            logger.info(f"Async connection to Qdrant DB with uri successful: {get_uri(client_kwargs)}")
+
+        return cls._instance
+
+
+# Errors of a failed request: the server answers with an unexpected response over HTTP or an RpcError over gRPC,
+# or no response is received at all (connection refused, timeout...). Local mode raises ValueErrors instead
+# (e.g. "Collection embedded_posts not found").
+REQUEST_ERRORS: tuple[type[Exception], ...] = (UnexpectedResponse, ResponseHandlingException, grpc.RpcError)
+if settings.USE_QDRANT_LOCAL:
+    REQUEST_ERRORS += (ValueError,)
+
+connection = QdrantDatabaseConnector()
@@ -0,0 +1,89 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from loguru import logger
+from pydantic import BaseModel
+
+from llm_engineering.application.rag.retriever import ContextRetriever, RetrievalResult
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.infrastructure.llm_response_cache import build_llm_response_cache
+from llm_engineering.model.inference import GenerationBatcher, InferenceExecutor, build_inference
+from llm_engineering.settings import settings
+
+# the stub backend needs no OpenAI key either, the retrieval LLM steps are mocked with it.
+retriever = ContextRetriever(mock=settings.LLM_INFERENCE_BACKEND == "local_stub")
+llm = GenerationBatcher(build_inference())
+llm_response_cache = build_llm_response_cache()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    # loading the tokenizer is blocking (a Hugging Face download on a cold start), not the first request's job.
+    await asyncio.to_thread(lambda: llm.tokenizer)
+
+    yield
+
+    await llm.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+class QueryRequest(BaseModel):
+    query: str
+
+
+class QueryResponse(BaseModel):
+    answer: str
+
+
+async def rag(query: str) -> AsyncIterator[str]:
+    """
+    Retrieves the context of the query and streams the generated answer.
+    The answer of a similar enough query is served straight from the semantic cache, when enabled.
+    """
+
+    result = await retriever.aretrieve(query, k=3)
+    if result.cached_answer is not None:
+        logger.info("Serving the answer from the semantic cache.")
+        yield result.cached_answer
+
+        return
+
+    # tokenizing the chunks is CPU-bound, keep it off the event loop.
+    context = await asyncio.to_thread(EmbeddedChunk.to_context, result.chunks, llm.tokenizer)
+    tokens = []
+    async for token in InferenceExecutor(llm, query, context, cache=llm_response_cache).stream():
+        tokens.append(token)
+        yield token
+
+    await _cache_answer(result, "".join(tokens))
+
+
+async def _cache_answer(result: RetrievalResult, answer: str) -> None:
+    if result.cache_entry_id is None or retriever.semantic_cache is None:
+        return
+
+    await asyncio.to_thread(retriever.semantic_cache.set_answer, result.cache_entry_id, answer)
+
+
+@app.post("/rag", response_model=QueryResponse)
+async def rag_endpoint(request: QueryRequest):
+    try:
+        answer = "".join([token async for token in rag(query=request.query)])
+
+        return {"answer": answer}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+@app.post("/rag/stream")
+async def rag_stream_endpoint(request: QueryRequest):
+    """
+    Same as /rag, but the answer is streamed as plain text while it is generated.
+    """
+
+    return StreamingResponse(rag(query=request.query), media_type="text/plain")
@@ -0,0 +1,75 @@
+import hashlib
+import json
+from typing import Any
+
+from llm_engineering.settings import settings
+
+from .caching import SQLiteCache
+
+
+class LLMResponseCache:
+    """
+    Persistent cache of LLM responses, so identical prompts are generated once across runs, e.g. when dataset
+    generation is re-run after a pipeline failure.
+
+    Responses are keyed by a hash of the model id, the prompt (a string or chat messages) and the generation
+    parameters, and stored in a SQLite file keeping the `max_size` most recently used ones.
+
+    A generation sampled with a temperature above 0 is not reproducible, so by default it bypasses the cache:
+    - with `allow_sampled`, sampled responses are shared across all the runs, like the greedy ones.
+    - with a `run_id`, sampled responses are only reused by the runs with the same id: re-running a failed run
+      with its id resumes it, while a run with a new id samples new responses.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_size: int | None = settings.LLM_RESPONSE_CACHE_MAX_SIZE,
+        allow_sampled: bool = settings.LLM_RESPONSE_CACHE_ALLOW_SAMPLED,
+        run_id: str | None = settings.LLM_RESPONSE_CACHE_RUN_ID,
+    ) -> None:
+        self.allow_sampled = allow_sampled
+        self.run_id = run_id
+        self.disk = SQLiteCache(path, namespace="llm_responses", max_size=max_size)
+
+    def is_cacheable(self, parameters: dict[str, Any]) -> bool:
+        return self.allow_sampled or self.run_id is not None or not self._is_sampled(parameters)
+
+    def key(self, model_id: str, prompt: str | list[dict[str, str]], parameters: dict[str, Any]) -> str:
+        request = {"model_id": model_id, "prompt": prompt, "parameters": parameters}
+        if self._is_sampled(parameters) and not self.allow_sampled:
+            # scoped to the run, see the class docstring.
+            request["run_id"] = self.run_id
+        request = json.dumps(request, sort_keys=True, ensure_ascii=False)
+
+        return hashlib.sha256(request.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _is_sampled(parameters: dict[str, Any]) -> bool:
+        return parameters.get("temperature", 0.0) != 0.0
+
+    def get_many(self, keys: list[str]) -> dict[str, str]:
+        return self.disk.get_many(keys)
+
+    def put_many(self, responses: dict[str, str]) -> None:
+        self.disk.put_many(responses)
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "hits": self.disk.hits,
+            "misses": self.disk.misses,
+            "hit_rate": self.disk.hit_rate,
+            "size": len(self.disk),
+        }
+
+
+def build_llm_response_cache(run_id: str | None = None) -> LLMResponseCache | None:
+    if settings.LLM_RESPONSE_CACHE_PATH is None:
+        return None
+
+    return LLMResponseCache(
+        settings.LLM_RESPONSE_CACHE_PATH,
+        max_size=settings.LLM_RESPONSE_CACHE_MAX_SIZE,
+        allow_sampled=settings.LLM_RESPONSE_CACHE_ALLOW_SAMPLED,
+        run_id=run_id or settings.LLM_RESPONSE_CACHE_RUN_ID,
+    )
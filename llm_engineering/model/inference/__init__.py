@@ -0,0 +1,20 @@
+from .batching import GenerationBatcher
+from .inference import (
+    LLMInferenceLocalStub,
+    LLMInferenceOpenAICompatible,
+    LLMInferenceSagemakerEndpoint,
+    build_inference,
+)
+from .resilience import CircuitBreaker, ResilientInference
+from .run import InferenceExecutor
+
+__all__ = [
+    "CircuitBreaker",
+    "GenerationBatcher",
+    "InferenceExecutor",
+    "LLMInferenceLocalStub",
+    "LLMInferenceOpenAICompatible",
+    "LLMInferenceSagemakerEndpoint",
+    "ResilientInference",
+    "build_inference",
+]
@@ -0,0 +1,132 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator
+
+from loguru import logger
+
+from llm_engineering.domain.inference import GenerationParameters, Inference
+from llm_engineering.settings import settings
+
+# Marks the end of the stream of a request.
+_END_OF_STREAM = object()
+
+
+class _GenerationRequest:
+    def __init__(self, prompt: str, parameters: GenerationParameters, num_tokens: int) -> None:
+        self.prompt = prompt
+        self.parameters = parameters
+        self.num_tokens = num_tokens  # prompt and generated tokens, the request's share of the batch
+        self.tokens: asyncio.Queue = asyncio.Queue()
+
+
+class GenerationBatcher:
+    """
+    Batches the concurrent generation requests of a serving process before they reach the LLM backend.
+
+    The requests arriving within `max_wait_seconds` of each other (and sharing their generation parameters)
+    are sent as one batch. A request is admitted as long as the tokens of the requests in flight (prompt plus
+    `max_new_tokens` each) stay within `max_batch_total_tokens`, the budget the model server is configured
+    with, the others queue here in arrival order. A request larger than the budget alone still runs alone.
+
+    An instance is bound to the event loop it is first used from.
+    """
+
+    def __init__(
+        self,
+        llm: Inference,
+        max_batch_total_tokens: int = settings.MAX_BATCH_TOTAL_TOKENS,
+        max_wait_seconds: float = settings.INFERENCE_BATCH_MAX_WAIT_SECONDS,
+    ) -> None:
+        self.llm = llm
+        self.max_batch_total_tokens = max_batch_total_tokens
+        self.max_wait_seconds = max_wait_seconds
+
+        self._queue: deque[_GenerationRequest] = deque()
+        self._in_flight_tokens = 0
+        self._wakeup: asyncio.Event | None = None
+        self._scheduler: asyncio.Task | None = None
+        self._batches: set[asyncio.Task] = set()
+
+    @property
+    def model_id(self) -> str:
+        return self.llm.model_id
+
+    @property
+    def tokenizer(self):
+        return self.llm.tokenizer
+
+    async def generate(self, prompt: str, parameters: GenerationParameters | None = None) -> str:
+        return "".join([token async for token in self.stream(prompt, parameters)])
+
+    async def stream(self, prompt: str, parameters: GenerationParameters | None = None) -> AsyncIterator[str]:
+        parameters = parameters or GenerationParameters()
+        num_tokens = await asyncio.to_thread(self.llm.count_tokens, prompt) + parameters.max_new_tokens
+        request = _GenerationRequest(prompt=prompt, parameters=parameters, num_tokens=num_tokens)
+
+        self._ensure_scheduler()
+        self._queue.append(request)
+        self._wakeup.set()
+
+        try:
+            while True:
+                token = await request.tokens.get()
+                if token is _END_OF_STREAM:
+                    return
+                if isinstance(token, BaseException):
+                    raise token
+
+                yield token
+        finally:
+            # e.g. the client disconnected before the request was scheduled, it is not worth generating anymore.
+            if request in self._queue:
+                self._queue.remove(request)
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
+
+    def _ensure_scheduler(self) -> None:
+        if self._scheduler is None or self._scheduler.done():
+            self._wakeup = asyncio.Event()
+            self._scheduler = asyncio.create_task(self._schedule())
+
+    async def _schedule(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            # the requests arriving meanwhile join the batch.
+            await asyncio.sleep(self.max_wait_seconds)
+
+            batches: dict[GenerationParameters, list[_GenerationRequest]] = {}
+            while len(self._queue) > 0:
+                request = self._queue[0]
+                fits = self._in_flight_tokens + request.num_tokens <= self.max_batch_total_tokens
+                if not fits and self._in_flight_tokens > 0:
+                    # woken up again when a batch finishes and frees its tokens.
+                    break
+
+                self._queue.popleft()
+                self._in_flight_tokens += request.num_tokens
+                batches.setdefault(request.parameters, []).append(request)
+
+            for parameters, requests in batches.items():
+                batch = asyncio.create_task(self._run_batch(requests, parameters))
+                # keeping a reference, the event loop only holds weak ones to its tasks.
+                self._batches.add(batch)
+                batch.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, requests: list[_GenerationRequest], parameters: GenerationParameters) -> None:
+        logger.debug(f"Generating a batch of {len(requests)} requests ({self._in_flight_tokens} tokens in flight).")
+
+        try:
+            async for index, token in self.llm.stream_batch([request.prompt for request in requests], parameters):
+                requests[index].tokens.put_nowait(token)
+        except Exception as e:
+            logger.exception("Failed to generate a batch.")
+            for request in requests:
+                request.tokens.put_nowait(e)
+        finally:
+            for request in requests:
+                request.tokens.put_nowait(_END_OF_STREAM)
+
+            self._in_flight_tokens -= sum(request.num_tokens for request in requests)
+            self._wakeup.set()
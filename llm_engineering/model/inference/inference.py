@@ -0,0 +1,293 @@
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Iterator
+
+import httpx
+from loguru import logger
+
+from llm_engineering.domain.inference import GenerationParameters, Inference
+from llm_engineering.settings import settings
+
+from .resilience import ResilientInference
+
+try:
+    import boto3
+    from botocore.config import Config
+    from botocore.exceptions import BotoCoreError, ClientError
+except ModuleNotFoundError:
+    logger.warning("Couldn't load AWS or SageMaker imports. Run 'poetry install --with aws' to support AWS.")
+
+# HTTP status codes worth retrying: rate limiting and temporary server side failures.
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+# Their SageMaker runtime counterparts.
+TRANSIENT_SAGEMAKER_ERROR_CODES = {
+    "ThrottlingException",
+    "ServiceUnavailable",
+    "InternalFailure",
+    "InternalStreamFailure",
+    "ModelNotReadyException",
+}
+
+
+class LLMInferenceSagemakerEndpoint(Inference):
+    """
+    The LLM deployed on a SageMaker endpoint with the Hugging Face TGI container, streamed token by token.
+
+    TGI batches the requests it receives continuously on the GPU, so a batch is sent as one streaming request
+    per prompt, all in flight at once. The batches are sized by `GenerationBatcher` to the endpoint's
+    `MAX_BATCH_TOTAL_TOKENS`, so requests beyond what the endpoint can batch wait here instead of on the GPU.
+
+    The client keeps `max_connections` connections open to the endpoint, read by as many worker threads.
+    Its own retries are disabled, `ResilientInference` retries and hedges the requests instead.
+    """
+
+    def __init__(
+        self,
+        endpoint_name: str = settings.SAGEMAKER_ENDPOINT_INFERENCE,
+        inference_component_name: str | None = None,
+        max_connections: int = settings.LLM_INFERENCE_MAX_CONNECTIONS,
+        timeout_seconds: float = settings.LLM_INFERENCE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.endpoint_name = endpoint_name
+        self.inference_component_name = inference_component_name
+
+        self.client = boto3.client(
+            "sagemaker-runtime",
+            region_name=settings.AWS_REGION,
+            aws_access_key_id=settings.AWS_ACCESS_KEY,
+            aws_secret_access_key=settings.AWS_SECRET_KEY,
+            config=Config(
+                max_pool_connections=max_connections,
+                read_timeout=timeout_seconds,
+                retries={"total_max_attempts": 1},
+            ),
+        )
+        # not used as a context manager: it lives as long as the client, reused by every batch.
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="sagemaker-stream")
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue[tuple[int, str | BaseException | None]] = asyncio.Queue()
+
+        stop = threading.Event()
+
+        def read_stream(index: int, prompt: str) -> None:
+            # boto3 is blocking: each stream is read on a worker thread and its tokens handed to the event loop.
+            try:
+                for token in self._invoke_stream(prompt, parameters):
+                    if stop.is_set():
+                        # the batch was cancelled (e.g. hedged), closing the stream frees the connection.
+                        return
+                    loop.call_soon_threadsafe(events.put_nowait, (index, token))
+                loop.call_soon_threadsafe(events.put_nowait, (index, None))
+            except Exception as e:
+                if not stop.is_set():
+                    loop.call_soon_threadsafe(events.put_nowait, (index, e))
+
+        readers = [loop.run_in_executor(self._executor, read_stream, i, prompt) for i, prompt in enumerate(prompts)]
+        try:
+            num_finished = 0
+            while num_finished < len(prompts):
+                index, event = await events.get()
+                if event is None:
+                    num_finished += 1
+                elif isinstance(event, BaseException):
+                    raise event
+                else:
+                    yield index, event
+        finally:
+            stop.set()
+            for reader in readers:
+                reader.cancel()
+
+    def _invoke_stream(self, prompt: str, parameters: GenerationParameters) -> Iterator[str]:
+        invoke_args = {
+            "EndpointName": self.endpoint_name,
+            "ContentType": "application/json",
+            "Body": json.dumps(self._payload(prompt, parameters)),
+        }
+        if self.inference_component_name not in (None, "None"):
+            invoke_args["InferenceComponentName"] = self.inference_component_name
+
+        response = self.client.invoke_endpoint_with_response_stream(**invoke_args)
+
+        # TGI streams server-sent events, one "data:{...}" line per token, split arbitrarily into payload parts.
+        buffer = b""
+        try:
+            for event in response["Body"]:
+                buffer += event.get("PayloadPart", {}).get("Bytes", b"")
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if not line.startswith(b"data:"):
+                        continue
+
+                    token = json.loads(line[len(b"data:") :])["token"]
+                    if not token.get("special", False):
+                        yield token["text"]
+        finally:
+            response["Body"].close()
+
+    @staticmethod
+    def _payload(prompt: str, parameters: GenerationParameters) -> dict:
+        payload = {
+            "inputs": prompt,
+            "parameters": {
+                "max_new_tokens": parameters.max_new_tokens,
+                "return_full_text": False,
+            },
+            "stream": True,
+        }
+        # TGI rejects a temperature of 0, decoding greedily without sampling parameters instead.
+        if parameters.temperature > 0:
+            payload["parameters"].update({"temperature": parameters.temperature, "top_p": parameters.top_p})
+
+        return payload
+
+    def is_transient_error(self, error: Exception) -> bool:
+        if isinstance(error, ClientError):
+            return error.response.get("Error", {}).get("Code") in TRANSIENT_SAGEMAKER_ERROR_CODES
+
+        # connection failures and timeouts.
+        return isinstance(error, BotoCoreError)
+
+    async def aclose(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self.client.close()
+
+
+class LLMInferenceOpenAICompatible(Inference):
+    """
+    The LLM served behind an OpenAI compatible completions API (TGI, vLLM, or the local stub server of
+    tools/llm_stub_server.py), streamed token by token.
+
+    A batch is sent as a single request with one prompt per choice, the server batches them on the GPU.
+    The HTTP client keeps a pool of `max_connections` connections open to the server and is created on first
+    use, bound to the event loop of the serving process.
+    """
+
+    def __init__(
+        self,
+        endpoint_url: str = settings.LLM_INFERENCE_ENDPOINT_URL,
+        model: str | None = settings.LLM_INFERENCE_MODEL,
+        api_key: str | None = settings.LLM_INFERENCE_API_KEY,
+        max_connections: int = settings.LLM_INFERENCE_MAX_CONNECTIONS,
+        timeout_seconds: float = settings.LLM_INFERENCE_TIMEOUT_SECONDS,
+    ) -> None:
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.model = model or settings.HF_MODEL_ID
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout_seconds = timeout_seconds
+
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def model_id(self) -> str:
+        return self.model
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.endpoint_url,
+                headers={"Authorization": f"Bearer {self.api_key}"} if self.api_key else None,
+                # the read timeout bounds the wait between two tokens, the generation's one is ResilientInference's.
+                timeout=httpx.Timeout(self.timeout_seconds, connect=5.0),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections, max_keepalive_connections=self.max_connections
+                ),
+            )
+
+        return self._client
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        payload = {
+            "model": self.model,
+            "prompt": prompts,
+            "max_tokens": parameters.max_new_tokens,
+            "temperature": parameters.temperature,
+            "top_p": parameters.top_p,
+            "stream": True,
+        }
+
+        async with self.client.stream("POST", "/v1/completions", json=payload) as response:
+            response.raise_for_status()
+
+            # server-sent events, one "data: {...}" line per token and a final "data: [DONE]".
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+
+                data = line[len("data:") :].strip()
+                if data == "[DONE]":
+                    return
+
+                for choice in json.loads(data)["choices"]:
+                    if choice.get("text"):
+                        yield choice["index"], choice["text"]
+
+    def is_transient_error(self, error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in TRANSIENT_STATUS_CODES
+
+        # connection failures, timeouts and connections closed mid-stream.
+        return isinstance(error, httpx.TransportError)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class LLMInferenceLocalStub(Inference):
+    """
+    A fake LLM for tests and load tests, behaving like a batched GPU server: after a prefill, every decoding
+    step takes `step_seconds` whatever the batch size and yields one token (a word of the prompt) per sequence.
+    Its tokens being words, it counts them with a `WordTokenizer` and needs no Hugging Face tokenizer.
+    """
+
+    def __init__(self, prefill_seconds: float = 0.05, step_seconds: float = 0.02) -> None:
+        # imported here, like the tokenizer of the other backends.
+        from llm_engineering.application.networks import WordTokenizer
+
+        self.prefill_seconds = prefill_seconds
+        self.step_seconds = step_seconds
+        self._tokenizer = WordTokenizer()
+
+    @property
+    def model_id(self) -> str:
+        return "local_stub"
+
+    @property
+    def tokenizer(self):
+        return self._tokenizer
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        words = [prompt.split() or ["stub"] for prompt in prompts]
+
+        await asyncio.sleep(self.prefill_seconds)
+        for step in range(parameters.max_new_tokens):
+            for index, prompt_words in enumerate(words):
+                yield index, f" {prompt_words[step % len(prompt_words)]}"
+            await asyncio.sleep(self.step_seconds)
+
+
+def build_inference() -> Inference:
+    if settings.LLM_INFERENCE_BACKEND == "sagemaker":
+        llm = LLMInferenceSagemakerEndpoint()
+    elif settings.LLM_INFERENCE_BACKEND == "openai_compatible":
+        llm = LLMInferenceOpenAICompatible()
+    elif settings.LLM_INFERENCE_BACKEND == "local_stub":
+        return LLMInferenceLocalStub()
+    else:
+        raise ValueError(f"Unsupported LLM inference backend: {settings.LLM_INFERENCE_BACKEND}")
+
+    return ResilientInference(llm)
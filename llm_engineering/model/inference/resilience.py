@@ -0,0 +1,280 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import AsyncIterator
+
+import numpy as np
+from loguru import logger
+
+from llm_engineering.domain.exceptions import CircuitBreakerOpen
+from llm_engineering.domain.inference import GenerationParameters, Inference
+from llm_engineering.settings import settings
+
+# Latest first token latencies the hedging percentile is computed over.
+LATENCY_WINDOW_SIZE = 1_000
+# Requests are not hedged before this many latencies are known.
+HEDGE_MIN_SAMPLES = 20
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the LLM backend is down instead of piling up requests waiting for their timeouts.
+
+    The circuit opens when at least `failure_rate` of the latest `window_size` calls failed transiently
+    (and `min_calls` of them are known), then rejects every call during `reset_seconds`. It is then half open:
+    a single trial call goes through, closing the circuit if it succeeds and opening it again otherwise.
+    A rate rather than consecutive failures, so a burst of concurrent failures does not open it alone.
+
+    Meant to be used from a single event loop, it is not thread safe.
+    """
+
+    def __init__(
+        self,
+        failure_rate: float = settings.LLM_INFERENCE_CIRCUIT_BREAKER_FAILURE_RATE,
+        window_size: int = settings.LLM_INFERENCE_CIRCUIT_BREAKER_WINDOW_SIZE,
+        min_calls: int = 10,
+        reset_seconds: float = settings.LLM_INFERENCE_CIRCUIT_BREAKER_RESET_SECONDS,
+    ) -> None:
+        self.failure_rate = failure_rate
+        self.window_size = window_size
+        self.min_calls = min(min_calls, window_size)
+        self.reset_seconds = reset_seconds
+
+        self._outcomes: deque[bool] = deque(maxlen=window_size)  # True for the failed calls
+        self._opened_at: float | None = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.reset_seconds:
+            return "open"
+
+        return "half_open"
+
+    def acquire(self) -> None:
+        """
+        Raises CircuitBreakerOpen when the call must not reach the backend.
+        Every successful acquire is followed by a record_success, record_failure or release.
+        """
+
+        state = self.state
+        if state == "open" or (state == "half_open" and self._trial_in_flight):
+            retry_in = self.reset_seconds - (time.monotonic() - self._opened_at)
+            raise CircuitBreakerOpen(f"The LLM backend is unavailable, it is retried in {max(retry_in, 0.0):.1f}s.")
+
+        if state == "half_open":
+            self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        if self._opened_at is not None:
+            logger.info("The LLM backend recovered, closing the circuit breaker.")
+            self._outcomes.clear()
+            self._opened_at = None
+
+        self._outcomes.append(False)
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self._outcomes.append(True)
+        self._trial_in_flight = False
+
+        num_failures = sum(self._outcomes)
+        if self._opened_at is not None or (
+            len(self._outcomes) >= self.min_calls and num_failures >= self.failure_rate * len(self._outcomes)
+        ):
+            logger.warning(
+                f"Opening the circuit breaker of the LLM backend for {self.reset_seconds}s "
+                f"after {num_failures} failures out of the latest {len(self._outcomes)} calls."
+            )
+            self._opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """
+        Ends a call that neither succeeded nor failed, e.g. cancelled by its client.
+        """
+
+        self._trial_in_flight = False
+
+
+class ResilientInference(Inference):
+    """
+    Wraps an LLM backend with the fault tolerance of the serving path, the endpoint latency tail dominating
+    the end-to-end one:
+
+    - a timeout for the first token and one for the whole generation, per attempt;
+    - retries of the transient failures (see `Inference.is_transient_error`), with exponential backoff and jitter;
+    - hedging: when the first token is slower than the `hedge_percentile` of the latest ones, a duplicate request
+      is sent and the first one to answer is kept, the other is cancelled;
+    - a circuit breaker, failing fast while the backend is down.
+
+    A batch is only retried or hedged until its first token: past that, its tokens are streamed to the clients
+    already and a failure is raised to them.
+    """
+
+    def __init__(
+        self,
+        llm: Inference,
+        timeout_seconds: float = settings.LLM_INFERENCE_TIMEOUT_SECONDS,
+        first_token_timeout_seconds: float = settings.LLM_INFERENCE_FIRST_TOKEN_TIMEOUT_SECONDS,
+        max_retries: int = settings.LLM_INFERENCE_MAX_RETRIES,
+        retry_backoff_seconds: float = settings.LLM_INFERENCE_RETRY_BACKOFF_SECONDS,
+        hedge_percentile: float = settings.LLM_INFERENCE_HEDGE_PERCENTILE,
+        circuit_breaker: CircuitBreaker | None = None,
+    ) -> None:
+        self.llm = llm
+        self.timeout_seconds = timeout_seconds
+        self.first_token_timeout_seconds = first_token_timeout_seconds
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.hedge_percentile = hedge_percentile
+        self.circuit_breaker = circuit_breaker or CircuitBreaker()
+
+        self._first_token_latencies: deque[float] = deque(maxlen=LATENCY_WINDOW_SIZE)
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        loop = asyncio.get_running_loop()
+
+        for attempt in range(self.max_retries + 1):
+            self.circuit_breaker.acquire()
+            started_at = loop.time()
+            try:
+                stream, first_event = await self._open_stream(prompts, parameters)
+            except Exception as e:
+                if not self.is_transient_error(e):
+                    # the backend answered, it is up.
+                    self.circuit_breaker.record_success()
+                    raise
+
+                self.circuit_breaker.record_failure()
+                if attempt == self.max_retries:
+                    raise
+
+                delay = self.retry_backoff_seconds * 2**attempt
+                delay += random.uniform(0, delay)  # jitter, so the failed batches dont retry in lockstep
+                logger.warning(
+                    f"Transient error while generating a batch of {len(prompts)} prompts: {e!r}. "
+                    f"Retrying in {delay:.2f}s ({attempt + 1}/{self.max_retries})."
+                )
+                await asyncio.sleep(delay)
+            except BaseException:
+                self.circuit_breaker.release()
+                raise
+            else:
+                self.circuit_breaker.record_success()
+                break
+
+        try:
+            if first_event is None:
+                return
+
+            yield first_event
+
+            deadline = started_at + self.timeout_seconds
+            while True:
+                event = await asyncio.wait_for(anext(stream, None), timeout=max(deadline - loop.time(), 0.0))
+                if event is None:
+                    return
+
+                yield event
+        except Exception as e:
+            if self.is_transient_error(e):
+                self.circuit_breaker.record_failure()
+            raise
+        finally:
+            await stream.aclose()
+
+    async def _open_stream(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> tuple[AsyncIterator[tuple[int, str]], tuple[int, str] | None]:
+        """
+        Starts generating the batch and waits for its first token, hedging the request when it is slow.
+
+        Returns:
+            The stream of the request answering first, and its first token (None if it generated nothing).
+        """
+
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        deadline = started_at + self.first_token_timeout_seconds
+        hedge_delay = self._hedge_delay()
+
+        streams: dict[asyncio.Task, AsyncIterator[tuple[int, str]]] = {}
+
+        def send_request() -> None:
+            stream = self.llm.stream_batch(prompts, parameters)
+            streams[asyncio.create_task(self._first_event(stream))] = stream
+
+        send_request()
+        pending = set(streams)
+        winner = None
+        try:
+            while winner is None:
+                if loop.time() >= deadline:
+                    raise TimeoutError(f"No token generated within {self.first_token_timeout_seconds}s.")
+
+                hedge_at = started_at + hedge_delay if hedge_delay is not None and len(streams) == 1 else math.inf
+                timeout = max(min(deadline, hedge_at) - loop.time(), 0.0)
+                done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        winner = task
+                        break
+                else:
+                    if len(pending) == 0 and len(done) > 0:
+                        # every request sent failed, the last error is the most relevant one.
+                        raise done.pop().exception()
+
+                if winner is None and len(streams) == 1 and loop.time() >= hedge_at:
+                    logger.debug(f"Hedging a batch of {len(prompts)} prompts after {hedge_delay:.3f}s.")
+                    send_request()
+                    pending = {task for task in streams if not task.done()}
+
+            first_event, latency = winner.result()
+            self._first_token_latencies.append(latency)
+
+            return streams[winner], first_event
+        finally:
+            losers = [task for task in streams if task is not winner]
+            for task in losers:
+                task.cancel()
+            await asyncio.gather(*losers, return_exceptions=True)
+            for task in losers:
+                await streams[task].aclose()
+
+    @staticmethod
+    async def _first_event(stream: AsyncIterator[tuple[int, str]]) -> tuple[tuple[int, str] | None, float]:
+        started_at = time.perf_counter()
+        first_event = await anext(stream, None)
+
+        return first_event, time.perf_counter() - started_at
+
+    def _hedge_delay(self) -> float | None:
+        if self.hedge_percentile <= 0 or len(self._first_token_latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        if self.circuit_breaker.state != "closed":
+            return None
+
+        return float(np.percentile(self._first_token_latencies, self.hedge_percentile))
+
+    @property
+    def model_id(self) -> str:
+        return self.llm.model_id
+
+    @property
+    def tokenizer(self):
+        return self.llm.tokenizer
+
+    def count_tokens(self, text: str) -> int:
+        return self.llm.count_tokens(text)
+
+    def is_transient_error(self, error: Exception) -> bool:
+        return isinstance(error, TimeoutError) or self.llm.is_transient_error(error)
+
+    async def aclose(self) -> None:
+        await self.llm.aclose()
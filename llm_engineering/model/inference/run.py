@@ -0,0 +1,79 @@
+import asyncio
+from typing import AsyncIterator, Protocol
+
+from llm_engineering.domain.inference import GenerationParameters
+from llm_engineering.infrastructure.llm_response_cache import LLMResponseCache
+
+DEFAULT_PROMPT = """
+You are a content creator. Write what the user asked you to while using the provided context as the primary source \
+of information for the content.
+User query: {query}
+Context: {context}
+"""
+
+
+class Generator(Protocol):
+    """
+    What the executor generates with: an `Inference` backend, or a `GenerationBatcher` in front of one.
+    """
+
+    @property
+    def model_id(self) -> str: ...
+
+    def stream(self, prompt: str, parameters: GenerationParameters | None = None) -> AsyncIterator[str]: ...
+
+    async def generate(self, prompt: str, parameters: GenerationParameters | None = None) -> str: ...
+
+
+class InferenceExecutor:
+    """
+    Formats the RAG prompt out of the user query and the retrieved context, and generates the answer.
+    With a `cache`, the answer of an identical prompt (same model and parameters) is served from it instead.
+    """
+
+    def __init__(
+        self,
+        llm: Generator,
+        query: str,
+        context: str | None = None,
+        prompt: str | None = None,
+        cache: LLMResponseCache | None = None,
+    ) -> None:
+        self.llm = llm
+        self.query = query
+        self.context = context if context else ""
+        self.prompt = prompt if prompt is not None else DEFAULT_PROMPT
+        self.cache = cache
+
+    @property
+    def formatted_prompt(self) -> str:
+        return self.prompt.format(query=self.query, context=self.context)
+
+    async def execute(self, parameters: GenerationParameters | None = None) -> str:
+        return "".join([token async for token in self.stream(parameters)])
+
+    async def stream(self, parameters: GenerationParameters | None = None) -> AsyncIterator[str]:
+        parameters = parameters or GenerationParameters()
+
+        cache_key = self._cache_key(parameters)
+        if cache_key is not None:
+            cached_answers = await asyncio.to_thread(self.cache.get_many, [cache_key])
+            if cache_key in cached_answers:
+                yield cached_answers[cache_key]
+
+                return
+
+        tokens = []
+        async for token in self.llm.stream(self.formatted_prompt, parameters):
+            tokens.append(token)
+            yield token
+
+        if cache_key is not None:
+            # only complete answers get here, not the failed streams nor the ones their client dropped.
+            await asyncio.to_thread(self.cache.put_many, {cache_key: "".join(tokens)})
+
+    def _cache_key(self, parameters: GenerationParameters) -> str | None:
+        if self.cache is None or not self.cache.is_cacheable(parameters.model_dump()):
+            return None
+
+        return self.cache.key(self.llm.model_id, self.formatted_prompt, parameters.model_dump())
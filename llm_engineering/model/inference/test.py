@@ -0,0 +1,14 @@
+import asyncio
+
+from loguru import logger
+
+from llm_engineering.model.inference import InferenceExecutor, build_inference
+
+if __name__ == "__main__":
+    text = "Write me a post about AWS SageMaker inference endpoints."
+    logger.info(f"Running inference for text: '{text}'")
+
+    llm = build_inference()
+    answer = asyncio.run(InferenceExecutor(llm, text).execute())
+
+    logger.info(f"Answer: '{answer}'")
@@ -33,6 +33,11 @@ class Settings(BaseSettings):
     QDRANT_DATABASE_PORT: int = 6333
     QDRANT_CLOUD_URL: str = "str"
     QDRANT_API_KEY: str | None = None
+    QDRANT_PREFER_GRPC: bool = False  # Use gRPC instead of HTTP/JSON for all requests that support it.
+    QDRANT_GRPC_PORT: int = 6334
+    QDRANT_TIMEOUT: int | None = None  # Request timeout in seconds, None keeps the client default.
+    USE_QDRANT_LOCAL: bool = False  # Run Qdrant in-process, without a server (CI, laptops, benchmarks).
+    QDRANT_LOCAL_PATH: str = ":memory:"  # ":memory:" or a directory where the local collections are persisted.
 
     # AWS Authentication
     AWS_REGION: str = "us-east-1"
@@ -58,11 +63,68 @@ class Settings(BaseSettings):
     TEMPERATURE_INFERENCE: float = 0.01
     TOP_P_INFERENCE: float = 0.9
     MAX_NEW_TOKENS_INFERENCE: int = 150
+    LLM_INFERENCE_BACKEND: str = "sagemaker"  # "sagemaker", "openai_compatible" or "local_stub" (a fake model).
+    INFERENCE_BATCH_MAX_WAIT_SECONDS: float = 0.01  # How long a generation request waits for others to batch with.
+    LLM_INFERENCE_ENDPOINT_URL: str = "http://127.0.0.1:8080"  # OpenAI compatible server (TGI, vLLM, the stub...).
+    LLM_INFERENCE_API_KEY: str | None = None
+    LLM_INFERENCE_MODEL: str | None = None  # Model name sent to the OpenAI compatible server, HF_MODEL_ID if None.
+    LLM_INFERENCE_MAX_CONNECTIONS: int = 64  # Connections kept open to the LLM endpoint.
+    LLM_INFERENCE_TIMEOUT_SECONDS: float = 60.0  # Per attempt, for the whole generation.
+    LLM_INFERENCE_FIRST_TOKEN_TIMEOUT_SECONDS: float = 10.0
+    LLM_INFERENCE_MAX_RETRIES: int = 2  # Only failures happening before the first token are retried.
+    LLM_INFERENCE_RETRY_BACKOFF_SECONDS: float = 0.2
+    LLM_INFERENCE_HEDGE_PERCENTILE: float = 0.0  # Duplicates requests slower than it to their first token, 0 disables.
+    LLM_INFERENCE_CIRCUIT_BREAKER_FAILURE_RATE: float = 0.5  # Out of the latest calls, opening the circuit breaker.
+    LLM_INFERENCE_CIRCUIT_BREAKER_WINDOW_SIZE: int = 20
+    LLM_INFERENCE_CIRCUIT_BREAKER_RESET_SECONDS: float = 30.0
 
     # RAG
     TEXT_EMBEDDING_MODEL_ID: str = "sentence-transformers/all-MiniLM-L6-v2"
     RERANKING_CROSS_ENCODER_MODEL_ID: str = "cross-encoder/ms-marco-MiniLM-L-4-v2"
     RAG_MODEL_DEVICE: str = "cpu"
+    QUERY_EMBEDDING_CACHE_SIZE: int = 10_000  # Query embeddings kept in process, 0 disables it.
+    QUERY_EMBEDDING_CACHE_TTL_SECONDS: float = 86_400.0
+    QUERY_EMBEDDING_CACHE_PATH: str | None = None  # SQLite file shared by the worker processes, None disables it.
+    RAG_LATENCY_BUDGET_SECONDS: float = 0.0  # Optional retrieval stages are skipped past this budget, 0 disables it.
+    RAG_CONTEXT_MAX_TOKENS: int = 1024  # Prompt context budget, counted with the tokenizer of HF_MODEL_ID.
+    RAG_CONTEXT_MAX_TOKENS_PER_CHUNK: int = 384
+    RAG_MMR_TOP_K: int = 0  # Diverse candidates (MMR) kept out of the search results for reranking, 0 disables it.
+    RAG_MMR_LAMBDA: float = 0.5  # MMR trade-off, 1 ranks by relevance only and 0 by diversity only.
+    RAG_HYBRID_SEARCH: bool = False  # Also search the collections with a sparse vector with the query terms.
+
+    # Semantic cache of the RAG results (retrieved context and generated answer)
+    SEMANTIC_CACHE_ENABLED: bool = False
+    SEMANTIC_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Min cosine similarity between a query and a cached one.
+    SEMANTIC_CACHE_TTL_SECONDS: float = 3600.0
+
+    # LLM response cache (identical prompts are generated once, across runs)
+    LLM_RESPONSE_CACHE_PATH: str | None = None  # SQLite file, None disables it.
+    LLM_RESPONSE_CACHE_MAX_SIZE: int = 100_000  # Responses kept, the least recently used are evicted past it.
+    LLM_RESPONSE_CACHE_ALLOW_SAMPLED: bool = False  # Also cache the generations sampled with a temperature > 0.
+    LLM_RESPONSE_CACHE_RUN_ID: str | None = None  # Cache the sampled generations of this run only, to resume it.
+
+    # Exact (brute-force numpy) search
+    EXACT_SEARCH_MAX_POINTS: int = 0  # Collections up to this size are searched in process, 0 disables it.
+    EXACT_SEARCH_REFRESH_SECONDS: float = 300.0  # Max age of the in-memory copy of a small collection.
+    EXACT_SEARCH_BLOCK_SIZE: int = 4096  # Vectors scored per matrix multiplication.
+
+    # Qdrant bulk upload
+    QDRANT_UPLOAD_BATCH_SIZE: int = 64  # Points per upsert request.
+    QDRANT_UPLOAD_PARALLELISM: int = 4  # Upsert requests kept in flight at the same time.
+    QDRANT_UPLOAD_WAIT: bool = False  # Wait for each batch to be applied instead of a single final consistency wait.
+    QDRANT_UPLOAD_MAX_RETRIES: int = 3  # Retries per batch on transient errors.
+    QDRANT_UPLOAD_SKIP_UNCHANGED: bool = True  # Only write the points whose fingerprint changed.
+
+    # Lean payloads (the chunk text lives in a content store instead of the Qdrant payloads)
+    QDRANT_LEAN_PAYLOADS: bool = False  # Keep only the vectors and the filter fields in Qdrant.
+    CONTENT_STORE_BACKEND: str = "mongo"  # "mongo" or "mmap" (memory-mapped files under CONTENT_STORE_PATH).
+    CONTENT_STORE_PATH: str = "data/content_store"
+    CONTENT_STORE_CACHE_SIZE: int = 10_000  # Contents kept in the in-process LRU, 0 disables it.
+
+    # Incremental ingestion (MongoDB change streams, requires a replica set)
+    CHANGE_STREAM_BATCH_SIZE: int = 50  # Number of changed documents that triggers a batch.
+    CHANGE_STREAM_MAX_WAIT_SECONDS: float = 60.0  # Max time a changed document waits before a batch is triggered.
+    CHANGE_STREAM_RESUME_TOKENS_COLLECTION: str = "change_stream_resume_tokens"
 
     # LinkedIn Credentials
     LINKEDIN_USERNAME: str | None = None
@@ -4,7 +4,7 @@ from .query_data_warehouse import query_data_warehouse
 from .rag import chunk_and_embed
 
 __all__ = [
-    "cleaned_documents", 
+    "clean_documents", 
     "load_to_vector_db", 
     "query_data_warehouse", 
     "chunk_and_embed",
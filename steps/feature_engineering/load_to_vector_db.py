@@ -1,28 +1,49 @@
 from loguru import logger
 from typing_extensions import Annotated
+from zenml import get_step_context, step
 
-from llm_engineering.application import utils
-from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.application.loading import BulkVectorLoader
+from llm_engineering.application.rag.semantic_cache import SemanticCache
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.settings import settings
 
 # Zenml step to load the documents to the Vector DB
 @step
 def load_to_vector_db(
     documents: Annotated[list, "documents"],
+    batch_size: int = settings.QDRANT_UPLOAD_BATCH_SIZE,
+    parallelism: int = settings.QDRANT_UPLOAD_PARALLELISM,
+    wait: bool = settings.QDRANT_UPLOAD_WAIT,
+    skip_unchanged: bool = settings.QDRANT_UPLOAD_SKIP_UNCHANGED,
 )-> Annotated[bool, "successful"]:
     logger.info(f"Loading {len(documents)} into the vector database.")
 
-    # Grouping the documents by class before loading.
-    grouped_documents = VectorBaseDocument.group_by_class(documents)
+    # The loader groups the documents by class and uploads each collection in parallel batches,
+    # skipping the points already stored with the same content.
+    loader = BulkVectorLoader(batch_size=batch_size, parallelism=parallelism, wait=wait, skip_unchanged=skip_unchanged)
+    reports = loader.load(documents)
 
-    for document_class, documents in grouped_documents.items():
-        logger.info(f"Loading documents into {document_class.get_collection_name()}")
-        for documents_batch in utils.misc.batch(documents, size=4):
-            try:
-                document_class.bulk_insert(documents_batch)
-            except Exception:
-                logger.error(f"Failed to insert documents into {document_class.get_collection_name()}")
+    # the cached answers of these authors may rely on their old chunks. Only the collections where points were
+    # written count, a reload skipping every unchanged point leaves the cache valid.
+    written_collections = {collection_name for collection_name, report in reports.items() if report.num_points > 0}
+    author_ids = {
+        document.author_id
+        for document in documents
+        if isinstance(document, EmbeddedChunk) and document.get_collection_name() in written_collections
+    }
+    SemanticCache.invalidate_authors(author_ids)
 
-                return False 
-    
+    # Intitialize the step context and store the throughput of every collection as metadata.
+    step_context = get_step_context()
+    step_context.add_output_metadata(
+        output_name="successful",
+        metadata={collection_name: report.to_metadata() for collection_name, report in reports.items()},
+    )
 
-    return True
\ No newline at end of file
+    for report in reports.values():
+        if not report.successful:
+            logger.error(f"Failed to insert {report.num_failed_points} documents into {report.collection_name}")
+
+            return False
+
+    return True
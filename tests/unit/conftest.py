@@ -0,0 +1,69 @@
+import uuid
+from types import SimpleNamespace
+from typing import Iterator
+
+import pytest
+from qdrant_client import QdrantClient
+
+from llm_engineering.domain.base import VectorBaseDocument, vector
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk
+from llm_engineering.infrastructure.db.qdrant import LocalModeAsyncClient, LocalModeClient
+
+# Size of the dense vectors of the collections created by the `qdrant` fixture.
+EMBEDDING_SIZE = 4
+
+
+class FakeClock:
+    """
+    Stands in for the `time` module of the module under test, so expiring, backing off or resetting doesn't need
+    sleeping. Patch it in with `monkeypatch.setattr(module, "time", clock)`.
+    """
+
+    def __init__(self) -> None:
+        self.now = 1_000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def make_chunk(
+    content: str,
+    embedding: list[float] | None = None,
+    document_id: uuid.UUID | None = None,
+    chunk_index: int | None = None,
+) -> EmbeddedArticleChunk:
+    return EmbeddedArticleChunk(
+        content=content,
+        embedding=embedding,
+        platform="medium",
+        document_id=document_id or uuid.uuid4(),
+        author_id=uuid.uuid4(),
+        author_full_name="Jane Doe",
+        metadata={"chunk_index": chunk_index} if chunk_index is not None else {},
+    )
+
+
+@pytest.fixture()
+def qdrant(monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalModeClient]:
+    """
+    An empty in-memory Qdrant (local mode) used by the vector documents, sync and async methods alike,
+    with `EMBEDDING_SIZE` dense vectors.
+    """
+
+    client = LocalModeClient(QdrantClient(location=":memory:"))
+    monkeypatch.setattr(vector, "connection", client)
+    monkeypatch.setattr(vector, "AsyncQdrantDatabaseConnector", lambda: LocalModeAsyncClient(client))
+    # local mode fails requests with ValueErrors.
+    monkeypatch.setattr(vector, "REQUEST_ERRORS", (*vector.REQUEST_ERRORS, ValueError))
+    monkeypatch.setattr(vector, "EmbeddingModelSingleton", lambda: SimpleNamespace(embedding_size=EMBEDDING_SIZE))
+    VectorBaseDocument.invalidate_collection_cache()
+
+    yield client
+
+    VectorBaseDocument.invalidate_collection_cache()
@@ -0,0 +1,164 @@
+import asyncio
+from typing import AsyncIterator
+
+from llm_engineering.domain.inference import GenerationParameters
+from llm_engineering.model.inference import GenerationBatcher, LLMInferenceLocalStub
+
+
+class RecordingStub(LLMInferenceLocalStub):
+    """
+    The local stub, recording the batches it generates and the tokens they hold at the same time.
+    """
+
+    def __init__(self, step_seconds: float = 0.01) -> None:
+        super().__init__(prefill_seconds=0.0, step_seconds=step_seconds)
+
+        self.batches: list[tuple[list[str], GenerationParameters]] = []
+        self.in_flight_tokens = 0
+        self.max_in_flight_tokens = 0
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        self.batches.append((prompts, parameters))
+        num_tokens = sum(self.count_tokens(prompt) + parameters.max_new_tokens for prompt in prompts)
+        self.in_flight_tokens += num_tokens
+        self.max_in_flight_tokens = max(self.max_in_flight_tokens, self.in_flight_tokens)
+        try:
+            async for event in super().stream_batch(prompts, parameters):
+                yield event
+        finally:
+            self.in_flight_tokens -= num_tokens
+
+
+def test_concurrent_requests_are_batched() -> None:
+    llm = RecordingStub()
+    batcher = GenerationBatcher(llm, max_batch_total_tokens=1_000, max_wait_seconds=0.05)
+    parameters = GenerationParameters(max_new_tokens=3)
+
+    async def main() -> list[str]:
+        return await asyncio.gather(
+            batcher.generate("red green", parameters),
+            batcher.generate("blue", parameters),
+            batcher.generate("one two three four", parameters),
+        )
+
+    answers = asyncio.run(main())
+
+    # each request gets its own tokens back.
+    assert answers == [" red green red", " blue blue blue", " one two three"]
+    assert len(llm.batches) == 1
+    assert sorted(llm.batches[0][0]) == sorted(["red green", "blue", "one two three four"])
+
+
+def test_requests_are_grouped_by_parameters() -> None:
+    llm = RecordingStub()
+    batcher = GenerationBatcher(llm, max_batch_total_tokens=1_000, max_wait_seconds=0.05)
+    short, long = GenerationParameters(max_new_tokens=1), GenerationParameters(max_new_tokens=2)
+
+    async def main() -> list[str]:
+        return await asyncio.gather(
+            batcher.generate("a", short), batcher.generate("b", long), batcher.generate("c", short)
+        )
+
+    answers = asyncio.run(main())
+
+    assert answers == [" a", " b b", " c"]
+    assert sorted((sorted(prompts), parameters.max_new_tokens) for prompts, parameters in llm.batches) == [
+        (["a", "c"], 1),
+        (["b"], 2),
+    ]
+
+
+def test_admission_stays_within_the_token_budget() -> None:
+    llm = RecordingStub()
+    # each request needs 2 prompt tokens and 3 new tokens, two of them fit in the budget.
+    batcher = GenerationBatcher(llm, max_batch_total_tokens=10, max_wait_seconds=0.02)
+    parameters = GenerationParameters(max_new_tokens=3)
+
+    async def main() -> list[str]:
+        return await asyncio.gather(*[batcher.generate(f"prompt {i}", parameters) for i in range(5)])
+
+    answers = asyncio.run(main())
+
+    assert answers == [f" prompt {i} prompt" for i in range(5)]
+    assert llm.max_in_flight_tokens <= 10
+    assert [len(prompts) for prompts, _ in llm.batches] == [2, 2, 1]
+    # the queued requests are admitted in arrival order.
+    assert [prompt for prompts, _ in llm.batches for prompt in prompts] == [f"prompt {i}" for i in range(5)]
+
+
+def test_request_larger_than_the_budget_runs_alone() -> None:
+    llm = RecordingStub()
+    batcher = GenerationBatcher(llm, max_batch_total_tokens=5, max_wait_seconds=0.02)
+
+    async def main() -> list[str]:
+        return await asyncio.gather(
+            batcher.generate("a b c d e f", GenerationParameters(max_new_tokens=2)),
+            batcher.generate("g", GenerationParameters(max_new_tokens=2)),
+        )
+
+    answers = asyncio.run(main())
+
+    assert answers == [" a b", " g g"]
+    assert [prompts for prompts, _ in llm.batches] == [["a b c d e f"], ["g"]]
+
+
+def test_disconnected_request_is_not_generated() -> None:
+    llm = RecordingStub(step_seconds=0.05)
+    # the first request fills the budget, the second one queues behind it.
+    batcher = GenerationBatcher(llm, max_batch_total_tokens=5, max_wait_seconds=0.01)
+    parameters = GenerationParameters(max_new_tokens=4)
+
+    async def consume(prompt: str) -> list[str]:
+        return [token async for token in batcher.stream(prompt, parameters)]
+
+    async def main() -> list[str]:
+        first = asyncio.create_task(consume("first"))
+        await asyncio.sleep(0.05)
+        disconnected = asyncio.create_task(consume("disconnected"))
+        await asyncio.sleep(0.05)
+        assert [request.prompt for request in batcher._queue] == ["disconnected"]
+
+        # e.g. the client of a streaming response went away.
+        disconnected.cancel()
+        await asyncio.gather(disconnected, return_exceptions=True)
+        assert len(batcher._queue) == 0
+
+        tokens = await first
+        # the freed budget doesn't schedule the cancelled request.
+        await asyncio.sleep(0.05)
+
+        return tokens
+
+    tokens = asyncio.run(main())
+
+    assert "".join(tokens) == " first first first first"
+    assert [prompts for prompts, _ in llm.batches] == [["first"]]
+
+
+def test_backend_errors_reach_every_request_of_the_batch() -> None:
+    class FailingStub(RecordingStub):
+        async def stream_batch(
+            self, prompts: list[str], parameters: GenerationParameters
+        ) -> AsyncIterator[tuple[int, str]]:
+            yield 0, " partial"
+            raise RuntimeError("backend failure")
+
+    batcher = GenerationBatcher(FailingStub(), max_batch_total_tokens=1_000, max_wait_seconds=0.02)
+
+    async def main() -> list[str | BaseException]:
+        return await asyncio.gather(batcher.generate("a"), batcher.generate("b"), return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+def test_the_batcher_counts_the_tokens_with_the_backend_tokenizer() -> None:
+    llm = RecordingStub()
+    batcher = GenerationBatcher(llm, max_batch_total_tokens=1_000, max_wait_seconds=0.0)
+
+    # the stub counts words, no Hugging Face tokenizer is loaded.
+    assert batcher.tokenizer is llm.tokenizer
+    assert llm.count_tokens("three words prompt") == 3
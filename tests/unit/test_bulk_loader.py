@@ -0,0 +1,139 @@
+import threading
+
+import httpx
+import pytest
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+from llm_engineering.application.loading import BulkVectorLoader, is_transient_error
+
+
+def unexpected_response(status_code: int) -> UnexpectedResponse:
+    return UnexpectedResponse(status_code, "error", b"", httpx.Headers())
+
+
+class ScriptedCollection:
+    """
+    Stands in for a vector document class: records the upserts and raises the scripted errors of each batch,
+    keyed by the first document of the batch, before the upserts succeed.
+    """
+
+    def __init__(self, errors: dict[int, list[Exception]] | None = None, unchanged: set[int] | None = None) -> None:
+        self.errors = errors or {}
+        self.unchanged = unchanged or set()
+        self.upserts: list[tuple[list[int], bool, bool]] = []
+        self._lock = threading.Lock()
+
+    def get_collection_name(self) -> str:
+        return "scripted"
+
+    def get_or_create_collection(self) -> None:
+        pass
+
+    def _bulk_insert(self, documents: list[int], wait: bool, skip_unchanged: bool) -> int:
+        with self._lock:
+            self.upserts.append((documents, wait, skip_unchanged))
+            batch_errors = self.errors.get(documents[0], [])
+            if batch_errors:
+                raise batch_errors.pop(0)
+
+        if skip_unchanged:
+            return sum(1 for document in documents if document not in self.unchanged)
+
+        return len(documents)
+
+
+def loader(**kwargs) -> BulkVectorLoader:
+    kwargs = {"batch_size": 2, "parallelism": 2, "wait": True, "max_retries": 2, "retry_backoff_seconds": 0, **kwargs}
+
+    return BulkVectorLoader(**kwargs)
+
+
+def test_batches_are_upserted_in_parallel() -> None:
+    collection = ScriptedCollection()
+
+    report = loader().load_class(collection, list(range(5)))
+
+    assert sorted(documents for documents, _, _ in collection.upserts) == [[0, 1], [2, 3], [4]]
+    assert (report.num_points, report.num_batches, report.num_failed_points) == (5, 3, 0)
+    assert report.successful
+
+
+def test_transient_errors_are_retried() -> None:
+    collection = ScriptedCollection(errors={2: [unexpected_response(503), ResponseHandlingException(OSError())]})
+
+    report = loader().load_class(collection, list(range(4)))
+
+    assert report.num_retries == 2
+    assert report.num_points == 4
+    assert report.successful
+
+
+def test_failed_batches_are_reported() -> None:
+    collection = ScriptedCollection(errors={0: [unexpected_response(400)], 2: [unexpected_response(503)] * 3})
+
+    report = loader().load_class(collection, list(range(6)))
+
+    # the non-transient error isn't retried, the transient one gives up after max_retries.
+    assert len(collection.upserts) == 1 + 3 + 1
+    assert report.num_points == 2
+    assert report.num_failed_points == 4
+    assert not report.successful
+
+
+def test_unchanged_points_are_skipped() -> None:
+    collection = ScriptedCollection(unchanged={0, 1, 3})
+
+    report = loader(skip_unchanged=True).load_class(collection, list(range(4)))
+
+    assert (report.num_points, report.num_skipped_points) == (1, 3)
+
+
+def test_final_consistency_wait() -> None:
+    collection = ScriptedCollection()
+
+    report = loader(wait=False).load_class(collection, list(range(5)))
+
+    assert all(not wait for _, wait, _ in collection.upserts[:-1])
+    # the last batch is written again, waiting for every acknowledged batch to be applied.
+    assert collection.upserts[-1] == ([4], True, False)
+    assert report.num_points == 5
+
+
+def test_failed_final_consistency_wait_fails_the_last_batch() -> None:
+    collection = ScriptedCollection()
+    load_class = loader(wait=False, max_retries=0).load_class
+
+    def fail_waiting(documents: list[int], wait: bool, skip_unchanged: bool) -> int:
+        if wait:
+            raise unexpected_response(503)
+
+        return len(documents)
+
+    collection._bulk_insert = fail_waiting
+    report = load_class(collection, list(range(5)))
+
+    assert report.num_failed_points == 1
+    assert not report.successful
+
+
+def test_nothing_to_load() -> None:
+    collection = ScriptedCollection()
+
+    report = loader(wait=False).load_class(collection, [])
+
+    assert collection.upserts == []
+    assert report.successful
+
+
+@pytest.mark.parametrize(
+    ("error", "transient"),
+    [
+        (unexpected_response(429), True),
+        (unexpected_response(503), True),
+        (unexpected_response(400), False),
+        (ResponseHandlingException(TimeoutError()), True),
+        (ValueError("bad vector size"), False),
+    ],
+)
+def test_is_transient_error(error: Exception, transient: bool) -> None:
+    assert is_transient_error(error) is transient
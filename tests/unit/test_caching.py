@@ -0,0 +1,155 @@
+import threading
+from pathlib import Path
+
+import pytest
+
+from llm_engineering.infrastructure import caching
+from llm_engineering.infrastructure.caching import LRUCache, SQLiteCache
+from tests.unit.conftest import FakeClock
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(caching, "time", clock)
+
+    return clock
+
+
+def test_lru_cache_evicts_the_least_recently_used() -> None:
+    cache = LRUCache(max_size=3)
+    cache.put_many({"a": 1, "b": 2, "c": 3})
+
+    # reading "a" makes "b" the least recently used entry.
+    assert cache.get("a") == 1
+    cache.put("d", 4)
+
+    assert cache.get_many(["a", "b", "c", "d"]) == {"a": 1, "c": 3, "d": 4}
+    assert len(cache) == 3
+    assert (cache.hits, cache.misses) == (4, 1)
+
+
+def test_lru_cache_expires_entries(clock: FakeClock) -> None:
+    cache = LRUCache(max_size=10, ttl_seconds=60)
+    cache.put("a", 1)
+    clock.advance(30)
+    cache.put("b", 2)
+
+    clock.advance(30)
+    assert cache.get_many(["a", "b"]) == {"b": 2}
+    # the expired entry is dropped on lookup.
+    assert len(cache) == 1
+
+
+def test_lru_cache_disabled() -> None:
+    cache = LRUCache(max_size=0)
+    cache.put("a", 1)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_round_trip(tmp_path: Path) -> None:
+    cache = SQLiteCache(tmp_path / "cache.db", namespace="test")
+    cache.put_many({"a": [0.1, 0.2], "b": {"answer": "yes"}})
+
+    assert cache.get_many(["a", "b", "c"]) == {"a": [0.1, 0.2], "b": {"answer": "yes"}}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+    cache.delete(["a"])
+    assert cache.get("a") is None
+
+
+def test_sqlite_cache_namespaces_share_a_file(tmp_path: Path) -> None:
+    first = SQLiteCache(tmp_path / "cache.db", namespace="first")
+    second = SQLiteCache(tmp_path / "cache.db", namespace="second")
+    first.put("key", 1)
+    second.put("key", 2)
+
+    second.clear()
+
+    assert first.get("key") == 1
+    assert second.get("key") is None
+
+
+def test_sqlite_cache_expires_entries(tmp_path: Path, clock: FakeClock) -> None:
+    cache = SQLiteCache(tmp_path / "cache.db", namespace="test", ttl_seconds=60)
+    cache.put("a", 1)
+    clock.advance(30)
+    cache.put("b", 2)
+
+    clock.advance(30)
+    assert cache.get_many(["a", "b"]) == {"b": 2}
+    assert cache.delete_expired() == 1
+
+
+def test_sqlite_cache_expiry_survives_restarts(tmp_path: Path, clock: FakeClock) -> None:
+    SQLiteCache(tmp_path / "cache.db", namespace="test", ttl_seconds=60).put("a", 1)
+
+    clock.advance(61)
+    assert SQLiteCache(tmp_path / "cache.db", namespace="test").get("a") is None
+
+
+def test_sqlite_cache_opens_a_connection_per_thread(tmp_path: Path) -> None:
+    cache = SQLiteCache(tmp_path / "cache.db", namespace="test")
+    errors = []
+
+    def worker(thread_index: int) -> None:
+        try:
+            for i in range(20):
+                cache.put(f"{thread_index}-{i}", i)
+                assert cache.get(f"{thread_index}-{i}") == i
+        except Exception as e:  # checked in the main thread, pytest doesn't see the worker threads failing
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(thread_index,)) for thread_index in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert len(cache) == 8 * 20
+    # sqlite3 connections refuse being used from another thread than the one that opened them.
+    assert cache._connection() is cache._connection()
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(cache._connection()))
+    thread.start()
+    thread.join()
+    assert connections[0] is not cache._connection()
+
+
+def test_sqlite_cache_is_shared_between_instances(tmp_path: Path) -> None:
+    # e.g. one instance per API worker process.
+    writer = SQLiteCache(tmp_path / "cache.db", namespace="test")
+    reader = SQLiteCache(tmp_path / "cache.db", namespace="test")
+
+    writer.put("a", 1)
+
+    assert reader.get("a") == 1
+
+
+def test_sqlite_cache_evicts_the_least_recently_used(tmp_path: Path, clock: FakeClock) -> None:
+    cache = SQLiteCache(tmp_path / "cache.db", namespace="test", max_size=3)
+    for key in ["a", "b", "c"]:
+        cache.put(key, key)
+        clock.advance(1)
+
+    # reading "a" makes "b" the least recently used entry.
+    assert cache.get("a") == "a"
+    clock.advance(1)
+    cache.put("d", "d")
+
+    assert cache.get_many(["a", "b", "c", "d"]) == {"a": "a", "c": "c", "d": "d"}
+    assert len(cache) == 3
+
+
+def test_sqlite_cache_max_size_is_per_namespace(tmp_path: Path) -> None:
+    bounded = SQLiteCache(tmp_path / "cache.db", namespace="bounded", max_size=10)
+    unbounded = SQLiteCache(tmp_path / "cache.db", namespace="unbounded")
+    unbounded.put_many({f"key {i}": i for i in range(50)})
+
+    bounded.put_many({f"key {i}": i for i in range(50)})
+
+    assert len(bounded) == 10
+    assert len(unbounded) == 50
@@ -0,0 +1,188 @@
+import uuid
+
+import pytest
+from pymongo import errors
+
+from llm_engineering.application.ingestion import ChangeStreamWatcher, change_stream
+from llm_engineering.domain.documents import ArticleDocument, Document
+from tests.unit.conftest import FakeClock
+
+
+class FakeCollection:
+    """
+    The subset of a pymongo collection used by the watcher, failing every `find` while `fail` is set.
+    """
+
+    def __init__(self) -> None:
+        self.documents: dict[str, dict] = {}
+        self.fail = False
+
+    def find(self, filter_options: dict) -> list[dict]:
+        if self.fail:
+            raise errors.OperationFailure("not primary")
+
+        return [dict(self.documents[_id]) for _id in filter_options["_id"]["$in"] if _id in self.documents]
+
+    def find_one(self, filter_options: dict) -> dict | None:
+        return self.documents.get(filter_options["_id"])
+
+    def replace_one(self, filter_options: dict, document: dict, upsert: bool = False) -> None:
+        self.documents[filter_options["_id"]] = {"_id": filter_options["_id"], **document}
+
+    def delete_one(self, filter_options: dict) -> None:
+        self.documents.pop(filter_options["_id"], None)
+
+
+class FakeDatabase(dict):
+    def __missing__(self, collection_name: str) -> FakeCollection:
+        self[collection_name] = FakeCollection()
+
+        return self[collection_name]
+
+
+class RecordingProcessor:
+    def __init__(self) -> None:
+        self.batches: list[tuple[list[Document], set[str]]] = []
+
+    def __call__(self, documents: list[Document], updated_document_ids: set[str]) -> dict:
+        self.batches.append((documents, updated_document_ids))
+
+        return {"num_documents": len(documents)}
+
+
+@pytest.fixture()
+def database(monkeypatch: pytest.MonkeyPatch) -> FakeDatabase:
+    database = FakeDatabase()
+    monkeypatch.setattr(change_stream, "_database", database)
+
+    return database
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(change_stream, "time", clock)
+
+    return clock
+
+
+def add_article(database: FakeDatabase) -> str:
+    article = ArticleDocument(
+        content={"content": "some text"},
+        platform="medium",
+        link="https://medium.com/some-article",
+        author_id=uuid.uuid4(),
+        author_full_name="Jane Doe",
+    )
+    database[ArticleDocument.get_collection_name()].documents[str(article.id)] = article.to_mongo()
+
+    return str(article.id)
+
+
+def change(document_id: str, operation_type: str = "insert") -> dict:
+    return {
+        "ns": {"coll": ArticleDocument.get_collection_name()},
+        "documentKey": {"_id": document_id},
+        "operationType": operation_type,
+    }
+
+
+def watcher(processor: RecordingProcessor, **kwargs) -> ChangeStreamWatcher:
+    return ChangeStreamWatcher(
+        batch_size=2, max_wait_seconds=60, watcher_name="test", process_batch=processor, **kwargs
+    )
+
+
+def saved_resume_token(database: FakeDatabase) -> dict | None:
+    document = database[change_stream.settings.CHANGE_STREAM_RESUME_TOKENS_COLLECTION].find_one({"_id": "test"})
+
+    return document["resume_token"] if document else None
+
+
+def test_flush_processes_the_pending_documents_and_saves_the_resume_token(database: FakeDatabase) -> None:
+    processor = RecordingProcessor()
+    new_id, updated_id = add_article(database), add_article(database)
+    stream_watcher = watcher(processor)
+    stream_watcher._add_change(change(new_id))
+    # an update following the insert of the same batch is still a new document.
+    stream_watcher._add_change(change(new_id, "update"))
+    stream_watcher._add_change(change(updated_id, "replace"))
+
+    assert stream_watcher.flush({"_data": "token"})
+
+    documents, updated_document_ids = processor.batches[0]
+    assert sorted(str(document.id) for document in documents) == sorted([new_id, updated_id])
+    assert updated_document_ids == {updated_id}
+    assert stream_watcher.num_pending == 0
+    assert saved_resume_token(database) == {"_data": "token"}
+
+
+def test_flush_skips_the_deleted_documents(database: FakeDatabase) -> None:
+    processor = RecordingProcessor()
+    stream_watcher = watcher(processor)
+    stream_watcher._add_change(change(add_article(database)))
+    stream_watcher._add_change(change(str(uuid.uuid4())))
+
+    assert stream_watcher.flush({"_data": "token"})
+    assert len(processor.batches[0][0]) == 1
+
+
+def test_failed_fetch_keeps_the_changes_and_the_resume_token(database: FakeDatabase, clock: FakeClock) -> None:
+    processor = RecordingProcessor()
+    stream_watcher = watcher(processor)
+    stream_watcher._add_change(change(add_article(database)))
+    stream_watcher._add_change(change(add_article(database)))
+    database[ArticleDocument.get_collection_name()].fail = True
+
+    assert not stream_watcher.flush({"_data": "token"})
+
+    # the batch would look processed if the failed query read as an empty result.
+    assert processor.batches == []
+    assert stream_watcher.num_pending == 2
+    assert saved_resume_token(database) is None
+
+
+def test_failed_batch_is_retried_with_backoff(
+    database: FakeDatabase, clock: FakeClock, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(change_stream.random, "uniform", lambda a, b: 0.0)
+    processor = RecordingProcessor()
+    stream_watcher = watcher(processor, retry_backoff_seconds=5)
+    stream_watcher._add_change(change(add_article(database)))
+    stream_watcher._add_change(change(add_article(database)))
+    database[ArticleDocument.get_collection_name()].fail = True
+
+    assert stream_watcher._should_flush()
+    assert not stream_watcher.flush(None)
+    # a full batch waits for the backoff instead of being retried in a tight loop.
+    assert not stream_watcher._should_flush()
+    clock.advance(5)
+    assert stream_watcher._should_flush()
+
+    # the backoff doubles after every failed retry.
+    assert not stream_watcher.flush(None)
+    clock.advance(9)
+    assert not stream_watcher._should_flush()
+    clock.advance(1)
+    assert stream_watcher._should_flush()
+
+    database[ArticleDocument.get_collection_name()].fail = False
+    assert stream_watcher.flush({"_data": "token"})
+    assert saved_resume_token(database) == {"_data": "token"}
+
+    # and is reset by a successful batch.
+    stream_watcher._add_change(change(add_article(database)))
+    stream_watcher._add_change(change(add_article(database)))
+    assert stream_watcher._should_flush()
+
+
+def test_failed_processing_is_retried(database: FakeDatabase, clock: FakeClock) -> None:
+    def failing_processor(documents: list[Document], updated_document_ids: set[str]) -> dict:
+        raise ConnectionError("Qdrant is down")
+
+    stream_watcher = watcher(failing_processor)
+    stream_watcher._add_change(change(add_article(database)))
+
+    assert not stream_watcher.flush({"_data": "token"})
+    assert stream_watcher.num_pending == 1
+    assert saved_resume_token(database) is None
@@ -0,0 +1,79 @@
+import multiprocessing
+from pathlib import Path
+
+import pytest
+
+from llm_engineering.infrastructure.db.content_store import CachedContentStore, MmapContentStore
+
+NUM_WRITERS = 4
+WRITES_PER_WRITER = 50
+
+
+def test_mmap_store_round_trip(tmp_path: Path) -> None:
+    store = MmapContentStore(tmp_path)
+    store.put_many("chunks", {"a": {"content": "first"}, "b": {"content": "second"}})
+    # the last write of an id wins.
+    store.put_many("chunks", {"a": {"content": "edited"}})
+
+    assert store.get_many("chunks", ["a", "b", "missing"]) == {"a": {"content": "edited"}, "b": {"content": "second"}}
+    assert store.get_many("other", ["a"]) == {}
+
+
+def test_mmap_store_sees_the_writes_of_other_stores(tmp_path: Path) -> None:
+    reader, writer = MmapContentStore(tmp_path), MmapContentStore(tmp_path)
+    reader.put_many("chunks", {"a": {"content": "first"}})
+
+    writer.put_many("chunks", {"b": {"content": "second"}})
+    reader.put_many("chunks", {"c": {"content": "third"}})
+
+    # each store appended at the real end of the data file, after the writes of the other one.
+    assert reader.get_many("chunks", ["a", "b", "c"]) == writer.get_many("chunks", ["a", "b", "c"])
+    assert reader.get_many("chunks", ["b"]) == {"b": {"content": "second"}}
+
+
+def test_mmap_store_delete_collection(tmp_path: Path) -> None:
+    store = MmapContentStore(tmp_path)
+    store.put_many("chunks", {"a": {"content": "first"}})
+
+    store.delete_collection("chunks")
+
+    assert not (tmp_path / "chunks.data").exists()
+    assert store.get_many("chunks", ["a"]) == {}
+
+
+def write_contents(directory: Path, writer: int) -> None:
+    store = MmapContentStore(directory)
+    for i in range(WRITES_PER_WRITER):
+        store.put_many("chunks", {f"{writer}-{i}": {"content": f"writer {writer} " + "x" * i}})
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="needs fork")
+def test_mmap_store_concurrent_processes(tmp_path: Path) -> None:
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=write_contents, args=(tmp_path, writer)) for writer in range(NUM_WRITERS)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(timeout=30)
+        assert process.exitcode == 0
+
+    ids = [f"{writer}-{i}" for writer in range(NUM_WRITERS) for i in range(WRITES_PER_WRITER)]
+    contents = MmapContentStore(tmp_path).get_many("chunks", ids)
+
+    # no write overlapped another one: every entry points at its own content.
+    assert len(contents) == len(ids)
+    for _id, content in contents.items():
+        writer, i = _id.split("-")
+        assert content == {"content": f"writer {writer} " + "x" * int(i)}
+
+
+def test_cached_store_reads_through(tmp_path: Path) -> None:
+    store = MmapContentStore(tmp_path)
+    store.put_many("chunks", {"a": {"content": "first"}})
+    cached_store = CachedContentStore(store, cache_size=10)
+
+    assert cached_store.get_many("chunks", ["a"]) == {"a": {"content": "first"}}
+    assert cached_store.cache.get_many([("chunks", "a")]) == {("chunks", "a"): {"content": "first"}}
+
+    cached_store.delete_collection("chunks")
+    assert cached_store.get_many("chunks", ["a"]) == {}
@@ -0,0 +1,84 @@
+import uuid
+
+import pytest
+
+from llm_engineering.application.networks import WordTokenizer
+from llm_engineering.application.rag.context import ContextBuilder
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk
+from llm_engineering.model.inference import LLMInferenceLocalStub
+from llm_engineering.settings import settings
+from tests.unit.conftest import make_chunk
+
+
+class CharacterTokenizer:
+    """
+    One token per character, so the separators and the headers weigh as much as the contents.
+    """
+
+    def encode(self, text: str) -> list[int]:
+        return [ord(character) for character in text]
+
+    def decode(self, token_ids: list[int]) -> str:
+        return "".join(chr(token_id) for token_id in token_ids)
+
+
+@pytest.mark.parametrize("max_tokens", [150, 300, 500, 1000])
+def test_context_stays_within_the_budget(max_tokens: int) -> None:
+    tokenizer = CharacterTokenizer()
+    builder = ContextBuilder(max_tokens=max_tokens, max_tokens_per_chunk=200, min_chunk_tokens=10, tokenizer=tokenizer)
+    chunks = [make_chunk(f"chunk {i} " * (5 + 7 * i)) for i in range(8)]
+
+    context = builder.build(chunks)
+
+    assert 0 < len(tokenizer.encode(context)) <= max_tokens
+
+
+def test_sections_filling_the_budget_exactly() -> None:
+    tokenizer = CharacterTokenizer()
+    chunks = [make_chunk("a" * 20), make_chunk("b" * 20)]
+    builder = ContextBuilder(max_tokens=10_000, min_chunk_tokens=1, tokenizer=tokenizer)
+    full_context = builder.build(chunks)
+
+    # without counting the separator, the second section would overflow by its 2 tokens.
+    builder.max_tokens = len(full_context) - 1
+    context = builder.build(chunks)
+
+    assert len(context) <= builder.max_tokens
+    assert context.endswith("b" * 18)
+
+
+def test_adjacent_chunks_are_merged_without_their_overlap() -> None:
+    document_id = uuid.uuid4()
+    chunks = [
+        make_chunk("the quick brown fox", document_id=document_id, chunk_index=1),
+        make_chunk("the lazy dog. the quick", document_id=document_id, chunk_index=0),
+    ]
+
+    sections = ContextBuilder(tokenizer=CharacterTokenizer()).merge_adjacent_chunks(chunks)
+
+    assert len(sections) == 1
+    assert sections[0].content == "the lazy dog. the quick brown fox"
+    assert sections[0].chunk_indexes == [0, 1]
+
+
+def test_word_tokenizer_round_trip() -> None:
+    tokenizer = WordTokenizer()
+
+    token_ids = tokenizer.encode("the quick brown fox jumps over the lazy dog")
+
+    assert len(token_ids) == tokenizer.count("the quick brown fox jumps over the lazy dog") == 9
+    # the same word always gets the same id.
+    assert token_ids[0] == token_ids[6]
+    assert tokenizer.decode(token_ids[1:4]) == "quick brown fox"
+
+
+def test_context_with_the_local_stub_tokenizer() -> None:
+    tokenizer = LLMInferenceLocalStub().tokenizer
+    chunks = [make_chunk(" ".join(f"word{i}" for i in range(100))), make_chunk("second chunk")]
+
+    context = EmbeddedArticleChunk.to_context(chunks, tokenizer=tokenizer)
+
+    assert context.count("Chunk ") == 2
+    assert "word99" in context
+    # the budget is counted in words, the unit of the stub's tokens.
+    assert tokenizer.count(context) <= settings.RAG_CONTEXT_MAX_TOKENS
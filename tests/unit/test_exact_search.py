@@ -0,0 +1,219 @@
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+
+import numpy as np
+import pytest
+from qdrant_client.http.exceptions import ResponseHandlingException
+from qdrant_client.models import Record
+
+from llm_engineering.application.rag import exact_search
+from llm_engineering.application.rag.exact_search import ExactSearchEngine
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk, EmbeddedPostChunk
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from tests.unit.conftest import EMBEDDING_SIZE, make_chunk
+
+NUM_POINTS = 500
+DIM = 16
+AUTHOR_IDS = [str(uuid.uuid4()) for _ in range(3)]
+PLATFORMS = ["medium", "substack"]
+
+
+@pytest.fixture()
+def vectors() -> np.ndarray:
+    return np.random.default_rng(0).normal(size=(NUM_POINTS, DIM)).astype(np.float32)
+
+
+@pytest.fixture()
+def records(vectors: np.ndarray) -> list[Record]:
+    return [
+        Record(
+            id=str(uuid.uuid4()),
+            vector=vector.tolist(),
+            payload={
+                "author_id": AUTHOR_IDS[i % len(AUTHOR_IDS)],
+                "platform": PLATFORMS[i % len(PLATFORMS)],
+                "document_id": str(uuid.uuid4()),
+            },
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+@pytest.fixture()
+def engine(monkeypatch: pytest.MonkeyPatch, records: list[Record]) -> ExactSearchEngine:
+    monkeypatch.setattr(EmbeddedArticleChunk, "iter_all", classmethod(lambda cls, **kwargs: iter(records)))
+
+    # a block size that doesn't divide the number of points, so the last block is a partial one.
+    return ExactSearchEngine(EmbeddedArticleChunk, block_size=64).load()
+
+
+def argsort_top_k(
+    vectors: np.ndarray, query: np.ndarray, k: int, mask: np.ndarray | None = None
+) -> tuple[np.ndarray, np.ndarray]:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    indexes = np.arange(len(vectors)) if mask is None else np.flatnonzero(mask)
+    indexes = indexes[np.argsort(-scores[indexes], kind="stable")][:k]
+
+    return indexes, scores[indexes]
+
+
+@pytest.mark.parametrize("k", [1, 10, 64, 100, NUM_POINTS, NUM_POINTS + 10])
+def test_top_k_matches_argsort(engine: ExactSearchEngine, vectors: np.ndarray, k: int) -> None:
+    queries = np.random.default_rng(1).normal(size=(5, DIM)).astype(np.float32)
+
+    indexes, scores = engine.top_k(queries, k=k)
+
+    assert len(indexes) == len(queries)
+    for query, query_indexes, query_scores in zip(queries, indexes, scores, strict=True):
+        expected_indexes, expected_scores = argsort_top_k(vectors, query, k)
+        assert len(query_indexes) == min(k, NUM_POINTS)
+        np.testing.assert_array_equal(query_indexes, expected_indexes)
+        np.testing.assert_allclose(query_scores, expected_scores, rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.parametrize(
+    "query_filter",
+    [
+        DocumentFilter.by_author(AUTHOR_IDS[0]),
+        DocumentFilter.by_author(AUTHOR_IDS[1]).with_platform("medium"),
+        DocumentFilter(platform=PLATFORMS),
+    ],
+)
+def test_top_k_with_filter_matches_argsort(
+    engine: ExactSearchEngine, vectors: np.ndarray, records: list[Record], query_filter: DocumentFilter
+) -> None:
+    queries = np.random.default_rng(2).normal(size=(3, DIM)).astype(np.float32)
+    expected_mask = np.array(
+        [
+            all(
+                record.payload[field_name] in ([str(v) for v in value] if isinstance(value, list) else [str(value)])
+                for field_name, value in query_filter.model_dump(exclude_none=True).items()
+            )
+            for record in records
+        ]
+    )
+
+    indexes, scores = engine.top_k(queries, k=20, filters=query_filter)
+
+    for query, query_indexes, query_scores in zip(queries, indexes, scores, strict=True):
+        expected_indexes, expected_scores = argsort_top_k(vectors, query, 20, mask=expected_mask)
+        np.testing.assert_array_equal(query_indexes, expected_indexes)
+        np.testing.assert_allclose(query_scores, expected_scores, rtol=1e-5, atol=1e-6)
+
+
+def test_top_k_drops_the_filtered_out_padding(engine: ExactSearchEngine, records: list[Record]) -> None:
+    document_id = records[7].payload["document_id"]
+    query = np.random.default_rng(3).normal(size=DIM).astype(np.float32)
+
+    indexes, scores = engine.top_k(query, k=10, filters=DocumentFilter.by_document(document_id))
+
+    # a single point matches: the top-k is not padded with the -inf scores of the filtered out points.
+    np.testing.assert_array_equal(indexes[0], [7])
+    assert np.all(np.isfinite(scores[0]))
+
+
+def test_top_k_with_one_filter_per_query(engine: ExactSearchEngine, vectors: np.ndarray) -> None:
+    queries = np.random.default_rng(4).normal(size=(2, DIM)).astype(np.float32)
+
+    indexes, _ = engine.top_k(queries, k=NUM_POINTS, filters=[DocumentFilter.by_author(AUTHOR_IDS[2]), None])
+
+    assert set(indexes[0]) == set(range(2, NUM_POINTS, len(AUTHOR_IDS)))
+    np.testing.assert_array_equal(indexes[1], argsort_top_k(vectors, queries[1], NUM_POINTS)[0])
+
+
+def test_filter_masks(engine: ExactSearchEngine) -> None:
+    masks = engine._filter_masks(
+        [
+            DocumentFilter.by_author(AUTHOR_IDS[0]).with_platform("substack"),
+            DocumentFilter(platform=["medium", "substack"]),
+            None,
+        ],
+        num_queries=3,
+    )
+
+    point_indexes = np.arange(NUM_POINTS)
+    # every set field must match, lists match any of their items, and no filter matches everything.
+    np.testing.assert_array_equal(masks[0], (point_indexes % 3 == 0) & (point_indexes % 2 == 1))
+    assert masks[1].all()
+    assert masks[2].all()
+
+    assert engine._filter_masks(None, num_queries=3) is None
+    with pytest.raises(ValueError):
+        engine._filter_masks([None], num_queries=3)
+
+
+@pytest.fixture()
+def small_collections(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch) -> Iterator[LocalModeClient]:
+    monkeypatch.setattr(exact_search, "connection", qdrant)
+    rng = np.random.default_rng(5)
+    articles = [make_chunk(f"article {i}", rng.normal(size=EMBEDDING_SIZE).tolist()) for i in range(5)]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(articles)
+    EmbeddedPostChunk.get_or_create_collection()
+    ExactSearchEngine.invalidate()
+
+    yield qdrant
+
+    ExactSearchEngine.invalidate()
+
+
+def test_small_collection_engines_are_cached(small_collections: LocalModeClient) -> None:
+    engine = ExactSearchEngine.for_small_collection(EmbeddedArticleChunk, max_points=5, refresh_seconds=60)
+
+    assert len(engine) == 5
+    assert ExactSearchEngine.for_small_collection(EmbeddedArticleChunk, max_points=5, refresh_seconds=60) is engine
+    # a refresh loads the collection again.
+    assert ExactSearchEngine.for_small_collection(EmbeddedArticleChunk, max_points=5, refresh_seconds=0) is not engine
+
+
+def test_large_collections_are_searched_in_qdrant(small_collections: LocalModeClient) -> None:
+    assert ExactSearchEngine.for_small_collection(EmbeddedArticleChunk, max_points=4, refresh_seconds=60) is None
+
+
+def test_failed_load_falls_back_to_qdrant(small_collections: LocalModeClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    count = small_collections.count
+    failures = [ResponseHandlingException(TimeoutError())]
+
+    def failing_count(**kwargs):
+        if failures:
+            raise failures.pop()
+
+        return count(**kwargs)
+
+    monkeypatch.setattr(small_collections, "count", failing_count)
+
+    assert ExactSearchEngine.for_small_collection(EmbeddedArticleChunk, max_points=5, refresh_seconds=60) is None
+    # the failure isn't cached, the next call loads the collection.
+    assert ExactSearchEngine.for_small_collection(EmbeddedArticleChunk, max_points=5, refresh_seconds=60) is not None
+
+
+def test_loading_a_collection_does_not_block_the_others(
+    small_collections: LocalModeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    load_started, release_load = threading.Event(), threading.Event()
+    count = small_collections.count
+
+    def blocking_count(collection_name: str, **kwargs):
+        if collection_name == EmbeddedArticleChunk.get_collection_name():
+            load_started.set()
+            release_load.wait(timeout=5)
+
+        return count(collection_name=collection_name, **kwargs)
+
+    monkeypatch.setattr(small_collections, "count", blocking_count)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        article_engine = executor.submit(
+            ExactSearchEngine.for_small_collection, EmbeddedArticleChunk, max_points=5, refresh_seconds=60
+        )
+        assert load_started.wait(timeout=5)
+
+        post_engine = ExactSearchEngine.for_small_collection(EmbeddedPostChunk, max_points=5, refresh_seconds=60)
+        assert post_engine is not None
+        assert not article_engine.done()
+
+        release_load.set()
+        assert len(article_engine.result()) == 5
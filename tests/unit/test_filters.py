@@ -0,0 +1,80 @@
+import uuid
+
+import pytest
+from qdrant_client.http.models import FieldCondition, Filter, MatchAny, MatchValue, PayloadSchemaType
+
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk
+from llm_engineering.domain.filters import DocumentFilter, to_qdrant_filter
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from tests.unit.conftest import make_chunk
+
+
+def test_every_set_field_is_a_must_condition() -> None:
+    author_id = uuid.uuid4()
+
+    qdrant_filter = DocumentFilter.by_author(author_id).with_platform("linkedin").to_qdrant()
+
+    assert qdrant_filter == Filter(
+        must=[
+            # UUIDs are matched as the strings stored in the payloads.
+            FieldCondition(key="author_id", match=MatchValue(value=str(author_id))),
+            FieldCondition(key="platform", match=MatchValue(value="linkedin")),
+        ]
+    )
+
+
+def test_list_values_match_any_item() -> None:
+    document_ids = [uuid.uuid4(), uuid.uuid4()]
+
+    qdrant_filter = DocumentFilter.by_document(document_ids).to_qdrant()
+
+    assert qdrant_filter.must == [
+        FieldCondition(key="document_id", match=MatchAny(any=[str(document_id) for document_id in document_ids]))
+    ]
+
+
+def test_builders_return_copies() -> None:
+    author_filter = DocumentFilter.by_author(uuid.uuid4())
+
+    author_filter.with_platform("medium")
+
+    assert author_filter.platform is None
+
+
+def test_empty_filter_does_not_filter() -> None:
+    assert DocumentFilter().to_qdrant() is None
+    assert to_qdrant_filter(DocumentFilter()) is None
+    assert to_qdrant_filter(None) is None
+
+
+def test_raw_qdrant_filters_are_kept() -> None:
+    qdrant_filter = Filter(must=[FieldCondition(key="platform", match=MatchValue(value="medium"))])
+
+    assert to_qdrant_filter(qdrant_filter) is qdrant_filter
+
+
+def test_filtered_search(qdrant: LocalModeClient) -> None:
+    chunks = [make_chunk("first", [1.0, 0.0, 0.0, 0.0]), make_chunk("second", [0.9, 0.1, 0.0, 0.0])]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(chunks)
+
+    documents = EmbeddedArticleChunk.search(
+        query_vector=[1.0, 0.0, 0.0, 0.0], query_filter=DocumentFilter.by_author(chunks[1].author_id)
+    )
+
+    assert [document.content for document in documents] == ["second"]
+
+
+def test_collections_are_created_with_their_payload_indexes(
+    qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    created_indexes = {}
+
+    def create_payload_index(collection_name: str, field_name: str, field_schema: PayloadSchemaType, **kwargs) -> None:
+        created_indexes[field_name] = field_schema
+
+    monkeypatch.setattr(qdrant, "create_payload_index", create_payload_index)
+    EmbeddedArticleChunk.get_or_create_collection()
+
+    assert created_indexes == EmbeddedArticleChunk.get_payload_indexes()
+    assert created_indexes["author_id"] == PayloadSchemaType.UUID
@@ -0,0 +1,125 @@
+import asyncio
+from pathlib import Path
+from typing import AsyncIterator
+
+import pytest
+
+from llm_engineering.domain.inference import GenerationParameters
+from llm_engineering.infrastructure.llm_response_cache import LLMResponseCache
+from llm_engineering.model.inference import InferenceExecutor, LLMInferenceLocalStub
+
+GREEDY = GenerationParameters(max_new_tokens=3, temperature=0.0)
+
+
+class CountingStub(LLMInferenceLocalStub):
+    """
+    The local stub, counting its generations and failing after `fail_after_tokens` tokens if set.
+    """
+
+    def __init__(self, fail_after_tokens: int | None = None) -> None:
+        super().__init__(prefill_seconds=0.0, step_seconds=0.0)
+
+        self.fail_after_tokens = fail_after_tokens
+        self.num_generations = 0
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        self.num_generations += 1
+        num_tokens = 0
+        async for event in super().stream_batch(prompts, parameters):
+            if num_tokens == self.fail_after_tokens:
+                raise ConnectionError("connection reset")
+
+            num_tokens += 1
+            yield event
+
+
+@pytest.fixture()
+def cache(tmp_path: Path) -> LLMResponseCache:
+    return LLMResponseCache(str(tmp_path / "llm_responses.db"), max_size=100, allow_sampled=False)
+
+
+def execute(llm: CountingStub, cache: LLMResponseCache, parameters: GenerationParameters = GREEDY) -> str:
+    executor = InferenceExecutor(llm, query="who wrote it", context="some context", cache=cache)
+
+    return asyncio.run(executor.execute(parameters))
+
+
+def test_completed_answers_are_cached(cache: LLMResponseCache) -> None:
+    llm = CountingStub()
+
+    first_answer = execute(llm, cache)
+    second_answer = execute(llm, cache)
+
+    assert first_answer == second_answer
+    assert llm.num_generations == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_failed_streams_are_not_cached(cache: LLMResponseCache) -> None:
+    with pytest.raises(ConnectionError):
+        execute(CountingStub(fail_after_tokens=2), cache)
+
+    llm = CountingStub()
+    answer = execute(llm, cache)
+
+    assert llm.num_generations == 1
+    assert len(answer.split()) == GREEDY.max_new_tokens
+
+
+def test_dropped_streams_are_not_cached(cache: LLMResponseCache) -> None:
+    llm = CountingStub()
+    executor = InferenceExecutor(llm, query="who wrote it", context="some context", cache=cache)
+
+    async def read_first_token() -> str:
+        stream = executor.stream(GREEDY)
+        token = await anext(stream)
+        # e.g. the client of a streaming response disconnected.
+        await stream.aclose()
+
+        return token
+
+    asyncio.run(read_first_token())
+    assert cache.stats()["size"] == 0
+
+    execute(llm, cache)
+    assert llm.num_generations == 2
+
+
+def test_sampled_answers_are_not_cached(cache: LLMResponseCache) -> None:
+    llm = CountingStub()
+    sampled = GenerationParameters(max_new_tokens=3, temperature=0.7)
+
+    execute(llm, cache, sampled)
+    execute(llm, cache, sampled)
+
+    assert llm.num_generations == 2
+    assert cache.stats()["size"] == 0
+
+
+def test_cache_key_depends_on_the_parameters(cache: LLMResponseCache) -> None:
+    llm = CountingStub()
+
+    execute(llm, cache, GREEDY)
+    execute(llm, cache, GenerationParameters(max_new_tokens=5, temperature=0.0))
+
+    assert llm.num_generations == 2
+
+
+def test_sampled_answers_are_cached_within_their_run(tmp_path: Path) -> None:
+    path = str(tmp_path / "llm_responses.db")
+    llm = CountingStub()
+    sampled = GenerationParameters(max_new_tokens=3, temperature=0.7)
+
+    execute(llm, LLMResponseCache(path, allow_sampled=False, run_id="run-1"), sampled)
+    # re-running the same run resumes it from the cache.
+    execute(llm, LLMResponseCache(path, allow_sampled=False, run_id="run-1"), sampled)
+    assert llm.num_generations == 1
+
+    # a new run samples new answers, but shares the greedy ones.
+    execute(llm, LLMResponseCache(path, allow_sampled=False, run_id="run-2"), sampled)
+    assert llm.num_generations == 2
+    execute(llm, LLMResponseCache(path, allow_sampled=False, run_id="run-1"), GREEDY)
+    execute(llm, LLMResponseCache(path, allow_sampled=False, run_id="run-2"), GREEDY)
+    assert llm.num_generations == 3
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from llm_engineering.application.rag.mmr import diversify_chunks, maximal_marginal_relevance
+from tests.unit.conftest import make_chunk
+
+QUERY = [1.0, 0.0, 0.0]
+# two near duplicates, the most relevant candidates, then a less relevant but different one.
+CANDIDATES = [
+    [0.90, 0.10, 0.0],
+    [0.89, 0.11, 0.0],
+    [0.60, 0.00, 0.8],
+    [0.10, 0.99, 0.0],
+]
+
+
+def test_mmr_skips_the_near_duplicates() -> None:
+    selected = maximal_marginal_relevance([QUERY], CANDIDATES, k=2, lambda_mult=0.5)
+
+    assert selected == [0, 2]
+
+
+def test_mmr_relevance_only() -> None:
+    candidates = np.random.default_rng(0).normal(size=(50, 8))
+    query = np.random.default_rng(1).normal(size=8)
+
+    selected = maximal_marginal_relevance([query], candidates, k=10, lambda_mult=1.0)
+
+    relevance = candidates @ query / np.linalg.norm(candidates, axis=1)
+    assert selected == list(np.argsort(-relevance)[:10])
+
+
+def test_mmr_diversity_only() -> None:
+    selected = maximal_marginal_relevance([QUERY], CANDIDATES, k=len(CANDIDATES), lambda_mult=0.0)
+
+    # the first pick is still the most relevant one, then the least similar to the selected ones come first.
+    assert selected[0] == 0
+    assert selected[1] == 3
+    assert selected[-1] == 1
+
+
+def test_mmr_relevance_is_the_best_of_several_queries() -> None:
+    selected = maximal_marginal_relevance([QUERY, [0.0, 1.0, 0.0]], CANDIDATES, k=1, lambda_mult=1.0)
+
+    assert selected == [3]
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_mmr_without_selection(k: int) -> None:
+    assert maximal_marginal_relevance([QUERY], CANDIDATES, k=k) == []
+
+
+def test_diversify_chunks_keeps_the_chunks_without_embedding() -> None:
+    chunks = [make_chunk(f"chunk {i}", embedding) for i, embedding in enumerate(CANDIDATES)]
+    chunks.insert(1, make_chunk("no embedding", None))
+
+    diversified = diversify_chunks([QUERY], chunks, k=2, lambda_mult=0.5)
+
+    assert [chunk.content for chunk in diversified] == ["chunk 0", "chunk 2", "no embedding"]
+
+
+def test_diversify_chunks_with_fewer_chunks_than_k() -> None:
+    chunks = [make_chunk("no embedding", None), make_chunk("chunk 0", CANDIDATES[0])]
+
+    diversified = diversify_chunks([QUERY], chunks, k=5)
+
+    assert [chunk.content for chunk in diversified] == ["chunk 0", "no embedding"]
@@ -0,0 +1,116 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import grpc
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+from qdrant_client.http.models import Distance, PointStruct, VectorParams
+
+from llm_engineering.infrastructure.db import qdrant
+from llm_engineering.infrastructure.db.qdrant import LocalModeAsyncClient, LocalModeClient, get_client_kwargs, get_uri
+from llm_engineering.settings import settings
+
+
+@pytest.fixture()
+def server_settings(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "USE_QDRANT_LOCAL", False)
+    monkeypatch.setattr(settings, "USE_QDRANT_CLOUD", False)
+    monkeypatch.setattr(settings, "QDRANT_DATABASE_HOST", "qdrant")
+    monkeypatch.setattr(settings, "QDRANT_DATABASE_PORT", 6333)
+    monkeypatch.setattr(settings, "QDRANT_GRPC_PORT", 6334)
+    monkeypatch.setattr(settings, "QDRANT_PREFER_GRPC", True)
+    monkeypatch.setattr(settings, "QDRANT_TIMEOUT", 30)
+
+
+@pytest.mark.usefixtures("server_settings")
+def test_client_kwargs_from_the_settings() -> None:
+    kwargs = get_client_kwargs()
+
+    assert kwargs == {"host": "qdrant", "port": 6333, "grpc_port": 6334, "prefer_grpc": True, "timeout": 30}
+    assert get_uri(kwargs) == "qdrant:6334 (gRPC)"
+
+
+@pytest.mark.usefixtures("server_settings")
+def test_client_kwargs_overrides() -> None:
+    kwargs = get_client_kwargs(prefer_grpc=False)
+
+    assert kwargs["prefer_grpc"] is False
+    assert get_uri(kwargs) == "qdrant:6333 (HTTP)"
+
+
+@pytest.mark.usefixtures("server_settings")
+def test_cloud_client_kwargs(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "USE_QDRANT_CLOUD", True)
+    monkeypatch.setattr(settings, "QDRANT_CLOUD_URL", "https://cluster.cloud.qdrant.io")
+    monkeypatch.setattr(settings, "QDRANT_API_KEY", "key")
+
+    kwargs = get_client_kwargs()
+
+    assert (kwargs["url"], kwargs["api_key"]) == ("https://cluster.cloud.qdrant.io", "key")
+    assert "host" not in kwargs
+    assert get_uri(kwargs) == "https://cluster.cloud.qdrant.io (gRPC)"
+
+
+def test_local_mode_client_kwargs(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "USE_QDRANT_LOCAL", True)
+    monkeypatch.setattr(settings, "QDRANT_LOCAL_PATH", ":memory:")
+
+    kwargs = get_client_kwargs()
+
+    # there is no transport to configure.
+    assert kwargs == {"location": ":memory:"}
+    assert get_uri(kwargs) == ":memory: (local mode)"
+
+
+@pytest.mark.parametrize("error_type", [UnexpectedResponse, ResponseHandlingException, grpc.RpcError])
+def test_failed_requests_of_every_transport_are_request_errors(error_type: type[Exception]) -> None:
+    assert issubclass(error_type, qdrant.REQUEST_ERRORS)
+
+
+def test_local_mode_client_serializes_the_calls() -> None:
+    in_flight = 0
+    max_in_flight = 0
+
+    class UnsafeClient:
+        def upsert(self, points: list[int]) -> int:
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            time.sleep(0.001)
+            in_flight -= 1
+
+            return len(points)
+
+    client = LocalModeClient(UnsafeClient())
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(client.upsert, [[i] for i in range(32)]))
+
+    assert results == [1] * 32
+    assert max_in_flight == 1
+
+
+def test_local_mode_round_trip() -> None:
+    client = LocalModeClient(QdrantClient(location=":memory:"))
+    client.create_collection(collection_name="points", vectors_config=VectorParams(size=2, distance=Distance.DOT))
+    client.upsert(collection_name="points", points=[PointStruct(id=1, vector=[1.0, 0.0], payload={"a": 1})])
+
+    assert client.count(collection_name="points").count == 1
+    with pytest.raises(ValueError):
+        # instead of the UnexpectedResponse of a server, see REQUEST_ERRORS.
+        client.get_collection(collection_name="missing")
+
+
+def test_local_mode_async_client_uses_the_sync_collections() -> None:
+    sync_client = LocalModeClient(QdrantClient(location=":memory:"))
+    sync_client.create_collection(collection_name="points", vectors_config=VectorParams(size=2, distance=Distance.DOT))
+    async_client = LocalModeAsyncClient(sync_client)
+
+    async def main() -> int:
+        await async_client.upsert(collection_name="points", points=[PointStruct(id=1, vector=[1.0, 0.0])])
+
+        return (await async_client.count(collection_name="points")).count
+
+    assert asyncio.run(main()) == 1
+    assert sync_client.count(collection_name="points").count == 1
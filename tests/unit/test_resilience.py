@@ -0,0 +1,252 @@
+import asyncio
+import time
+from typing import AsyncIterator
+
+import pytest
+
+from llm_engineering.domain.exceptions import CircuitBreakerOpen
+from llm_engineering.domain.inference import GenerationParameters, Inference
+from llm_engineering.model.inference import CircuitBreaker, ResilientInference, resilience
+from llm_engineering.model.inference.resilience import HEDGE_MIN_SAMPLES
+from tests.unit.conftest import FakeClock
+
+
+class ScriptedBackend(Inference):
+    """
+    Fails or stalls on demand, one behaviour per call, then answers " ok" to every prompt:
+        - "fail": a transient error before the first token;
+        - "fatal": a non-transient error before the first token;
+        - "stall": no token at all;
+        - "stall_after_first_token": the first token, then nothing.
+    """
+
+    def __init__(self, script: list[str] | None = None) -> None:
+        self.script = script or []
+        self.calls = 0
+        self.cancelled = 0
+
+    async def stream_batch(
+        self, prompts: list[str], parameters: GenerationParameters
+    ) -> AsyncIterator[tuple[int, str]]:
+        behaviour = self.script[self.calls] if self.calls < len(self.script) else "ok"
+        self.calls += 1
+        try:
+            if behaviour == "fail":
+                raise ConnectionError("connection reset")
+            if behaviour == "fatal":
+                raise ValueError("prompt too long")
+            if behaviour == "stall":
+                await asyncio.sleep(10)
+
+            for index in range(len(prompts)):
+                yield index, " ok"
+                if behaviour == "stall_after_first_token":
+                    await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    def count_tokens(self, text: str) -> int:
+        return len(text.split())
+
+    def is_transient_error(self, error: Exception) -> bool:
+        return isinstance(error, ConnectionError)
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(resilience, "time", clock)
+
+    return clock
+
+
+def resilient(backend: Inference, **kwargs) -> ResilientInference:
+    kwargs = {
+        "timeout_seconds": 5.0,
+        "first_token_timeout_seconds": 1.0,
+        "max_retries": 2,
+        "retry_backoff_seconds": 0.0,
+        "hedge_percentile": 0.0,
+        "circuit_breaker": CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=4, reset_seconds=30),
+        **kwargs,
+    }
+
+    return ResilientInference(backend, **kwargs)
+
+
+def test_circuit_breaker_opens_at_the_failure_rate(clock: FakeClock) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=4, reset_seconds=30)
+
+    # too few calls are known to open it.
+    for _ in range(3):
+        breaker.acquire()
+        breaker.record_failure()
+    assert breaker.state == "closed"
+
+    breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.acquire()
+
+
+def test_circuit_breaker_tolerates_failures_below_the_rate(clock: FakeClock) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=4, reset_seconds=30)
+
+    for _ in range(10):
+        breaker.acquire()
+        breaker.record_success()
+        breaker.acquire()
+        breaker.record_success()
+        breaker.acquire()
+        breaker.record_failure()
+
+    assert breaker.state == "closed"
+
+
+def test_circuit_breaker_half_open_trial(clock: FakeClock) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=1, reset_seconds=30)
+    breaker.acquire()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    clock.advance(30)
+    assert breaker.state == "half_open"
+    breaker.acquire()
+    # a single trial call at a time.
+    with pytest.raises(CircuitBreakerOpen):
+        breaker.acquire()
+
+    # a failed trial opens it again for reset_seconds.
+    breaker.record_failure()
+    assert breaker.state == "open"
+    clock.advance(29)
+    assert breaker.state == "open"
+
+    clock.advance(1)
+    breaker.acquire()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.acquire()
+    breaker.acquire()
+
+
+def test_circuit_breaker_released_trial(clock: FakeClock) -> None:
+    breaker = CircuitBreaker(failure_rate=0.5, window_size=10, min_calls=1, reset_seconds=30)
+    breaker.acquire()
+    breaker.record_failure()
+    clock.advance(30)
+
+    breaker.acquire()
+    # e.g. the client of the trial call disconnected, another call can be the trial.
+    breaker.release()
+    breaker.acquire()
+    assert breaker.state == "half_open"
+
+
+def test_retries_transient_errors() -> None:
+    backend = ScriptedBackend(["fail", "fail"])
+
+    answer = asyncio.run(resilient(backend).generate("hello"))
+
+    assert answer == " ok"
+    assert backend.calls == 3
+
+
+def test_gives_up_after_max_retries() -> None:
+    backend = ScriptedBackend(["fail"] * 3)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(resilient(backend).generate("hello"))
+    assert backend.calls == 3
+
+
+def test_does_not_retry_non_transient_errors() -> None:
+    backend = ScriptedBackend(["fatal"])
+    llm = resilient(backend)
+
+    with pytest.raises(ValueError):
+        asyncio.run(llm.generate("hello"))
+    assert backend.calls == 1
+    # the backend answered, it is up.
+    assert llm.circuit_breaker.state == "closed"
+
+
+def test_first_token_timeout_is_retried() -> None:
+    backend = ScriptedBackend(["stall"])
+    llm = resilient(backend, first_token_timeout_seconds=0.1)
+
+    started_at = time.perf_counter()
+    answer = asyncio.run(llm.generate("hello"))
+
+    assert answer == " ok"
+    assert backend.calls == 2
+    assert backend.cancelled == 1
+    assert time.perf_counter() - started_at < 1
+
+
+def test_first_token_timeout_without_retries() -> None:
+    backend = ScriptedBackend(["stall"])
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(resilient(backend, first_token_timeout_seconds=0.1, max_retries=0).generate("hello"))
+    assert backend.cancelled == 1
+
+
+def test_generation_timeout_after_the_first_token_is_not_retried() -> None:
+    backend = ScriptedBackend(["stall_after_first_token"])
+    llm = resilient(backend, timeout_seconds=0.2)
+
+    async def main() -> list[str]:
+        tokens = []
+        with pytest.raises(TimeoutError):
+            async for _, token in llm.stream_batch(["a", "b"], GenerationParameters()):
+                tokens.append(token)
+
+        return tokens
+
+    # the first token was streamed already, retrying would repeat it to the client.
+    assert asyncio.run(main()) == [" ok"]
+    assert backend.calls == 1
+    assert backend.cancelled == 1
+
+
+def test_slow_requests_are_hedged() -> None:
+    backend = ScriptedBackend()
+    llm = resilient(backend, hedge_percentile=90)
+
+    async def main() -> tuple[str, float]:
+        for _ in range(HEDGE_MIN_SAMPLES):
+            await llm.generate("warm up")
+
+        backend.script = ["ok"] * backend.calls + ["stall"]
+        started_at = time.perf_counter()
+        answer = await llm.generate("hello")
+
+        return answer, time.perf_counter() - started_at
+
+    answer, seconds = asyncio.run(main())
+
+    # the duplicate request answered, the stalled one was cancelled.
+    assert answer == " ok"
+    assert seconds < 1
+    assert backend.calls == HEDGE_MIN_SAMPLES + 2
+    assert backend.cancelled == 1
+
+
+def test_open_circuit_fails_fast() -> None:
+    backend = ScriptedBackend(["fail"] * 10)
+    llm = resilient(backend, max_retries=0)
+
+    async def main() -> None:
+        for _ in range(4):
+            with pytest.raises(ConnectionError):
+                await llm.generate("hello")
+
+        with pytest.raises(CircuitBreakerOpen):
+            await llm.generate("hello")
+
+    asyncio.run(main())
+
+    assert backend.calls == 4
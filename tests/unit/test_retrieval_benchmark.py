@@ -0,0 +1,87 @@
+import random
+from collections import Counter
+
+import numpy as np
+import pytest
+from click.testing import CliRunner
+
+from llm_engineering.application.rag.exact_search import ExactSearchEngine
+from llm_engineering.domain.documents import ArticleDocument, PostDocument, RepositoryDocument
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk, EmbeddedPostChunk
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from llm_engineering.settings import settings
+from tests.unit.conftest import make_chunk
+from tools import retrieval_benchmark
+from tools.qdrant_benchmarks import latency_stats
+
+
+def test_generate_corpus() -> None:
+    documents = retrieval_benchmark.generate_corpus(num_authors=3, documents_per_author=2, rng=random.Random(0))
+
+    assert Counter(type(document) for document in documents) == {
+        PostDocument: 6,
+        ArticleDocument: 6,
+        RepositoryDocument: 6,
+    }
+    assert len({document.author_id for document in documents}) == 3
+    # the same seed generates the same corpus.
+    same_documents = retrieval_benchmark.generate_corpus(num_authors=3, documents_per_author=2, rng=random.Random(0))
+    assert [document.content for document in documents] == [document.content for document in same_documents]
+
+
+def test_synthetic_text_is_about_one_topic() -> None:
+    text = retrieval_benchmark.synthetic_text(random.Random(1), num_sentences=5)
+
+    words = {word.strip(".").lower() for word in text.split()} - set(retrieval_benchmark.FILLER_WORDS)
+    assert text.count(".") == 5
+    assert any(words <= set(topic_words) for topic_words in retrieval_benchmark.TOPICS.values())
+
+
+def test_generate_queries_from_the_chunks() -> None:
+    chunks = [make_chunk(" ".join(f"word{i}" for i in range(20))), make_chunk("short chunk")]
+
+    queries = retrieval_benchmark.generate_queries(chunks, num_queries=10, rng=random.Random(2))
+
+    chunks_by_author = {chunk.author_id: chunk for chunk in chunks}
+    assert len(queries) == 10
+    for query in queries:
+        # a window of words of a chunk, scoped to its author.
+        assert query.content in chunks_by_author[query.author_id].content
+        assert query.author_full_name == "Jane Doe"
+
+
+def test_exact_top_k_ids_across_collections(qdrant: LocalModeClient) -> None:
+    articles = [make_chunk("close article", [1.0, 0.1, 0.0, 0.0]), make_chunk("far article", [0.0, 1.0, 0.0, 0.0])]
+    post = EmbeddedPostChunk(**make_chunk("closest post", [1.0, 0.0, 0.0, 0.0]).model_dump())
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(articles)
+    EmbeddedPostChunk.get_or_create_collection()
+    EmbeddedPostChunk._bulk_insert([post])
+    engines = {
+        document_class: ExactSearchEngine(document_class).load()
+        for document_class in (EmbeddedArticleChunk, EmbeddedPostChunk)
+    }
+
+    ids = retrieval_benchmark.exact_top_k_ids(engines, [1.0, 0.0, 0.0, 0.0], limit=2, query_filter=DocumentFilter())
+
+    assert ids == {str(post.id), str(articles[0].id)}
+    author_ids = retrieval_benchmark.exact_top_k_ids(
+        engines, [1.0, 0.0, 0.0, 0.0], limit=2, query_filter=DocumentFilter.by_author(articles[1].author_id)
+    )
+    assert author_ids == {str(articles[1].id)}
+
+
+def test_refuses_to_run_against_a_qdrant_server(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "USE_QDRANT_LOCAL", False)
+
+    result = CliRunner().invoke(retrieval_benchmark.main, ["--num-queries", "1"])
+
+    assert result.exit_code != 0
+    assert "only runs against a local Qdrant" in result.output
+
+
+def test_latency_stats() -> None:
+    stats = latency_stats(list(np.arange(1, 101) / 1000))
+
+    assert stats == {"mean": 50.5, "p50": 50.5, "p95": 95.05, "p99": 99.01}
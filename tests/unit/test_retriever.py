@@ -0,0 +1,206 @@
+import asyncio
+import time
+import uuid
+
+import pytest
+
+from llm_engineering.application.rag import retriever, semantic_cache
+from llm_engineering.application.rag.retriever import ContextRetriever
+from llm_engineering.application.rag.semantic_cache import SemanticCache
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk
+from llm_engineering.domain.queries import EmbeddedQuery, Query
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from tests.unit.conftest import make_chunk
+
+AXES = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+QUERY = "What is an HNSW index?"
+
+
+class FakeEmbeddingHandler:
+    """
+    Embeds every query along the first axis, unless its content is given a vector.
+    """
+
+    def __init__(self, vectors: dict[str, list[float]] | None = None) -> None:
+        self.vectors = vectors or {}
+
+    def embed(self, query: Query) -> EmbeddedQuery:
+        return self.embed_batch([query])[0]
+
+    def embed_batch(self, queries: list[Query]) -> list[EmbeddedQuery]:
+        return [
+            EmbeddedQuery(**query.model_dump(), embedding=self.vectors.get(query.content, AXES[0])) for query in queries
+        ]
+
+
+class FakeAsyncEmbedder:
+    def __init__(self, handler: FakeEmbeddingHandler) -> None:
+        self.handler = handler
+
+    async def embed(self, query: Query) -> EmbeddedQuery:
+        return self.handler.embed(query)
+
+    async def embed_batch(self, queries: list[Query]) -> list[EmbeddedQuery]:
+        return self.handler.embed_batch(queries)
+
+
+@pytest.fixture()
+def articles(qdrant: LocalModeClient) -> list[EmbeddedArticleChunk]:
+    articles = [make_chunk(f"article {i}", axis) for i, axis in enumerate(AXES)]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(articles)
+
+    return articles
+
+
+@pytest.fixture()
+def context_retriever(articles: list[EmbeddedArticleChunk]) -> ContextRetriever:
+    context_retriever = ContextRetriever(mock=True, latency_budget_seconds=0, mmr_top_k=0, hybrid_search=False)
+    context_retriever._embedding_handler = FakeEmbeddingHandler()
+    context_retriever._async_embedder = FakeAsyncEmbedder(context_retriever._embedding_handler)
+
+    return context_retriever
+
+
+def test_retrieve(context_retriever: ContextRetriever) -> None:
+    result = context_retriever.retrieve(QUERY, k=2)
+
+    assert result.chunks[0].content == "article 0"
+    assert len(result.chunks) == 2
+    assert result.skipped_stages == []
+    assert set(result.stage_seconds) == {"self_query", "query_expansion", "embedding", "search", "rerank"}
+    assert result.total_seconds == pytest.approx(sum(result.stage_seconds.values()))
+
+
+def test_expanded_queries_are_searched(context_retriever: ContextRetriever, monkeypatch: pytest.MonkeyPatch) -> None:
+    context_retriever._embedding_handler = FakeEmbeddingHandler({"variant": AXES[3]})
+    monkeypatch.setattr(
+        context_retriever._query_expander,
+        "generate",
+        lambda query, expand_to_n: [query, query.replace_content("variant")],
+    )
+
+    result = context_retriever.retrieve(QUERY, k=2)
+
+    # the best chunk of each query, both scoring 1.0 while the other chunks score 0.
+    assert {chunk.content for chunk in result.chunks} == {"article 0", "article 3"}
+
+
+def test_the_search_is_scoped_to_the_extracted_author(
+    context_retriever: ContextRetriever, articles: list[EmbeddedArticleChunk], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def self_query(query: Query) -> Query:
+        return query.model_copy(update={"author_id": articles[2].author_id, "author_full_name": "Jane Doe"})
+
+    monkeypatch.setattr(context_retriever._metadata_extractor, "generate", self_query)
+
+    result = context_retriever.retrieve(QUERY, k=3)
+
+    assert result.query.author_id == articles[2].author_id
+    assert [chunk.content for chunk in result.chunks] == ["article 2"]
+
+
+def test_a_failing_stage_is_skipped(context_retriever: ContextRetriever, monkeypatch: pytest.MonkeyPatch) -> None:
+    def failing_expansion(query: Query, expand_to_n: int) -> list[Query]:
+        raise RuntimeError("The LLM is down.")
+
+    monkeypatch.setattr(context_retriever._query_expander, "generate", failing_expansion)
+
+    result = context_retriever.retrieve(QUERY, k=1)
+
+    # the original query is searched instead.
+    assert result.skipped_stages == ["query_expansion"]
+    assert [chunk.content for chunk in result.chunks] == ["article 0"]
+
+
+def test_the_optional_stages_are_skipped_past_the_latency_budget(
+    context_retriever: ContextRetriever, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def slow_self_query(query: Query) -> Query:
+        time.sleep(0.5)
+
+        return query.model_copy(update={"author_id": uuid.uuid4()})
+
+    monkeypatch.setattr(context_retriever._metadata_extractor, "generate", slow_self_query)
+    context_retriever.latency_budget_seconds = 0.05
+
+    result = context_retriever.retrieve(QUERY, k=2)
+
+    # no author filter, and the similarity order instead of the reranking.
+    assert result.query.author_id is None
+    assert {"self_query", "rerank"} <= set(result.skipped_stages)
+    assert result.chunks[0].content == "article 0"
+    assert result.stage_seconds["self_query"] < 0.5
+
+
+def test_hybrid_search_passes_the_query_texts(
+    context_retriever: ContextRetriever, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    search_calls = []
+
+    def search_collections_with_scores(**kwargs) -> list:
+        search_calls.append(kwargs)
+
+        return []
+
+    monkeypatch.setattr(retriever, "search_collections_with_scores", search_collections_with_scores)
+
+    context_retriever.retrieve(QUERY, k=1, expand_to_n_queries=2)
+    context_retriever.hybrid_search = True
+    context_retriever.retrieve(QUERY, k=1, expand_to_n_queries=2)
+
+    assert [call["query_texts"] for call in search_calls] == [None, [QUERY, QUERY]]
+
+
+def test_semantic_cache(
+    context_retriever: ContextRetriever, qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(semantic_cache, "connection", qdrant)
+    context_retriever._semantic_cache = SemanticCache(similarity_threshold=0.9, ttl_seconds=60)
+
+    stored = context_retriever.retrieve(QUERY, k=2)
+    assert not stored.cache_hit
+    assert context_retriever.semantic_cache.set_answer(stored.cache_entry_id, "A graph index.")
+
+    hit = context_retriever.retrieve(QUERY, k=2)
+    assert (hit.cache_hit, hit.cached_answer, hit.cache_entry_id) == (True, "A graph index.", stored.cache_entry_id)
+    assert [chunk.id for chunk in hit.chunks] == [chunk.id for chunk in stored.chunks]
+
+    # a smaller k is served the chunks only, and must not overwrite the answer of the entry.
+    smaller_hit = context_retriever.retrieve(QUERY, k=1)
+    assert (smaller_hit.cache_hit, smaller_hit.cached_answer, smaller_hit.cache_entry_id) == (True, None, None)
+    # a larger k retrieves again.
+    assert not context_retriever.retrieve(QUERY, k=3).cache_hit
+
+
+def test_aretrieve_matches_retrieve(context_retriever: ContextRetriever) -> None:
+    result = asyncio.run(context_retriever.aretrieve(QUERY, k=2))
+
+    assert [chunk.id for chunk in result.chunks] == [
+        chunk.id for chunk in context_retriever.retrieve(QUERY, k=2).chunks
+    ]
+    assert result.skipped_stages == []
+
+
+def test_aretrieve_cancels_the_stages_past_the_latency_budget(
+    context_retriever: ContextRetriever, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cancelled = []
+
+    async def slow_self_query(query: Query) -> Query:
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+        return query
+
+    monkeypatch.setattr(context_retriever._metadata_extractor, "agenerate", slow_self_query)
+    context_retriever.latency_budget_seconds = 0.05
+
+    result = asyncio.run(context_retriever.aretrieve(QUERY, k=2))
+
+    assert {"self_query", "rerank"} <= set(result.skipped_stages)
+    assert result.chunks[0].content == "article 0"
+    assert cancelled == [True]
@@ -0,0 +1,235 @@
+import asyncio
+import uuid
+
+import pytest
+
+from llm_engineering.application.preprocessing.operations import sparse_embed, sparse_embed_query
+from llm_engineering.application.rag import search_collections, search_collections_with_scores
+from llm_engineering.application.rag.search import asearch_collections_with_scores
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk, EmbeddedPostChunk, EmbeddedRepositoryChunk
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from tests.unit.conftest import make_chunk
+
+AXES = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+
+
+def make_post_chunk(content: str, embedding: list[float]) -> EmbeddedPostChunk:
+    return EmbeddedPostChunk(
+        content=content,
+        embedding=embedding,
+        platform="linkedin",
+        document_id=uuid.uuid4(),
+        author_id=uuid.uuid4(),
+        author_full_name="Jane Doe",
+    )
+
+
+@pytest.fixture()
+def articles(qdrant: LocalModeClient) -> list[EmbeddedArticleChunk]:
+    # one article along each axis, and a second one between the first two axes.
+    articles = [make_chunk(f"article {i}", axis) for i, axis in enumerate(AXES)]
+    articles.append(make_chunk("article between 0 and 1", [0.7, 0.7, 0.0, 0.0]))
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(articles)
+
+    return articles
+
+
+@pytest.fixture()
+def posts(qdrant: LocalModeClient) -> list[EmbeddedPostChunk]:
+    posts = [make_post_chunk("post 0", [0.9, 0.1, 0.0, 0.0]), make_post_chunk("post 3", AXES[3])]
+    EmbeddedPostChunk.get_or_create_collection()
+    EmbeddedPostChunk._bulk_insert(posts)
+
+    return posts
+
+
+def test_search_batch_returns_the_results_of_each_query(articles: list[EmbeddedArticleChunk]) -> None:
+    results = EmbeddedArticleChunk.search_batch(query_vectors=[AXES[0], AXES[2]], limit=2)
+
+    assert [document.content for document in results[0]] == ["article 0", "article between 0 and 1"]
+    assert len(results[1]) == 2
+    assert results[1][0].content == "article 2"
+
+
+def test_search_batch_filters_per_query(articles: list[EmbeddedArticleChunk]) -> None:
+    filters = [DocumentFilter.by_author(articles[1].author_id), None]
+
+    results = EmbeddedArticleChunk.search_batch(query_vectors=[AXES[0], AXES[0]], limit=1, filters=filters)
+
+    assert [query_results[0].content for query_results in results] == ["article 1", "article 0"]
+
+
+def test_search_batch_expects_one_filter_per_query(articles: list[EmbeddedArticleChunk]) -> None:
+    with pytest.raises(ValueError):
+        EmbeddedArticleChunk._search_batch(query_vectors=[AXES[0], AXES[1]], filters=[None])
+
+
+def test_search_batch_on_a_missing_collection(qdrant: LocalModeClient) -> None:
+    # a failed request degrades to empty results, one list per query vector.
+    assert EmbeddedArticleChunk.search_batch_with_scores(query_vectors=[AXES[0], AXES[1]]) == [[], []]
+
+
+def test_search_collections_merges_the_collections(
+    articles: list[EmbeddedArticleChunk], posts: list[EmbeddedPostChunk]
+) -> None:
+    results = search_collections_with_scores(
+        query_vectors=[AXES[0], AXES[3]], limit=2, document_classes=[EmbeddedArticleChunk, EmbeddedPostChunk]
+    )
+
+    contents = [document.content for document, _ in results]
+    # the documents found by several queries are kept once.
+    assert len(contents) == len(set(contents))
+    assert set(contents) == {"article 0", "article 3", "article between 0 and 1", "post 0", "post 3"}
+    scores = [score for _, score in results]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_collections_top_k(articles: list[EmbeddedArticleChunk], posts: list[EmbeddedPostChunk]) -> None:
+    documents = search_collections(
+        query_vectors=[AXES[0]], limit=3, document_classes=[EmbeddedArticleChunk, EmbeddedPostChunk], top_k=2
+    )
+
+    assert [document.content for document in documents] == ["article 0", "post 0"]
+
+
+def test_search_collections_without_queries(articles: list[EmbeddedArticleChunk]) -> None:
+    assert search_collections(query_vectors=[], document_classes=[EmbeddedArticleChunk]) == []
+
+
+def make_repository_chunk(content: str, embedding: list[float]) -> EmbeddedRepositoryChunk:
+    return EmbeddedRepositoryChunk(
+        content=content,
+        embedding=embedding,
+        sparse_embedding=sparse_embed(content),
+        platform="github",
+        name="llm-twin",
+        link="https://github.com/example/llm-twin",
+        document_id=uuid.uuid4(),
+        author_id=uuid.uuid4(),
+        author_full_name="Jane Doe",
+    )
+
+
+@pytest.fixture()
+def repositories(qdrant: LocalModeClient) -> list[EmbeddedRepositoryChunk]:
+    # the identifier is only in the chunk the furthest from the query vector.
+    repositories = [
+        make_repository_chunk("def connect(): ...", AXES[0]),
+        make_repository_chunk("def close(): ...", [0.9, 0.1, 0.0, 0.0]),
+        make_repository_chunk("class QdrantDatabaseConnector: ...", AXES[2]),
+    ]
+    EmbeddedRepositoryChunk.get_or_create_collection()
+    EmbeddedRepositoryChunk._bulk_insert(repositories)
+
+    return repositories
+
+
+def test_hybrid_search_finds_the_exact_terms(repositories: list[EmbeddedRepositoryChunk]) -> None:
+    documents = EmbeddedRepositoryChunk.hybrid_search(
+        query_vector=AXES[0], sparse_query_vector=sparse_embed_query("QdrantDatabaseConnector"), limit=3
+    )
+
+    assert documents[0].content == "class QdrantDatabaseConnector: ..."
+    assert {document.content for document in documents} == {repository.content for repository in repositories}
+
+
+def test_search_collections_with_query_texts(
+    repositories: list[EmbeddedRepositoryChunk], articles: list[EmbeddedArticleChunk]
+) -> None:
+    dense_results = search_collections(
+        query_vectors=[AXES[0]], limit=1, document_classes=[EmbeddedRepositoryChunk, EmbeddedArticleChunk]
+    )
+    hybrid_results = search_collections_with_scores(
+        query_vectors=[AXES[0]],
+        limit=1,
+        document_classes=[EmbeddedRepositoryChunk, EmbeddedArticleChunk],
+        query_texts=["QdrantDatabaseConnector"],
+    )
+
+    assert [document.content for document in dense_results] == ["def connect(): ...", "article 0"]
+    # the lexical match wins the repository collection, and is scored with its cosine similarity to be merged.
+    assert [(document.content, score) for document, score in hybrid_results] == [
+        ("article 0", pytest.approx(1.0)),
+        ("class QdrantDatabaseConnector: ...", pytest.approx(0.0)),
+    ]
+    assert all(document.embedding is None for document, _ in hybrid_results)
+
+
+def test_search_collections_expects_one_query_text_per_query(articles: list[EmbeddedArticleChunk]) -> None:
+    with pytest.raises(ValueError):
+        search_collections(query_vectors=[AXES[0], AXES[1]], query_texts=["query"])
+
+
+def test_async_search_batch_matches_the_sync_one(articles: list[EmbeddedArticleChunk]) -> None:
+    filters = [DocumentFilter.by_author(articles[1].author_id), None]
+
+    results = asyncio.run(
+        EmbeddedArticleChunk.asearch_batch_with_scores(query_vectors=[AXES[0], AXES[2]], limit=2, filters=filters)
+    )
+
+    assert results == EmbeddedArticleChunk.search_batch_with_scores(
+        query_vectors=[AXES[0], AXES[2]], limit=2, filters=filters
+    )
+
+
+def test_async_search_batch_on_a_missing_collection(qdrant: LocalModeClient) -> None:
+    results = asyncio.run(EmbeddedArticleChunk.asearch_batch_with_scores(query_vectors=[AXES[0], AXES[1]]))
+
+    assert results == [[], []]
+
+
+def test_async_search_collections_matches_the_sync_one(
+    articles: list[EmbeddedArticleChunk], posts: list[EmbeddedPostChunk]
+) -> None:
+    kwargs = {
+        "query_vectors": [AXES[0], AXES[3]],
+        "limit": 2,
+        "document_classes": [EmbeddedArticleChunk, EmbeddedPostChunk],
+    }
+
+    results = asyncio.run(asearch_collections_with_scores(**kwargs))
+
+    assert [(document.id, score) for document, score in results] == [
+        (document.id, score) for document, score in search_collections_with_scores(**kwargs)
+    ]
+
+
+def test_async_search_collections_skips_the_failing_and_late_collections(
+    articles: list[EmbeddedArticleChunk], posts: list[EmbeddedPostChunk], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    cancelled = []
+
+    async def late_search(*args, **kwargs) -> list:
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+        return []
+
+    async def failing_search(*args, **kwargs) -> list:
+        raise RuntimeError("The search failed.")
+
+    monkeypatch.setattr(EmbeddedPostChunk, "asearch_batch_with_scores", late_search)
+    results = asyncio.run(
+        asearch_collections_with_scores(
+            query_vectors=[AXES[0]],
+            limit=1,
+            document_classes=[EmbeddedArticleChunk, EmbeddedPostChunk],
+            timeout_seconds=0.5,
+        )
+    )
+    assert [document.content for document, _ in results] == ["article 0"]
+    # the late search is cancelled, not left running.
+    assert cancelled == [True]
+
+    monkeypatch.setattr(EmbeddedPostChunk, "asearch_batch_with_scores", failing_search)
+    results = asyncio.run(
+        asearch_collections_with_scores(
+            query_vectors=[AXES[0]], limit=1, document_classes=[EmbeddedArticleChunk, EmbeddedPostChunk]
+        )
+    )
+    assert [document.content for document, _ in results] == ["article 0"]
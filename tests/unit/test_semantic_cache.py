@@ -0,0 +1,98 @@
+import uuid
+
+import pytest
+
+from llm_engineering.application.rag import semantic_cache
+from llm_engineering.application.rag.semantic_cache import SemanticCache, SemanticCacheEntry
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk
+from llm_engineering.domain.queries import EmbeddedQuery
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from tests.unit.conftest import FakeClock, make_chunk
+
+AXES = [[1.0, 0.0, 0.0, 0.0], [0.0, 1.0, 0.0, 0.0]]
+
+
+def make_query(content: str, embedding: list[float], author_id: uuid.UUID | None = None) -> EmbeddedQuery:
+    return EmbeddedQuery(content=content, embedding=embedding, author_id=author_id)
+
+
+@pytest.fixture()
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    clock = FakeClock()
+    monkeypatch.setattr(semantic_cache, "time", clock)
+
+    return clock
+
+
+@pytest.fixture()
+def cache(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch, clock: FakeClock) -> SemanticCache:
+    monkeypatch.setattr(semantic_cache, "connection", qdrant)
+
+    return SemanticCache(similarity_threshold=0.9, ttl_seconds=60)
+
+
+@pytest.fixture()
+def chunks() -> list[EmbeddedArticleChunk]:
+    return [make_chunk(f"chunk {i}", AXES[0]) for i in range(5)]
+
+
+def test_similar_queries_hit(cache: SemanticCache, chunks: list[EmbeddedArticleChunk]) -> None:
+    entry_id = cache.store(make_query("What is HNSW?", AXES[0]), chunks[:3], k=3, expand_to_n_queries=3)
+
+    hit = cache.lookup(make_query("What's HNSW?", [0.99, 0.1, 0.0, 0.0]), k=3, expand_to_n_queries=3)
+
+    assert hit is not None
+    assert (hit.entry_id, hit.query, hit.k) == (entry_id, "What is HNSW?", 3)
+    assert [chunk.content for chunk in hit.chunks] == ["chunk 0", "chunk 1", "chunk 2"]
+    assert all(chunk.embedding is None for chunk in hit.chunks)
+    assert cache.lookup(make_query("Who wrote it?", AXES[1]), k=3, expand_to_n_queries=3) is None
+
+
+def test_entries_only_serve_fewer_chunks_and_query_variants(
+    cache: SemanticCache, chunks: list[EmbeddedArticleChunk]
+) -> None:
+    query = make_query("What is HNSW?", AXES[0])
+    entry_id = cache.store(query, chunks[:3], k=3, expand_to_n_queries=2)
+    assert cache.set_answer(entry_id, "A graph index.")
+
+    # a smaller k gets the best chunks, but not the answer generated from all of them.
+    hit = cache.lookup(query, k=2, expand_to_n_queries=2)
+    assert [chunk.content for chunk in hit.chunks] == ["chunk 0", "chunk 1"]
+    assert hit.answer is None
+    assert cache.lookup(query, k=3, expand_to_n_queries=1).answer == "A graph index."
+
+    assert cache.lookup(query, k=5, expand_to_n_queries=2) is None
+    assert cache.lookup(query, k=3, expand_to_n_queries=3) is None
+
+
+def test_entries_are_scoped_to_the_author(cache: SemanticCache, chunks: list[EmbeddedArticleChunk]) -> None:
+    author_id = uuid.uuid4()
+    cache.store(make_query("What is HNSW?", AXES[0], author_id=author_id), chunks, k=5, expand_to_n_queries=3)
+
+    assert cache.lookup(make_query("What is HNSW?", AXES[0], author_id=author_id), k=5, expand_to_n_queries=3)
+    assert cache.lookup(make_query("What is HNSW?", AXES[0]), k=5, expand_to_n_queries=3) is None
+    assert (
+        cache.lookup(make_query("What is HNSW?", AXES[0], author_id=uuid.uuid4()), k=5, expand_to_n_queries=3) is None
+    )
+
+
+def test_entries_expire(cache: SemanticCache, clock: FakeClock, chunks: list[EmbeddedArticleChunk]) -> None:
+    query = make_query("What is HNSW?", AXES[0])
+    cache.store(query, chunks, k=5, expand_to_n_queries=3)
+
+    clock.advance(61)
+
+    assert cache.lookup(query, k=5, expand_to_n_queries=3) is None
+    assert cache.delete_expired()
+    assert list(SemanticCacheEntry.iter_all()) == []
+
+
+def test_invalidate_authors(cache: SemanticCache, chunks: list[EmbeddedArticleChunk]) -> None:
+    author_id, other_author_id = uuid.uuid4(), uuid.uuid4()
+    for query_author_id in (author_id, other_author_id, None):
+        cache.store(make_query("What is HNSW?", AXES[0], query_author_id), chunks, k=5, expand_to_n_queries=3)
+
+    assert SemanticCache.invalidate_authors({author_id})
+
+    # the queries without an author may have been answered with the author's chunks as well.
+    assert [entry.author_key for entry in SemanticCacheEntry.iter_all()] == [str(other_author_id)]
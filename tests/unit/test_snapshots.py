@@ -0,0 +1,86 @@
+import gzip
+import uuid
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from llm_engineering.application.loading import SnapshotError, export_collection, import_collection, snapshots
+from llm_engineering.application.preprocessing.operations import sparse_embed
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk, EmbeddedRepositoryChunk
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from tests.unit.conftest import EMBEDDING_SIZE, make_chunk
+
+
+@pytest.fixture()
+def articles(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch) -> list[EmbeddedArticleChunk]:
+    monkeypatch.setattr(snapshots, "connection", qdrant)
+    rng = np.random.default_rng(0)
+    articles = [make_chunk(f"article {i}", rng.normal(size=EMBEDDING_SIZE).tolist()) for i in range(7)]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(articles)
+
+    return articles
+
+
+def test_export_import_round_trip(articles: list[EmbeddedArticleChunk], tmp_path: Path) -> None:
+    manifest = export_collection(EmbeddedArticleChunk, tmp_path, batch_size=3)
+
+    assert (manifest.num_points, manifest.dim) == (len(articles), EMBEDDING_SIZE)
+    assert manifest.vectors(tmp_path).shape == (len(articles), EMBEDDING_SIZE)
+
+    report = import_collection(tmp_path, recreate=True, window_size=4)
+
+    assert report.num_points == len(articles)
+    restored = {str(document.id): document for document in EmbeddedArticleChunk.iter_all(with_vectors=True)}
+    assert restored.keys() == {str(article.id) for article in articles}
+    for article in articles:
+        document = restored[str(article.id)]
+        assert document.content == article.content
+        # the vectors are stored normalized by the cosine collection.
+        np.testing.assert_allclose(document.embedding, article.embedding / np.linalg.norm(article.embedding), rtol=1e-5)
+
+
+def test_sparse_vectors_round_trip(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> None:
+    monkeypatch.setattr(snapshots, "connection", qdrant)
+    repository = EmbeddedRepositoryChunk(
+        content="class QdrantDatabaseConnector: ...",
+        embedding=[1.0, 0.0, 0.0, 0.0],
+        sparse_embedding=sparse_embed("class QdrantDatabaseConnector: ..."),
+        platform="github",
+        name="llm-twin",
+        link="https://github.com/example/llm-twin",
+        document_id=uuid.uuid4(),
+        author_id=uuid.uuid4(),
+        author_full_name="Jane Doe",
+    )
+    EmbeddedRepositoryChunk.get_or_create_collection()
+    EmbeddedRepositoryChunk._bulk_insert([repository])
+
+    export_collection(EmbeddedRepositoryChunk, tmp_path)
+    import_collection(tmp_path, recreate=True)
+
+    (document,) = EmbeddedRepositoryChunk.iter_all(with_vectors=True)
+    assert document.sparse_embedding.indices == repository.sparse_embedding.indices
+    np.testing.assert_allclose(document.sparse_embedding.values, repository.sparse_embedding.values)
+
+
+def test_import_into_a_non_empty_collection(articles: list[EmbeddedArticleChunk], tmp_path: Path) -> None:
+    export_collection(EmbeddedArticleChunk, tmp_path)
+
+    with pytest.raises(SnapshotError, match="not empty"):
+        import_collection(tmp_path)
+
+
+def test_corrupted_snapshot(articles: list[EmbeddedArticleChunk], tmp_path: Path) -> None:
+    export_collection(EmbeddedArticleChunk, tmp_path)
+    with gzip.open(tmp_path / snapshots.PAYLOADS_FILE, "ab") as payloads_file:
+        payloads_file.write(b"{}\n")
+
+    with pytest.raises(SnapshotError, match="Checksum mismatch"):
+        import_collection(tmp_path, recreate=True)
+
+
+def test_missing_manifest(tmp_path: Path) -> None:
+    with pytest.raises(SnapshotError, match="No snapshot manifest"):
+        import_collection(tmp_path)
@@ -0,0 +1,42 @@
+import pytest
+
+from llm_engineering.application.preprocessing.operations import sparse_embed, sparse_embed_query
+from llm_engineering.application.preprocessing.operations.sparse import BM25_K1, token_index, tokenize
+
+
+@pytest.mark.parametrize(
+    ("text", "expected_tokens"),
+    [
+        ("Hybrid search", ["hybrid", "search"]),
+        # identifiers are kept whole and also split into their parts.
+        ("HTTPRequestHandler", ["httprequesthandler", "http", "request", "handler"]),
+        ("request_handler", ["request_handler", "request", "handler"]),
+        ("os.path.join", ["os", "path", "join"]),
+        # single characters are dropped.
+        ("a b 42", ["42"]),
+    ],
+)
+def test_tokenize(text: str, expected_tokens: list[str]) -> None:
+    assert tokenize(text) == expected_tokens
+
+
+def test_sparse_embed_saturates_the_term_frequencies() -> None:
+    vector = sparse_embed("cache cache cache miss")
+
+    weights = dict(zip(vector.indices, vector.values, strict=True))
+    assert vector.indices == sorted(vector.indices)
+    assert weights[token_index("miss")] == pytest.approx(1.0)
+    assert weights[token_index("cache")] == pytest.approx(3 * (BM25_K1 + 1) / (3 + BM25_K1))
+    assert weights[token_index("cache")] < 3 * weights[token_index("miss")]
+
+
+def test_sparse_embed_query_counts_every_token_once() -> None:
+    vector = sparse_embed_query("cache the cache")
+
+    assert vector.indices == sorted({token_index("cache"), token_index("the")})
+    assert vector.values == [1.0, 1.0]
+
+
+def test_empty_text() -> None:
+    assert sparse_embed("").indices == []
+    assert sparse_embed_query("!?").indices == []
@@ -0,0 +1,313 @@
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+from qdrant_client.http.models import BinaryQuantization, ProductQuantization, ScalarQuantization, SearchParams
+from qdrant_client.models import Record
+
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.base.vector import build_quantization_config, compute_fingerprint
+from llm_engineering.domain.embedded_chunks import EmbeddedArticleChunk, EmbeddedChunk, EmbeddedPostChunk
+from llm_engineering.domain.exceptions import ImproperlyConfigured
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.domain.types import DataCategory
+from llm_engineering.infrastructure.db.content_store import ContentStoreSingleton, MmapContentStore
+from llm_engineering.infrastructure.db.qdrant import LocalModeClient
+from llm_engineering.settings import settings
+from tests.unit.conftest import EMBEDDING_SIZE, make_chunk
+
+
+def random_embedding(rng: np.random.Generator) -> list[float]:
+    return rng.normal(size=EMBEDDING_SIZE).tolist()
+
+
+@pytest.fixture()
+def chunks(qdrant: LocalModeClient) -> list[EmbeddedArticleChunk]:
+    rng = np.random.default_rng(0)
+    chunks = [make_chunk(f"chunk {i}", random_embedding(rng)) for i in range(25)]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(chunks)
+
+    return chunks
+
+
+def test_iter_all_follows_the_scroll_offsets(chunks: list[EmbeddedArticleChunk]) -> None:
+    documents = list(EmbeddedArticleChunk.iter_all(batch_size=10))
+
+    assert sorted(document.content for document in documents) == sorted(chunk.content for chunk in chunks)
+    assert all(isinstance(document, EmbeddedArticleChunk) for document in documents)
+    assert all(document.embedding is None for document in documents)
+
+
+def test_iter_all_raw_records_with_vectors(chunks: list[EmbeddedArticleChunk]) -> None:
+    records = list(EmbeddedArticleChunk.iter_all(batch_size=7, with_vectors=True, raw=True))
+
+    assert len(records) == len(chunks)
+    assert all(isinstance(record, Record) for record in records)
+    assert all(len(record.vector) == EMBEDDING_SIZE for record in records)
+
+
+def test_iter_all_filter(chunks: list[EmbeddedArticleChunk]) -> None:
+    documents = list(EmbeddedArticleChunk.iter_all(filter=DocumentFilter.by_author(chunks[3].author_id)))
+
+    assert [document.id for document in documents] == [chunks[3].id]
+
+
+def test_iter_all_empty_collection(qdrant: LocalModeClient) -> None:
+    EmbeddedArticleChunk.get_or_create_collection()
+
+    assert list(EmbeddedArticleChunk.iter_all()) == []
+
+
+def test_iter_all_prefetches_the_next_page(
+    chunks: list[EmbeddedArticleChunk], qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    scrolled_offsets = []
+    second_page_requested = threading.Event()
+    scroll = qdrant.scroll
+
+    def recording_scroll(**kwargs):
+        scrolled_offsets.append(kwargs["offset"])
+        if len(scrolled_offsets) == 2:
+            second_page_requested.set()
+
+        return scroll(**kwargs)
+
+    monkeypatch.setattr(qdrant, "scroll", recording_scroll)
+    documents = EmbeddedArticleChunk.iter_all(batch_size=10)
+
+    next(documents)
+    # the second page is requested while the caller still holds the first one.
+    assert second_page_requested.wait(timeout=5)
+    assert len(list(documents)) == len(chunks) - 1
+    assert len(scrolled_offsets) == 3
+
+
+@pytest.fixture()
+def created_collections(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch) -> dict[str, dict]:
+    """
+    The arguments of the collections created, local mode accepts the index and quantization configs but doesn't
+    report them back.
+    """
+
+    created_collections = {}
+    create_collection = qdrant.create_collection
+
+    def recording_create_collection(collection_name: str, **kwargs) -> bool:
+        created_collections[collection_name] = kwargs
+
+        return create_collection(collection_name=collection_name, **kwargs)
+
+    monkeypatch.setattr(qdrant, "create_collection", recording_create_collection)
+
+    return created_collections
+
+
+class QuantizedChunk(EmbeddedChunk):
+    class Config:
+        name = "test_quantized_chunks"
+        category = DataCategory.ARTICLES
+        quantization = "scalar"
+        quantization_oversampling = 2.0
+
+
+@pytest.mark.parametrize(
+    ("quantization", "config_type"),
+    [("scalar", ScalarQuantization), ("product", ProductQuantization), ("binary", BinaryQuantization)],
+)
+def test_build_quantization_config(quantization: str, config_type: type) -> None:
+    assert isinstance(build_quantization_config(quantization), config_type)
+
+
+def test_unsupported_quantization() -> None:
+    with pytest.raises(ImproperlyConfigured):
+        build_quantization_config("float8")
+
+
+def test_plain_collections_keep_the_default_search_params() -> None:
+    assert EmbeddedArticleChunk.get_quantization_config() is None
+    assert EmbeddedArticleChunk._pop_search_params({}) is None
+
+
+def test_quantized_search_params_default_to_the_class_config() -> None:
+    search_params = QuantizedChunk._pop_search_params({})
+
+    assert search_params.quantization.rescore is True
+    assert search_params.quantization.oversampling == 2.0
+
+
+def test_search_time_quantization_params_override_the_class_config() -> None:
+    kwargs = {"oversampling": 4.0, "rescore": False, "limit": 3}
+
+    search_params = QuantizedChunk._pop_search_params(kwargs)
+
+    assert (search_params.quantization.oversampling, search_params.quantization.rescore) == (4.0, False)
+    # only the search params are popped.
+    assert kwargs == {"limit": 3}
+
+
+def test_quantized_collection(created_collections: dict[str, dict]) -> None:
+    chunks = [make_chunk(f"chunk {i}", axis) for i, axis in enumerate(np.eye(EMBEDDING_SIZE).tolist())]
+    QuantizedChunk.get_or_create_collection()
+    QuantizedChunk._bulk_insert([QuantizedChunk(**chunk.model_dump()) for chunk in chunks])
+
+    assert isinstance(created_collections["test_quantized_chunks"]["quantization_config"], ScalarQuantization)
+    documents = QuantizedChunk.search(query_vector=[0.0, 1.0, 0.0, 0.0], limit=1)
+    assert [document.content for document in documents] == ["chunk 1"]
+
+
+class TunedIndexChunk(EmbeddedChunk):
+    class Config:
+        name = "test_tuned_index_chunks"
+        category = DataCategory.ARTICLES
+        hnsw_m = 32
+        hnsw_ef_construct = 200
+        on_disk = True
+        hnsw_ef = 128
+
+
+def test_hnsw_config_from_the_class_config() -> None:
+    hnsw_config = TunedIndexChunk.get_hnsw_config()
+
+    assert (hnsw_config.m, hnsw_config.ef_construct) == (32, 200)
+    assert hnsw_config.full_scan_threshold is None
+    # collections without HNSW options keep the Qdrant defaults.
+    assert EmbeddedArticleChunk.get_hnsw_config() is None
+
+
+def test_search_hnsw_ef_defaults_to_the_class_config() -> None:
+    assert TunedIndexChunk._pop_search_params({}).hnsw_ef == 128
+    assert TunedIndexChunk._pop_search_params({"hnsw_ef": 512}).hnsw_ef == 512
+
+
+def test_exact_search_params() -> None:
+    search_params = EmbeddedArticleChunk._pop_search_params({"exact": True})
+
+    assert search_params.exact is True
+    assert search_params.hnsw_ef is None
+
+
+def test_raw_search_params_are_used_as_they_are() -> None:
+    search_params = SearchParams(hnsw_ef=16)
+
+    assert TunedIndexChunk._pop_search_params({"search_params": search_params, "hnsw_ef": 512}) is search_params
+
+
+def test_tuned_index_collection(created_collections: dict[str, dict]) -> None:
+    chunks = [make_chunk(f"chunk {i}", axis) for i, axis in enumerate(np.eye(EMBEDDING_SIZE).tolist())]
+    TunedIndexChunk.get_or_create_collection()
+    TunedIndexChunk._bulk_insert([TunedIndexChunk(**chunk.model_dump()) for chunk in chunks])
+
+    created_collection = created_collections["test_tuned_index_chunks"]
+    assert created_collection["hnsw_config"].m == 32
+    assert created_collection["vectors_config"].on_disk is True
+    for exact in (False, True):
+        documents = TunedIndexChunk.search(query_vector=[0.0, 0.0, 1.0, 0.0], limit=1, exact=exact)
+        assert [document.content for document in documents] == ["chunk 2"]
+
+
+def test_unchanged_points_are_skipped(qdrant: LocalModeClient) -> None:
+    rng = np.random.default_rng(6)
+    chunks = [make_chunk(f"chunk {i}", random_embedding(rng)) for i in range(4)]
+    EmbeddedArticleChunk.get_or_create_collection()
+
+    assert EmbeddedArticleChunk._bulk_insert(chunks, skip_unchanged=True) == 4
+    assert EmbeddedArticleChunk._bulk_insert(chunks, skip_unchanged=True) == 0
+
+    changed_content = chunks[1].model_copy(update={"content": "edited"})
+    changed_embedding = chunks[2].model_copy(update={"embedding": random_embedding(rng)})
+    assert EmbeddedArticleChunk._bulk_insert([chunks[0], changed_content, changed_embedding], skip_unchanged=True) == 2
+
+    documents = {document.id: document for document in EmbeddedArticleChunk.iter_all()}
+    assert documents[chunks[1].id].content == "edited"
+    # without skip_unchanged every point is written.
+    assert EmbeddedArticleChunk._bulk_insert(chunks) == 4
+
+
+def test_fingerprint_depends_on_the_payload_and_the_vector() -> None:
+    payload = {"content": "chunk", "platform": "medium"}
+
+    assert compute_fingerprint(payload, [0.1, 0.2]) == compute_fingerprint(dict(reversed(payload.items())), [0.1, 0.2])
+    assert compute_fingerprint(payload, [0.1, 0.2]) != compute_fingerprint(payload, [0.1, 0.3])
+    assert compute_fingerprint(payload, [0.1, 0.2]) != compute_fingerprint({**payload, "platform": "x"}, [0.1, 0.2])
+    assert compute_fingerprint(payload, [0.1, 0.2]) != compute_fingerprint(payload, [0.1, 0.2], lean=True)
+
+
+@pytest.fixture()
+def lean_payloads(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch, tmp_path: Path) -> MmapContentStore:
+    store = MmapContentStore(tmp_path)
+    monkeypatch.setattr(settings, "QDRANT_LEAN_PAYLOADS", True)
+    monkeypatch.setattr(ContentStoreSingleton, "_instance", store)
+
+    return store
+
+
+def test_lean_payloads_are_hydrated(lean_payloads: MmapContentStore) -> None:
+    chunks = [make_chunk(f"chunk {i}", axis) for i, axis in enumerate(np.eye(EMBEDDING_SIZE).tolist())]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(chunks)
+
+    (record,) = EmbeddedArticleChunk.iter_all(
+        batch_size=1, raw=True, filter=DocumentFilter.by_author(chunks[0].author_id)
+    )
+    assert "content" not in record.payload
+    documents = EmbeddedArticleChunk.search(query_vector=chunks[2].embedding, limit=1)
+    assert [document.content for document in documents] == ["chunk 2"]
+
+
+def test_lean_points_are_rewritten_when_lean_payloads_are_turned_off(
+    lean_payloads: MmapContentStore, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    chunks = [make_chunk(f"chunk {i}", axis) for i, axis in enumerate(np.eye(EMBEDDING_SIZE).tolist())]
+    EmbeddedArticleChunk.get_or_create_collection()
+    EmbeddedArticleChunk._bulk_insert(chunks, skip_unchanged=True)
+
+    monkeypatch.setattr(settings, "QDRANT_LEAN_PAYLOADS", False)
+
+    # the lean points are still readable until they are written again.
+    assert {document.content for document in EmbeddedArticleChunk.iter_all()} == {chunk.content for chunk in chunks}
+    # the same points stored in full don't have the same fingerprint, they are written again.
+    assert EmbeddedArticleChunk._bulk_insert(chunks, skip_unchanged=True) == len(chunks)
+    assert all("content" in record.payload for record in EmbeddedArticleChunk.iter_all(raw=True))
+    assert EmbeddedArticleChunk._bulk_insert(chunks, skip_unchanged=True) == 0
+
+
+def test_collection_info_is_cached(qdrant: LocalModeClient, monkeypatch: pytest.MonkeyPatch) -> None:
+    get_collection_calls = []
+    get_collection = qdrant.get_collection
+
+    def counting_get_collection(collection_name: str):
+        get_collection_calls.append(collection_name)
+
+        return get_collection(collection_name=collection_name)
+
+    monkeypatch.setattr(qdrant, "get_collection", counting_get_collection)
+
+    collection_info = EmbeddedArticleChunk.get_or_create_collection()
+    assert EmbeddedArticleChunk.get_or_create_collection() is collection_info
+    assert EmbeddedArticleChunk.collection_exists()
+    assert get_collection_calls == ["embedded_articles"]
+
+    EmbeddedArticleChunk.invalidate_collection_cache()
+    EmbeddedArticleChunk.get_or_create_collection()
+    assert get_collection_calls == ["embedded_articles"] * 2
+
+
+def test_invalidating_the_base_class_clears_every_collection(qdrant: LocalModeClient) -> None:
+    EmbeddedArticleChunk.get_or_create_collection()
+    qdrant.delete_collection(collection_name="embedded_articles")
+
+    # the deleted collection is still known to exist until the cache is invalidated.
+    assert EmbeddedArticleChunk.collection_exists()
+    VectorBaseDocument.invalidate_collection_cache()
+    assert not EmbeddedArticleChunk.collection_exists()
+
+
+def test_collection_registry() -> None:
+    assert VectorBaseDocument.collection_name_to_class("embedded_articles") is EmbeddedArticleChunk
+    assert EmbeddedChunk.registered_collections()["embedded_posts"] is EmbeddedPostChunk
+    # the abstract intermediate classes don't own a collection.
+    assert EmbeddedChunk not in VectorBaseDocument.registered_collections().values()
+    with pytest.raises(ValueError):
+        EmbeddedChunk.collection_name_to_class("unknown")
@@ -0,0 +1,92 @@
+import asyncio
+import time
+from pathlib import Path
+
+import click
+import httpx
+
+from tools.qdrant_benchmarks import latency_stats, report
+
+DEFAULT_QUERY = "My name is Steven Evans. Could you draft a LinkedIn post discussing RAG systems?"
+
+
+@click.command(
+    help="""
+Load test the streaming /rag/stream endpoint of the inference service.
+
+Runs --num-requests requests, --concurrency at a time, and reports the throughput and the latency percentiles
+of the time to first token and of the full answers, as JSON. Start the service with the local stub model
+(LLM_INFERENCE_BACKEND=local_stub) to measure the serving overhead and the request batching alone.
+"""
+)
+@click.option("--url", default="http://127.0.0.1:8000", help="Base URL of the inference service.")
+@click.option("--num-requests", default=200, type=int, help="Total number of requests.")
+@click.option("--concurrency", default=32, type=int, help="Requests in flight at the same time.")
+@click.option("--query", default=DEFAULT_QUERY, help="Query sent by every request.")
+@click.option("--timeout", default=120.0, type=float, help="Timeout of a request, in seconds.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def main(url: str, num_requests: int, concurrency: int, query: str, timeout: float, output: Path | None) -> None:
+    results = asyncio.run(
+        run_load_test(url=url, num_requests=num_requests, concurrency=concurrency, query=query, timeout=timeout)
+    )
+
+    successful_results = [result for result in results if result["error"] is None]
+    if len(successful_results) == 0:
+        raise click.ClickException(f"Every request failed, e.g. {results[0]['error']}")
+
+    wall_seconds = max(result["end"] for result in results) - min(result["start"] for result in results)
+    num_chunks = sum(result["num_chunks"] for result in successful_results)
+
+    report(
+        {
+            "benchmark": "inference_load_test",
+            "url": url,
+            "num_requests": num_requests,
+            "num_failed_requests": num_requests - len(successful_results),
+            "concurrency": concurrency,
+            "requests_per_second": round(len(successful_results) / wall_seconds, 2),
+            # streamed chunks approximate tokens, the service sends them as they are generated.
+            "streamed_chunks_per_second": round(num_chunks / wall_seconds, 2),
+            "time_to_first_token_ms": latency_stats([result["time_to_first_token"] for result in successful_results]),
+            "latency_ms": latency_stats([result["end"] - result["start"] for result in successful_results]),
+        },
+        output,
+    )
+
+
+async def run_load_test(url: str, num_requests: int, concurrency: int, query: str, timeout: float) -> list[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, timeout=timeout, limits=limits) as client:
+
+        async def run_request() -> dict:
+            async with semaphore:
+                return await stream_request(client, query)
+
+        return await asyncio.gather(*[run_request() for _ in range(num_requests)])
+
+
+async def stream_request(client: httpx.AsyncClient, query: str) -> dict:
+    result = {"start": time.perf_counter(), "time_to_first_token": None, "num_chunks": 0, "error": None}
+    try:
+        async with client.stream("POST", "/rag/stream", json={"query": query}) as response:
+            response.raise_for_status()
+            async for chunk in response.aiter_text():
+                if not chunk:
+                    continue
+                if result["time_to_first_token"] is None:
+                    result["time_to_first_token"] = time.perf_counter() - result["start"]
+                result["num_chunks"] += 1
+    except httpx.HTTPError as e:
+        result["error"] = repr(e)
+
+    result["end"] = time.perf_counter()
+    if result["error"] is None and result["time_to_first_token"] is None:
+        result["error"] = "Empty answer."
+
+    return result
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import asyncio
+import json
+import random
+
+import click
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from llm_engineering.domain.inference import GenerationParameters
+from llm_engineering.model.inference import LLMInferenceLocalStub
+
+
+class CompletionRequest(BaseModel):
+    model: str | None = None
+    prompt: str | list[str]
+    max_tokens: int = 16
+    temperature: float = 1.0
+    top_p: float = 1.0
+    stream: bool = False
+
+
+def create_app(
+    llm: LLMInferenceLocalStub,
+    slow_fraction: float = 0.0,
+    slow_seconds: float = 0.0,
+    failure_rate: float = 0.0,
+    seed: int | None = None,
+) -> FastAPI:
+    """
+    An OpenAI compatible completions server generating with the stub LLM, to test the inference clients
+    without a GPU. A `slow_fraction` of the requests wait `slow_seconds` before their first token (the latency
+    tail) and a `failure_rate` of them fail with a 503.
+    """
+
+    app = FastAPI()
+    rng = random.Random(seed)
+
+    @app.post("/v1/completions")
+    async def completions(request: CompletionRequest):
+        if rng.random() < failure_rate:
+            raise HTTPException(status_code=503, detail="Injected failure.")
+
+        delay = slow_seconds if rng.random() < slow_fraction else 0.0
+        prompts = [request.prompt] if isinstance(request.prompt, str) else request.prompt
+        parameters = GenerationParameters(
+            max_new_tokens=request.max_tokens, temperature=request.temperature, top_p=request.top_p
+        )
+
+        async def events():
+            await asyncio.sleep(delay)
+            async for index, token in llm.stream_batch(prompts, parameters):
+                yield f"data: {json.dumps({'choices': [{'index': index, 'text': token, 'finish_reason': None}]})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        if request.stream:
+            return StreamingResponse(events(), media_type="text/event-stream")
+
+        await asyncio.sleep(delay)
+        texts = ["" for _ in prompts]
+        async for index, token in llm.stream_batch(prompts, parameters):
+            texts[index] += token
+
+        choices = [{"index": index, "text": text, "finish_reason": "length"} for index, text in enumerate(texts)]
+
+        return {"choices": choices}
+
+    return app
+
+
+@click.command(
+    help="""
+Serve the stub LLM behind an OpenAI compatible completions API, with an optional latency tail and failures.
+
+Point the inference service at it with LLM_INFERENCE_BACKEND=openai_compatible and
+LLM_INFERENCE_ENDPOINT_URL=http://<host>:<port> to exercise the retries, hedging and circuit breaker.
+"""
+)
+@click.option("--host", default="127.0.0.1")
+@click.option("--port", default=8080, type=int)
+@click.option("--prefill-seconds", default=0.05, type=float, help="Time to the first token of a batch.")
+@click.option("--step-seconds", default=0.02, type=float, help="Time between two tokens of a batch.")
+@click.option("--slow-fraction", default=0.0, type=float, help="Fraction of the requests in the latency tail.")
+@click.option("--slow-seconds", default=2.0, type=float, help="Extra time to the first token of the slow requests.")
+@click.option("--failure-rate", default=0.0, type=float, help="Fraction of the requests failing with a 503.")
+@click.option("--seed", default=None, type=int)
+def main(
+    host: str,
+    port: int,
+    prefill_seconds: float,
+    step_seconds: float,
+    slow_fraction: float,
+    slow_seconds: float,
+    failure_rate: float,
+    seed: int | None,
+) -> None:
+    llm = LLMInferenceLocalStub(prefill_seconds=prefill_seconds, step_seconds=step_seconds)
+    app = create_app(llm, slow_fraction=slow_fraction, slow_seconds=slow_seconds, failure_rate=failure_rate, seed=seed)
+
+    uvicorn.run(app, host=host, port=port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+from llm_engineering.infrastructure.inference_pipeline_api import app  # noqa
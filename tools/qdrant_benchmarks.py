@@ -0,0 +1,527 @@
+import json
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Generator
+
+import click
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.http.models import (
+    Batch,
+    CollectionStatus,
+    Distance,
+    HnswConfigDiff,
+    OptimizersConfigDiff,
+    PointStruct,
+    QuantizationSearchParams,
+    SearchParams,
+    VectorParams,
+)
+
+from llm_engineering.application import utils
+from llm_engineering.application.rag.exact_search import ExactSearchEngine
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.base.vector import DENSE_VECTOR_NAME, build_quantization_config
+from llm_engineering.domain.embedded_chunks import EMBEDDED_CHUNK_PAYLOAD_INDEXES
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.infrastructure.db.qdrant import get_client_kwargs, get_uri
+
+
+@click.group(
+    help="""
+LLM Engineering project Qdrant benchmarks.
+
+Every benchmark runs against the Qdrant instance configured in the settings,
+on its own temporary collection filled with synthetic vectors, which is deleted afterwards.
+Results are printed as JSON and optionally written to a file for regression tracking.
+"""
+)
+def cli() -> None:
+    pass
+
+
+@cli.command(help="Compare upsert and search throughput between the HTTP and gRPC transports.")
+@click.option("--num-points", default=20_000, type=int, help="Number of points to upsert.")
+@click.option("--dim", default=384, type=int, help="Vector size (384 matches all-MiniLM-L6-v2).")
+@click.option("--batch-size", default=256, type=int, help="Points per upsert request.")
+@click.option("--num-queries", default=500, type=int, help="Number of search requests.")
+@click.option("--limit", default=10, type=int, help="Number of results per search.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def transport(num_points: int, dim: int, batch_size: int, num_queries: int, limit: int, output: Path | None) -> None:
+    vectors = random_vectors(num_points, dim, seed=0)
+    queries = random_vectors(num_queries, dim, seed=1)
+    points = [
+        PointStruct(id=str(uuid.uuid4()), vector=vector.tolist(), payload=synthetic_payload(i))
+        for i, vector in enumerate(vectors)
+    ]
+
+    results = {}
+    for name, prefer_grpc in (("http", False), ("grpc", True)):
+        client_kwargs = get_client_kwargs(prefer_grpc=prefer_grpc)
+        client = QdrantClient(**client_kwargs)
+        click.echo(f"Benchmarking {get_uri(client_kwargs)}")
+
+        with temporary_collection(client, f"benchmark_transport_{name}", dim) as collection_name:
+            start_time = time.perf_counter()
+            for points_batch in utils.misc.batch(points, size=batch_size):
+                client.upsert(collection_name=collection_name, points=points_batch, wait=True)
+            upsert_seconds = time.perf_counter() - start_time
+
+            latencies = []
+            for query in queries:
+                start_time = time.perf_counter()
+                client.search(collection_name=collection_name, query_vector=query.tolist(), limit=limit)
+                latencies.append(time.perf_counter() - start_time)
+
+        results[name] = {
+            "upsert_points_per_second": round(num_points / upsert_seconds, 2),
+            "search_queries_per_second": round(len(latencies) / sum(latencies), 2),
+            "search_latency_ms": latency_stats(latencies),
+        }
+        client.close()
+
+    report({"benchmark": "transport", "num_points": num_points, "dim": dim, "results": results}, output)
+
+
+@cli.command(
+    "filtered-search",
+    help="Compare the latency of author-scoped searches on collections with and without payload indexes.",
+)
+@click.option("--num-points", default=50_000, type=int, help="Number of points to upsert.")
+@click.option("--num-authors", default=50, type=int, help="Number of distinct authors the points are spread over.")
+@click.option("--dim", default=384, type=int, help="Vector size (384 matches all-MiniLM-L6-v2).")
+@click.option("--num-queries", default=500, type=int, help="Number of filtered search requests.")
+@click.option("--limit", default=10, type=int, help="Number of results per search.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def filtered_search(
+    num_points: int, num_authors: int, dim: int, num_queries: int, limit: int, output: Path | None
+) -> None:
+    vectors = random_vectors(num_points, dim, seed=0)
+    queries = random_vectors(num_queries, dim, seed=1)
+    author_ids = [str(uuid.uuid4()) for _ in range(num_authors)]
+    points = [
+        PointStruct(
+            id=str(uuid.uuid4()),
+            vector=vector.tolist(),
+            payload={**synthetic_payload(i), "author_id": author_ids[i % num_authors]},
+        )
+        for i, vector in enumerate(vectors)
+    ]
+    query_filters = [DocumentFilter.by_author(author_ids[i % num_authors]).to_qdrant() for i in range(num_queries)]
+
+    client = QdrantClient(**get_client_kwargs())
+    results = {}
+    for name, payload_indexes in (("without_indexes", {}), ("with_indexes", EMBEDDED_CHUNK_PAYLOAD_INDEXES)):
+        with temporary_collection(client, f"benchmark_filtered_search_{name}", dim) as collection_name:
+            for field_name, field_schema in payload_indexes.items():
+                client.create_payload_index(collection_name, field_name=field_name, field_schema=field_schema)
+            for points_batch in utils.misc.batch(points, size=256):
+                client.upsert(collection_name=collection_name, points=points_batch, wait=True)
+
+            latencies = []
+            for query, query_filter in zip(queries, query_filters, strict=True):
+                start_time = time.perf_counter()
+                client.search(
+                    collection_name=collection_name, query_vector=query.tolist(), query_filter=query_filter, limit=limit
+                )
+                latencies.append(time.perf_counter() - start_time)
+
+        results[name] = {
+            "search_queries_per_second": round(len(latencies) / sum(latencies), 2),
+            "search_latency_ms": latency_stats(latencies),
+        }
+
+    report(
+        {
+            "benchmark": "filtered_search",
+            "num_points": num_points,
+            "num_authors": num_authors,
+            "dim": dim,
+            "results": results,
+        },
+        output,
+    )
+
+
+@cli.command(help="Measure the recall and latency of quantized collections against exact float32 search.")
+@click.option("--num-points", default=50_000, type=int, help="Number of points to upsert.")
+@click.option("--dim", default=384, type=int, help="Vector size (384 matches all-MiniLM-L6-v2).")
+@click.option("--num-queries", default=200, type=int, help="Number of search requests.")
+@click.option("--limit", default=10, type=int, help="Number of results per search (the k of recall@k).")
+@click.option(
+    "--oversampling",
+    "oversamplings",
+    default=[1.0, 2.0, 4.0],
+    multiple=True,
+    type=float,
+    help="Oversampling factors to measure, can be repeated.",
+)
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def quantization(
+    num_points: int, dim: int, num_queries: int, limit: int, oversamplings: list[float], output: Path | None
+) -> None:
+    vectors = random_vectors(num_points, dim, seed=0)
+    queries = random_vectors(num_queries, dim, seed=1)
+    points = [PointStruct(id=str(uuid.uuid4()), vector=vector.tolist()) for vector in vectors]
+
+    client = QdrantClient(**get_client_kwargs())
+    results = {}
+    for name in ("none", "scalar", "product", "binary"):
+        # the collections are configured exactly like a document class whose Config sets `quantization = name`.
+        quantization_config = build_quantization_config(name) if name != "none" else None
+
+        with temporary_collection(
+            client, f"benchmark_quantization_{name}", dim, quantization_config=quantization_config
+        ) as collection_name:
+            for points_batch in utils.misc.batch(points, size=256):
+                client.upsert(collection_name=collection_name, points=points_batch, wait=True)
+            # the HNSW graph and the quantized vectors are built by the optimizers after the upserts.
+            wait_for_indexing(client, collection_name)
+
+            # exact search on the original vectors is the ground truth.
+            exact_ids = [
+                search_ids(client, collection_name, query, limit, SearchParams(exact=True)) for query in queries
+            ]
+
+            configurations = {"default": None}
+            if quantization_config is not None:
+                configurations["no_rescore"] = QuantizationSearchParams(rescore=False)
+                for oversampling in oversamplings:
+                    configurations[f"rescore_oversampling_{oversampling}"] = QuantizationSearchParams(
+                        rescore=True, oversampling=oversampling
+                    )
+
+            results[name] = {"estimated_bytes_per_vector": estimated_bytes_per_vector(name, dim)}
+            for configuration_name, quantization_search_params in configurations.items():
+                search_params = SearchParams(quantization=quantization_search_params)
+                latencies, recalls = [], []
+                for query, query_exact_ids in zip(queries, exact_ids, strict=True):
+                    start_time = time.perf_counter()
+                    ids = search_ids(client, collection_name, query, limit, search_params)
+                    latencies.append(time.perf_counter() - start_time)
+                    recalls.append(len(set(ids) & set(query_exact_ids)) / max(len(query_exact_ids), 1))
+
+                results[name][configuration_name] = {
+                    f"recall@{limit}": round(float(np.mean(recalls)), 4),
+                    "search_latency_ms": latency_stats(latencies),
+                }
+
+    report({"benchmark": "quantization", "num_points": num_points, "dim": dim, "results": results}, output)
+
+
+@cli.command(
+    "hnsw-sweep",
+    help="""
+Sweep the HNSW build (m, ef_construct) and search (hnsw_ef) parameters and report recall@k versus latency.
+
+The vectors are sampled from an existing collection with --collection (the queries are held-out points of the
+same collection), or generated synthetically otherwise. The best settings found map to the `hnsw_m`,
+`hnsw_ef_construct` and `hnsw_ef` options of the document class Config.
+""",
+)
+@click.option("--collection", default=None, help="Collection to sample the vectors from, e.g. 'embedded_articles'.")
+@click.option("--num-points", default=20_000, type=int, help="Number of points indexed in the sample collection.")
+@click.option("--dim", default=384, type=int, help="Vector size of the synthetic vectors.")
+@click.option("--num-queries", default=200, type=int, help="Number of search requests per configuration.")
+@click.option("--limit", default=10, type=int, help="Number of results per search (the k of recall@k).")
+@click.option("--m", "ms", default=[8, 16, 32], multiple=True, type=int, help="HNSW m values, can be repeated.")
+@click.option(
+    "--ef-construct", "ef_constructs", default=[64, 128], multiple=True, type=int, help="HNSW ef_construct values."
+)
+@click.option(
+    "--hnsw-ef", "hnsw_efs", default=[16, 32, 64, 128], multiple=True, type=int, help="Search hnsw_ef values."
+)
+@click.option(
+    "--full-scan-threshold",
+    default=10,
+    type=int,
+    help="Kept low (in KB) so the HNSW graph is searched even on small samples.",
+)
+@click.option("--target-recall", default=0.95, type=float, help="Recall the recommended configuration must reach.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def hnsw_sweep(
+    collection: str | None,
+    num_points: int,
+    dim: int,
+    num_queries: int,
+    limit: int,
+    ms: list[int],
+    ef_constructs: list[int],
+    hnsw_efs: list[int],
+    full_scan_threshold: int,
+    target_recall: float,
+    output: Path | None,
+) -> None:
+    if collection is not None:
+        vectors = sample_collection_vectors(collection, num_points + num_queries)
+        vectors, queries = vectors[num_queries:], vectors[:num_queries]
+    else:
+        vectors = random_vectors(num_points, dim, seed=0)
+        queries = random_vectors(num_queries, dim, seed=1)
+    exact_ids = exact_top_k(vectors, queries, limit)
+
+    client = QdrantClient(**get_client_kwargs())
+    results = []
+    for m in ms:
+        for ef_construct in ef_constructs:
+            hnsw_config = HnswConfigDiff(m=m, ef_construct=ef_construct, full_scan_threshold=full_scan_threshold)
+            with temporary_collection(
+                client,
+                f"benchmark_hnsw_m{m}_ef{ef_construct}",
+                vectors.shape[1],
+                hnsw_config=hnsw_config,
+                optimizers_config=OptimizersConfigDiff(indexing_threshold=full_scan_threshold),
+            ) as collection_name:
+                start_time = time.perf_counter()
+                # integer ids are the row indexes, which makes comparing with the exact results trivial.
+                for start in range(0, len(vectors), 256):
+                    client.upsert(
+                        collection_name=collection_name,
+                        points=Batch(
+                            ids=list(range(start, min(start + 256, len(vectors)))),
+                            vectors=vectors[start : start + 256].tolist(),
+                        ),
+                        wait=True,
+                    )
+                wait_for_indexing(client, collection_name)
+                build_seconds = time.perf_counter() - start_time
+
+                for hnsw_ef in hnsw_efs:
+                    latencies, recalls = [], []
+                    for query, query_exact_ids in zip(queries, exact_ids, strict=True):
+                        start_time = time.perf_counter()
+                        ids = search_ids(client, collection_name, query, limit, SearchParams(hnsw_ef=hnsw_ef))
+                        latencies.append(time.perf_counter() - start_time)
+                        recalls.append(len(set(ids) & set(query_exact_ids)) / max(len(query_exact_ids), 1))
+
+                    results.append(
+                        {
+                            "hnsw_m": m,
+                            "hnsw_ef_construct": ef_construct,
+                            "hnsw_ef": hnsw_ef,
+                            "build_seconds": round(build_seconds, 2),
+                            f"recall@{limit}": round(float(np.mean(recalls)), 4),
+                            "search_latency_ms": latency_stats(latencies),
+                        }
+                    )
+
+    # the fastest configuration (by p95 latency) that reaches the target recall.
+    candidates = [result for result in results if result[f"recall@{limit}"] >= target_recall]
+    recommended = min(candidates, key=lambda result: result["search_latency_ms"]["p95"]) if candidates else None
+
+    report(
+        {
+            "benchmark": "hnsw_sweep",
+            "collection": collection,
+            "num_points": len(vectors),
+            "dim": int(vectors.shape[1]),
+            "target_recall": target_recall,
+            "recommended": recommended,
+            "results": results,
+        },
+        output,
+    )
+
+
+@cli.command(help="Measure the recall@k of `VectorBaseDocument.search` on a collection against exact numpy search.")
+@click.option("--collection", required=True, help="Collection to evaluate, e.g. 'embedded_articles'.")
+@click.option("--num-queries", default=100, type=int, help="Number of search requests.")
+@click.option("--limit", default=10, type=int, help="Number of results per search (the k of recall@k).")
+@click.option("--noise", default=0.05, type=float, help="Std of the noise added to the sampled points to make queries.")
+@click.option("--hnsw-ef", default=None, type=int, help="Search-time hnsw_ef, defaults to the collection config.")
+@click.option("--oversampling", default=None, type=float, help="Search-time oversampling of quantized collections.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def recall(
+    collection: str,
+    num_queries: int,
+    limit: int,
+    noise: float,
+    hnsw_ef: int | None,
+    oversampling: float | None,
+    output: Path | None,
+) -> None:
+    document_class = VectorBaseDocument.collection_name_to_class(collection)
+    engine = ExactSearchEngine(document_class).load()
+    if len(engine) == 0:
+        raise click.ClickException(f"Collection '{collection}' has no vectors to evaluate.")
+
+    # the queries are noisy copies of stored points, so they look like real queries on the collection's topics.
+    rng = np.random.default_rng(0)
+    rows = rng.choice(len(engine), size=num_queries, replace=num_queries > len(engine))
+    queries = engine.vectors[rows] + rng.normal(scale=noise, size=(num_queries, engine.vectors.shape[1]))
+
+    search_kwargs = {}
+    if hnsw_ef is not None:
+        search_kwargs["hnsw_ef"] = hnsw_ef
+    if oversampling is not None:
+        search_kwargs["oversampling"] = oversampling
+
+    search_latencies, exact_latencies, recalls = [], [], []
+    for query in queries:
+        start_time = time.perf_counter()
+        exact_documents = engine.search(query.tolist(), limit=limit)
+        exact_latencies.append(time.perf_counter() - start_time)
+
+        start_time = time.perf_counter()
+        documents = document_class.search(query.tolist(), limit=limit, **search_kwargs)
+        search_latencies.append(time.perf_counter() - start_time)
+
+        exact_ids = {document.id for document in exact_documents}
+        recalls.append(len(exact_ids & {document.id for document in documents}) / max(len(exact_ids), 1))
+
+    report(
+        {
+            "benchmark": "recall",
+            "collection": collection,
+            "num_points": len(engine),
+            "search_kwargs": search_kwargs,
+            f"recall@{limit}": round(float(np.mean(recalls)), 4),
+            f"min_recall@{limit}": round(float(np.min(recalls)), 4),
+            "search_latency_ms": latency_stats(search_latencies),
+            "exact_search_latency_ms": latency_stats(exact_latencies),
+        },
+        output,
+    )
+
+
+def sample_collection_vectors(collection_name: str, num: int) -> np.ndarray:
+    """
+    Reads the first `num` vectors of an existing collection as a float32 matrix.
+    """
+
+    document_class = VectorBaseDocument.collection_name_to_class(collection_name)
+    vectors = []
+    for record in document_class.iter_all(batch_size=1000, with_vectors=True, raw=True):
+        vectors.append(record.vector.get(DENSE_VECTOR_NAME) if isinstance(record.vector, dict) else record.vector)
+        if len(vectors) >= num:
+            break
+
+    if len(vectors) == 0:
+        raise click.ClickException(f"Collection '{collection_name}' has no vectors to sample.")
+
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> list[list[int]]:
+    """
+    Brute-force cosine top-k row indexes of every query, the ground truth of the recall measures.
+    """
+
+    vectors = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    scores = queries @ vectors.T
+
+    k = min(k, vectors.shape[0])
+    top_k = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+    return [row.tolist() for row in top_k]
+
+
+def search_ids(
+    client: QdrantClient, collection_name: str, query: np.ndarray, limit: int, search_params: SearchParams
+) -> list:
+    records = client.search(
+        collection_name=collection_name, query_vector=query.tolist(), limit=limit, search_params=search_params
+    )
+
+    return [record.id for record in records]
+
+
+def wait_for_indexing(client: QdrantClient, collection_name: str, timeout_seconds: float = 600.0) -> None:
+    """
+    Blocks until the optimizers are done with the collection, so latencies are measured on the final index.
+    """
+
+    deadline = time.monotonic() + timeout_seconds
+    while client.get_collection(collection_name).status != CollectionStatus.GREEN:
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Collection '{collection_name}' was not indexed after {timeout_seconds}s.")
+        time.sleep(0.5)
+
+
+def estimated_bytes_per_vector(quantization: str, dim: int) -> int:
+    """
+    RAM needed per vector by the quantized copies (the float32 originals for "none").
+    """
+
+    return {
+        "none": dim * 4,
+        "scalar": dim,  # int8
+        "product": dim * 4 // 16,  # default x16 compression
+        "binary": dim // 8,  # one bit per dimension
+    }[quantization]
+
+
+def random_vectors(num: int, dim: int, seed: int) -> np.ndarray:
+    """
+    Returns `num` random unit vectors as a contiguous float32 matrix.
+    """
+
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((num, dim), dtype=np.float32)
+
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def synthetic_payload(index: int) -> dict:
+    """
+    A payload shaped like the one of an embedded chunk, so serialization costs are realistic.
+    """
+
+    return {
+        "content": f"synthetic chunk {index} " * 40,
+        "platform": "linkedin",
+        "document_id": str(uuid.uuid4()),
+        "author_id": str(uuid.uuid4()),
+        "author_full_name": "Benchmark Author",
+    }
+
+
+def latency_stats(latencies: list[float]) -> dict:
+    """
+    Summarizes latencies given in seconds as milliseconds percentiles.
+    """
+
+    latencies_ms = np.asarray(latencies) * 1000
+
+    return {
+        "mean": round(float(latencies_ms.mean()), 3),
+        "p50": round(float(np.percentile(latencies_ms, 50)), 3),
+        "p95": round(float(np.percentile(latencies_ms, 95)), 3),
+        "p99": round(float(np.percentile(latencies_ms, 99)), 3),
+    }
+
+
+@contextmanager
+def temporary_collection(client: QdrantClient, collection_name: str, dim: int, **kwargs) -> Generator[str, None, None]:
+    """
+    Creates a fresh cosine collection and deletes it once the benchmark is done.
+    Extra keyword arguments are forwarded to `create_collection` (HNSW, quantization, ... configs).
+    """
+
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=VectorParams(size=dim, distance=Distance.COSINE),
+        **kwargs,
+    )
+
+    try:
+        yield collection_name
+    finally:
+        client.delete_collection(collection_name)
+
+
+def report(results: dict, output: Path | None) -> None:
+    serialized_results = json.dumps(results, indent=2)
+    click.echo(serialized_results)
+
+    if output is not None:
+        output.write_text(serialized_results)
+
+
+if __name__ == "__main__":
+    cli()
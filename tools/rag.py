@@ -0,0 +1,29 @@
+from loguru import logger
+
+from llm_engineering.application.preprocessing.embedding_data_handlers import query_embedding_cache
+from llm_engineering.application.rag.retriever import ContextRetriever
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+
+if __name__ == "__main__":
+    query = """
+        My name is Steven Evans.
+
+        Could you draft a LinkedIn post discussing RAG systems?
+        I'm particularly interested in:
+            - how RAG works
+            - how it is integrated with vector DBs and large language models (LLMs).
+        """
+
+    retriever = ContextRetriever(mock=False)
+    result = retriever.retrieve(query, k=9)
+
+    logger.info("Retrieved documents:")
+    for rank, document in enumerate(result.chunks):
+        logger.info(f"{rank + 1}: {document}")
+
+    logger.info(f"Stage timings (seconds): {result.stage_seconds}")
+    logger.info(f"Query embedding cache: {query_embedding_cache.stats()}")
+    if result.skipped_stages:
+        logger.warning(f"Skipped stages: {result.skipped_stages}")
+
+    logger.info(f"Context:\n{EmbeddedChunk.to_context(result.chunks)}")
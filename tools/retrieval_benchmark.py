@@ -0,0 +1,337 @@
+import random
+import time
+import uuid
+from pathlib import Path
+
+import click
+import numpy as np
+
+from llm_engineering.application import utils
+from llm_engineering.application.loading import BulkVectorLoader
+from llm_engineering.application.preprocessing.dispatchers import (
+    ChunkingDispatcher,
+    CleaningDispatcher,
+    EmbeddingDispatcher,
+)
+from llm_engineering.application.preprocessing.embedding_data_handlers import (
+    QueryEmbeddingHandler,
+    query_embedding_cache,
+)
+from llm_engineering.application.rag.context import ContextBuilder
+from llm_engineering.application.rag.exact_search import ExactSearchEngine
+from llm_engineering.application.rag.mmr import diversify_chunks
+from llm_engineering.application.rag.reranking import Reranker
+from llm_engineering.application.rag.search import EMBEDDED_CHUNK_CLASSES, search_collections_with_scores
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.domain.documents import ArticleDocument, Document, PostDocument, RepositoryDocument
+from llm_engineering.domain.embedded_chunks import EmbeddedChunk
+from llm_engineering.domain.filters import DocumentFilter
+from llm_engineering.domain.queries import Query
+from llm_engineering.infrastructure.db.qdrant import connection
+from llm_engineering.settings import settings
+from tools.qdrant_benchmarks import latency_stats, report
+
+# Vocabulary of the synthetic documents: each document is about one topic, so its chunks have
+# close embeddings and a query built from a chunk has a few truly relevant neighbours.
+TOPICS = {
+    "rag": ["retrieval", "augmented", "generation", "context", "prompt", "chunks", "grounding", "citations"],
+    "vector_db": ["qdrant", "vectors", "index", "hnsw", "payload", "collection", "similarity", "quantization"],
+    "fine_tuning": ["lora", "adapters", "epochs", "learning", "rate", "instruction", "dataset", "loss"],
+    "inference": ["latency", "throughput", "batching", "tokens", "streaming", "gpu", "serving", "sagemaker"],
+    "mlops": ["pipelines", "zenml", "artifacts", "orchestration", "deployment", "monitoring", "registry", "ci"],
+    "data": ["crawling", "cleaning", "mongodb", "warehouse", "etl", "ingestion", "schema", "deduplication"],
+    "evaluation": ["metrics", "benchmark", "judge", "accuracy", "recall", "precision", "ragas", "feedback"],
+    "agents": ["tools", "planning", "memory", "reasoning", "actions", "langchain", "orchestrator", "calls"],
+}
+FILLER_WORDS = ["the", "a", "with", "for", "and", "when", "our", "this", "we", "use", "how", "to", "on", "in"]
+
+BENCHMARK_STAGES = ("embed", "search", "mmr", "rerank", "context_build", "total")
+
+
+@click.command(
+    help="""
+Benchmark the retrieval path end to end on a synthetic corpus.
+
+A multi-author corpus of posts, articles and repositories is generated, cleaned, chunked and embedded
+with the feature pipeline handlers, and loaded into a local (in-process) Qdrant. A query set built from
+the chunks is then replayed through embedding, author-scoped search, MMR (when RAG_MMR_TOP_K is set),
+reranking and context building.
+
+The report holds the recall@k of the search against exact numpy search and the p50/p95/p99 latency of
+every stage, as JSON for regression tracking. The retrieval settings (exact search, MMR, quantization, ...)
+are read from the environment, so the same command measures a tuning change before and after.
+"""
+)
+@click.option("--num-authors", default=5, type=int, help="Number of synthetic authors.")
+@click.option("--documents-per-author", default=20, type=int, help="Documents per author and per category.")
+@click.option("--num-queries", default=200, type=int, help="Number of queries replayed.")
+@click.option("--warmup-queries", default=5, type=int, help="Queries run first and left out of the stats.")
+@click.option("--limit", default=10, type=int, help="Number of chunks retrieved (the k of recall@k).")
+@click.option("--rerank/--no-rerank", default=True, help="Score the candidates with the cross-encoder.")
+@click.option("--overwrite", is_flag=True, default=False, help="Drop existing chunk collections of a persisted Qdrant.")
+@click.option("--seed", default=0, type=int, help="Seed of the synthetic corpus and queries.")
+@click.option("--output", type=click.Path(path_type=Path), default=None, help="Optional JSON output file.")
+def main(
+    num_authors: int,
+    documents_per_author: int,
+    num_queries: int,
+    warmup_queries: int,
+    limit: int,
+    rerank: bool,
+    overwrite: bool,
+    seed: int,
+    output: Path | None,
+) -> None:
+    if not settings.USE_QDRANT_LOCAL:
+        # the benchmark writes into the embedded chunk collections, it must never touch a shared server.
+        raise click.ClickException("The retrieval benchmark only runs against a local Qdrant (USE_QDRANT_LOCAL=true).")
+    reset_collections(overwrite=overwrite)
+
+    rng = random.Random(seed)
+    documents = generate_corpus(num_authors=num_authors, documents_per_author=documents_per_author, rng=rng)
+    chunks, ingestion_seconds = ingest(documents)
+    # the small collections may be searched in process (EXACT_SEARCH_MAX_POINTS), reload them with the corpus.
+    ExactSearchEngine.invalidate()
+
+    queries = generate_queries(chunks, num_queries=num_queries + warmup_queries, rng=rng)
+    exact_engines = {
+        document_class: ExactSearchEngine(document_class).load() for document_class in EMBEDDED_CHUNK_CLASSES
+    }
+
+    embedding_handler = QueryEmbeddingHandler()
+    reranker = Reranker(mock=not rerank)
+    context_builder = ContextBuilder()
+    mmr_top_k = settings.RAG_MMR_TOP_K if settings.RAG_MMR_TOP_K > 0 else None
+
+    stage_latencies: dict[str, list[float]] = {stage: [] for stage in BENCHMARK_STAGES}
+    recalls = []
+    for i, query in enumerate(queries):
+        timings = {}
+
+        start_time = time.perf_counter()
+        embedded_query = embedding_handler.embed_batch([query])[0]
+        timings["embed"] = time.perf_counter() - start_time
+
+        stage_start = time.perf_counter()
+        query_filter = DocumentFilter.by_author(query.author_id)
+        candidates = search_collections_with_scores(
+            query_vectors=[embedded_query.embedding],
+            limit=limit,
+            filters=query_filter,
+            with_vectors=mmr_top_k is not None,
+            query_texts=[query.content] if settings.RAG_HYBRID_SEARCH else None,
+        )
+        retrieved_chunks = [chunk for chunk, _ in candidates]
+        timings["search"] = time.perf_counter() - stage_start
+
+        if mmr_top_k is not None:
+            stage_start = time.perf_counter()
+            retrieved_chunks = diversify_chunks(
+                query_vectors=[embedded_query.embedding], chunks=retrieved_chunks, k=max(mmr_top_k, limit)
+            )
+            timings["mmr"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        top_chunks = reranker.generate(query=query, chunks=retrieved_chunks, keep_top_k=limit)
+        timings["rerank"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        context_builder.build(top_chunks)
+        timings["context_build"] = time.perf_counter() - stage_start
+        timings["total"] = time.perf_counter() - start_time
+
+        if i < warmup_queries:
+            continue
+
+        for stage, seconds in timings.items():
+            stage_latencies[stage].append(seconds)
+
+        # the recall of the search itself: its top-k against the exact top-k over the same collections.
+        exact_ids = exact_top_k_ids(exact_engines, embedded_query.embedding, limit=limit, query_filter=query_filter)
+        search_ids = {str(chunk.id) for chunk, _ in candidates[:limit]}
+        recalls.append(len(exact_ids & search_ids) / max(len(exact_ids), 1))
+
+    report(
+        {
+            "benchmark": "retrieval",
+            "num_authors": num_authors,
+            "num_documents": len(documents),
+            "num_chunks": {
+                document_class.get_collection_name(): len(engine) for document_class, engine in exact_engines.items()
+            },
+            "num_queries": len(recalls),
+            "limit": limit,
+            "settings": {
+                "exact_search_max_points": settings.EXACT_SEARCH_MAX_POINTS,
+                "rag_mmr_top_k": settings.RAG_MMR_TOP_K,
+                "rag_hybrid_search": settings.RAG_HYBRID_SEARCH,
+                "rag_context_max_tokens": settings.RAG_CONTEXT_MAX_TOKENS,
+                "qdrant_lean_payloads": settings.QDRANT_LEAN_PAYLOADS,
+                "rerank": rerank,
+            },
+            "ingestion_seconds": {stage: round(seconds, 3) for stage, seconds in ingestion_seconds.items()},
+            f"recall@{limit}": round(float(np.mean(recalls)), 4) if recalls else None,
+            f"min_recall@{limit}": round(float(np.min(recalls)), 4) if recalls else None,
+            "latency_ms": {
+                stage: latency_stats(latencies) for stage, latencies in stage_latencies.items() if len(latencies) > 0
+            },
+            "query_embedding_cache": query_embedding_cache.stats(),
+        },
+        output,
+    )
+
+
+def reset_collections(overwrite: bool) -> None:
+    """
+    Starts from empty chunk collections, so the corpus of a previous run doesn't skew the results.
+    """
+
+    existing_classes = [
+        document_class for document_class in EMBEDDED_CHUNK_CLASSES if document_class.collection_exists()
+    ]
+    if len(existing_classes) == 0:
+        return
+    if settings.QDRANT_LOCAL_PATH != ":memory:" and not overwrite:
+        raise click.ClickException(
+            f"The local Qdrant at '{settings.QDRANT_LOCAL_PATH}' already holds chunk collections, "
+            "use --overwrite to drop them or an in-memory Qdrant (QDRANT_LOCAL_PATH=:memory:)."
+        )
+
+    for document_class in existing_classes:
+        connection.delete_collection(collection_name=document_class.get_collection_name())
+        document_class.invalidate_collection_cache()
+
+
+def generate_corpus(num_authors: int, documents_per_author: int, rng: random.Random) -> list[Document]:
+    """
+    Generates raw documents shaped like the crawled ones: short posts, long articles and code repositories.
+    """
+
+    documents: list[Document] = []
+    for author_number in range(num_authors):
+        author = {"author_id": uuid.uuid4(), "author_full_name": f"Benchmark Author{author_number}"}
+        for document_number in range(documents_per_author):
+            documents.append(
+                PostDocument(
+                    content={"Post_text": synthetic_text(rng, num_sentences=rng.randint(3, 8))},
+                    platform="linkedin",
+                    link=f"https://www.linkedin.com/posts/benchmark-{author_number}-{document_number}",
+                    **author,
+                )
+            )
+            documents.append(
+                ArticleDocument(
+                    content={
+                        "Title": synthetic_text(rng, num_sentences=1),
+                        "Content": synthetic_text(rng, num_sentences=rng.randint(40, 80)),
+                    },
+                    platform="medium",
+                    link=f"https://medium.com/@benchmark-{author_number}/{document_number}",
+                    **author,
+                )
+            )
+            documents.append(
+                RepositoryDocument(
+                    content={
+                        "README.md": synthetic_text(rng, num_sentences=rng.randint(10, 20)),
+                        "main.py": synthetic_text(rng, num_sentences=rng.randint(10, 20)),
+                    },
+                    name=f"benchmark-repository-{document_number}",
+                    platform="github",
+                    link=f"https://github.com/benchmark-{author_number}/repository-{document_number}",
+                    **author,
+                )
+            )
+
+    return documents
+
+
+def synthetic_text(rng: random.Random, num_sentences: int) -> str:
+    topic_words = TOPICS[rng.choice(list(TOPICS))]
+    sentences = []
+    for _ in range(num_sentences):
+        words = [rng.choice(topic_words if rng.random() < 0.6 else FILLER_WORDS) for _ in range(rng.randint(8, 16))]
+        sentences.append(" ".join(words).capitalize() + ".")
+
+    return " ".join(sentences)
+
+
+def ingest(documents: list[Document]) -> tuple[list[EmbeddedChunk], dict[str, float]]:
+    """
+    Runs the documents through the feature pipeline handlers and loads the embedded chunks.
+
+    Returns:
+        tuple[list[EmbeddedChunk], dict[str, float]]: The embedded chunks and the seconds spent in each phase.
+    """
+
+    seconds = {}
+
+    start_time = time.perf_counter()
+    cleaned_documents = [CleaningDispatcher.dispatch(document) for document in documents]
+    seconds["clean"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    chunks = [chunk for document in cleaned_documents for chunk in ChunkingDispatcher.dispatch(document)]
+    seconds["chunk"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    embedded_chunks = []
+    for chunks_group in VectorBaseDocument.group_by_class(chunks).values():
+        for chunks_batch in utils.misc.batch(chunks_group, size=64):
+            embedded_chunks.extend(EmbeddingDispatcher.dispatch(chunks_batch))
+    seconds["embed"] = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    reports = BulkVectorLoader(wait=True, skip_unchanged=False).load(embedded_chunks)
+    seconds["load"] = time.perf_counter() - start_time
+
+    failed_reports = [report for report in reports.values() if not report.successful]
+    if len(failed_reports) > 0:
+        collection_names = [report.collection_name for report in failed_reports]
+        raise click.ClickException(f"Failed to load the corpus into {collection_names}.")
+
+    return embedded_chunks, seconds
+
+
+def generate_queries(chunks: list[EmbeddedChunk], num_queries: int, rng: random.Random) -> list[Query]:
+    """
+    Builds each query out of a window of words of a random chunk, scoped to the chunk's author
+    (which the self-query step extracts from the question in production).
+    """
+
+    queries = []
+    for chunk in rng.choices(chunks, k=num_queries):
+        words = chunk.content.split()
+        window_size = min(len(words), rng.randint(6, 12))
+        start = rng.randint(0, len(words) - window_size)
+
+        query = Query.from_str(" ".join(words[start : start + window_size]))
+        query.author_id = chunk.author_id
+        query.author_full_name = chunk.author_full_name
+        queries.append(query)
+
+    return queries
+
+
+def exact_top_k_ids(
+    engines: dict[type[VectorBaseDocument], ExactSearchEngine],
+    query_vector: list[float],
+    limit: int,
+    query_filter: DocumentFilter,
+) -> set[str]:
+    """
+    The ids of the true top-k chunks across every collection, the ground truth of the recall.
+    """
+
+    results = []
+    for engine in engines.values():
+        results.extend(
+            engine.search_batch_with_scores(query_vectors=[query_vector], limit=limit, filters=query_filter)[0]
+        )
+    results.sort(key=lambda result: result[1], reverse=True)
+
+    return {str(document.id) for document, _ in results[:limit]}
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+from pathlib import Path
+
+import click
+
+# imported for their side effect of registering the collections, see `VectorBaseDocument.collection_name_to_class`.
+import llm_engineering.domain.cleaned_documents
+import llm_engineering.domain.embedded_chunks  # noqa: F401
+from llm_engineering.application.loading import BulkVectorLoader, export_collection, import_collection
+from llm_engineering.application.loading.snapshots import MANIFEST_FILE
+from llm_engineering.domain.base import VectorBaseDocument
+from llm_engineering.settings import settings
+
+
+@click.group(
+    help="""
+LLM Engineering project vector snapshots.
+
+Exports Qdrant collections to local files (memory-mappable float32 vectors, gzipped JSONL payloads
+and a manifest with checksums) and imports them back, so a new retrieval node can be restored
+without re-running the feature engineering pipeline.
+"""
+)
+def cli() -> None:
+    pass
+
+
+@cli.command(help="Export collections to one snapshot directory per collection.")
+@click.option(
+    "--collection",
+    "collections",
+    multiple=True,
+    help="Collection to export, can be repeated. Defaults to every registered collection that exists.",
+)
+@click.option("--output-dir", type=click.Path(path_type=Path), default=Path("data/vector_snapshots"))
+@click.option("--batch-size", default=1000, type=int, help="Points fetched per scroll request.")
+def export(collections: tuple[str, ...], output_dir: Path, batch_size: int) -> None:
+    if collections:
+        document_classes = [VectorBaseDocument.collection_name_to_class(name) for name in collections]
+    else:
+        document_classes = [
+            document_class
+            for document_class in VectorBaseDocument.registered_collections().values()
+            if document_class.collection_exists()
+        ]
+
+    for document_class in document_classes:
+        collection_name = document_class.get_collection_name()
+        manifest = export_collection(document_class, output_dir / collection_name, batch_size=batch_size)
+        click.echo(f"Exported {manifest.num_points} points of '{collection_name}' to {output_dir / collection_name}")
+
+
+@cli.command(name="import", help="Import every snapshot directory found in the input directory.")
+@click.option("--input-dir", type=click.Path(path_type=Path, exists=True), default=Path("data/vector_snapshots"))
+@click.option("--recreate", is_flag=True, default=False, help="Drop the existing collections first.")
+@click.option("--batch-size", default=settings.QDRANT_UPLOAD_BATCH_SIZE, type=int, help="Points per upsert request.")
+@click.option("--parallelism", default=settings.QDRANT_UPLOAD_PARALLELISM, type=int, help="Concurrent upserts.")
+def import_(input_dir: Path, recreate: bool, batch_size: int, parallelism: int) -> None:
+    loader = BulkVectorLoader(batch_size=batch_size, parallelism=parallelism, skip_unchanged=False)
+
+    # a single snapshot directory can be passed directly.
+    snapshot_dirs = [input_dir] if (input_dir / MANIFEST_FILE).exists() else sorted(input_dir.glob("*/"))
+    for snapshot_dir in snapshot_dirs:
+        report = import_collection(snapshot_dir, loader=loader, recreate=recreate)
+        click.echo(
+            f"Imported {report.num_points} points into '{report.collection_name}' "
+            f"in {report.duration_seconds:.2f}s ({report.num_retries} retries)"
+        )
+
+
+if __name__ == "__main__":
+    cli()
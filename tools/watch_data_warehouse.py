@@ -0,0 +1,41 @@
+import click
+
+from llm_engineering.application.ingestion import ChangeStreamWatcher
+from llm_engineering.settings import settings
+
+
+@click.command(
+    help="""
+LLM Engineering project incremental ingestion.
+
+Watches the raw data warehouse collections in MongoDB through change streams
+and incrementally cleans, chunks, embeds and loads every new or updated document into Qdrant.
+MongoDB must run as a replica set for change streams to work.
+
+Main entry point for the incremental feature engineering process.
+"""
+)
+@click.option(
+    "--batch-size",
+    default=settings.CHANGE_STREAM_BATCH_SIZE,
+    type=int,
+    help="Number of changed documents that triggers a batch.",
+)
+@click.option(
+    "--max-wait-seconds",
+    default=settings.CHANGE_STREAM_MAX_WAIT_SECONDS,
+    type=float,
+    help="Maximum time a changed document waits before its batch is triggered.",
+)
+@click.option(
+    "--watcher-name",
+    default="feature_engineering",
+    help="Name under which the resume token is persisted. Use different names for independent watchers.",
+)
+def main(batch_size: int, max_wait_seconds: float, watcher_name: str) -> None:
+    watcher = ChangeStreamWatcher(batch_size=batch_size, max_wait_seconds=max_wait_seconds, watcher_name=watcher_name)
+    watcher.run()
+
+
+if __name__ == "__main__":
+    main()